@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, PasswordResetCode, CertificateRequest, IncidentReport, Announcement
+from .models import User, PasswordResetCode, CertificateRequest, IncidentReport, Announcement, RequestIdSequence, StatCounter, PendingUpload, StoredObject, StorageTombstone
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -74,6 +74,42 @@ class CertificateRequestAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(RequestIdSequence)
+class RequestIdSequenceAdmin(admin.ModelAdmin):
+    list_display = ('year', 'last_value', 'updated_at')
+    readonly_fields = ('updated_at',)
+    ordering = ('-year',)
+
+@admin.register(StatCounter)
+class StatCounterAdmin(admin.ModelAdmin):
+    list_display = ('scope', 'dimension', 'value', 'total')
+    list_filter = ('dimension',)
+    search_fields = ('scope',)
+    ordering = ('scope', 'dimension', 'value')
+
+@admin.register(PendingUpload)
+class PendingUploadAdmin(admin.ModelAdmin):
+    list_display = ('user', 'field', 'status', 'attempts', 'next_attempt_at', 'created_at')
+    list_filter = ('field', 'status')
+    search_fields = ('user__username', 'certificate_request__request_id')
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('-created_at',)
+
+@admin.register(StoredObject)
+class StoredObjectAdmin(admin.ModelAdmin):
+    list_display = ('path', 'bucket_name', 'size', 'ref_count', 'created_at')
+    search_fields = ('path', 'sha256')
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('-created_at',)
+
+@admin.register(StorageTombstone)
+class StorageTombstoneAdmin(admin.ModelAdmin):
+    list_display = ('key', 'bucket_name', 'kind', 'attempts', 'next_attempt_at', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('key',)
+    readonly_fields = ('created_at',)
+    ordering = ('next_attempt_at',)
+
 @admin.register(IncidentReport)
 class IncidentReportAdmin(admin.ModelAdmin):
     list_display = ('report_id', 'user', 'incident_type', 'place', 'status', 'created_at')
@@ -94,8 +130,10 @@ class AnnouncementAdmin(admin.ModelAdmin):
     
     def make_active(self, request, queryset):
         queryset.update(is_active=True)
+        Announcement.invalidate_cached_counts()
     make_active.short_description = "Mark selected announcements as active"
     
     def make_inactive(self, request, queryset):
         queryset.update(is_active=False)
+        Announcement.invalidate_cached_counts()
     make_inactive.short_description = "Mark selected announcements as inactive"
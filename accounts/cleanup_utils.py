@@ -0,0 +1,200 @@
+"""
+Deferred deletion of stored files.
+Code that stops using a stored file records a StorageTombstone instead of
+deleting it inline, so requests never wait on storage and a rolled-back
+change leaves its files alone. `manage.py sweep_storage` removes tombstoned
+objects in bulk and retries failures, and can reconcile the bucket against
+the database to catch objects nothing references any more.
+"""
+
+import random
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .image_utils import variant_fields
+from .models import CertificateRequest, PendingUpload, StorageTombstone, StoredObject, User
+from .storage_utils import list_objects, object_key, remove_objects
+
+SWEEP_BATCH_SIZE = 500
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# Objects younger than this are left out of reconciliation: a browser may
+# have uploaded one whose key has not been submitted yet
+RECONCILE_GRACE = timedelta(hours=24)
+
+# Model fields holding URLs of stored photos, thumbnails included
+PHOTO_FIELDS = {
+    User: [
+        field
+        for photo_field in ('profile_photo_url', 'resident_id_photo_url')
+        for field in variant_fields(photo_field).values()
+    ],
+    CertificateRequest: list(variant_fields('proof_photo_url').values()),
+}
+
+
+def schedule_deletion(urls, bucket_name='user-uploads'):
+    """
+    Tombstone stored files by URL, dropping one reference each. Call it in
+    the transaction that stops using them. URLs that are not stored files
+    are ignored.
+    """
+    _tombstone(filter(None, (object_key(url, bucket_name) for url in urls if url)), bucket_name)
+
+
+def _tombstone(keys, bucket_name, kind='release'):
+    return StorageTombstone.objects.bulk_create([
+        StorageTombstone(bucket_name=bucket_name, key=key, kind=kind) for key in keys
+    ])
+
+
+def photo_urls(instance):
+    """Stored photo URLs on a user or certificate request"""
+    return [getattr(instance, field) for field in PHOTO_FIELDS.get(type(instance), [])]
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the given number of failed sweeps, with jitter"""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _plan(bucket_name, tombstones, lock=False):
+    """
+    Decide what a batch of tombstones does: returns (keys to remove, index
+    rows to delete, index rows with fewer references left). Locking the
+    index rows keeps uploads of the same bytes from racing the removal.
+    """
+    released = Counter(t.key for t in tombstones if t.kind == 'release')
+    keys = sorted(set(released) | {t.key for t in tombstones})
+    stored = StoredObject.objects.filter(bucket_name=bucket_name, path__in=keys).order_by('path')
+    if lock:
+        stored = stored.select_for_update()
+    stored = {obj.path: obj for obj in stored}
+
+    remove, emptied, decremented = [], [], []
+    for key in keys:
+        obj = stored.get(key)
+        if obj is None:
+            # Stored before the index existed, or an orphan
+            remove.append(key)
+        elif obj.ref_count > released[key]:
+            if released[key]:
+                obj.ref_count -= released[key]
+                decremented.append(obj)
+        else:
+            remove.append(key)
+            emptied.append(obj)
+    return remove, emptied, decremented
+
+
+def due_tombstones(batch_size=SWEEP_BATCH_SIZE):
+    return StorageTombstone.objects.filter(next_attempt_at__lte=timezone.now()).order_by('next_attempt_at', 'pk')[:batch_size]
+
+
+def preview(batch_size=SWEEP_BATCH_SIZE):
+    """What a sweep would do now, without changing anything: [(tombstone, 'remove' | 'release' | 'keep')]"""
+    tombstones = list(due_tombstones(batch_size))
+    actions = {}
+    for bucket_name in {t.bucket_name for t in tombstones}:
+        batch = [t for t in tombstones if t.bucket_name == bucket_name]
+        remove, _, decremented = _plan(bucket_name, batch)
+        actions.update({(bucket_name, key): 'remove' for key in remove})
+        actions.update({(bucket_name, obj.path): 'release' for obj in decremented})
+    return [(t, actions.get((t.bucket_name, t.key), 'keep')) for t in tombstones]
+
+
+def sweep(batch_size=SWEEP_BATCH_SIZE):
+    """
+    Process due tombstones, one bulk remove per bucket. A batch whose removal
+    fails is retried later with backoff. Returns counts of tombstones swept
+    and failed, objects removed and shared references released.
+    """
+    counts = {'swept': 0, 'removed': 0, 'released': 0, 'failed': 0}
+    due = list(due_tombstones(batch_size).values_list('pk', 'bucket_name'))
+    for bucket_name in {bucket for _, bucket in due}:
+        ids = [pk for pk, bucket in due if bucket == bucket_name]
+        try:
+            with transaction.atomic():
+                # Concurrent sweepers skip each other's tombstones
+                tombstones = list(StorageTombstone.objects.select_for_update(skip_locked=True).filter(pk__in=ids))
+                remove, emptied, decremented = _plan(bucket_name, tombstones, lock=True)
+                remove_objects(remove, bucket_name)
+                StoredObject.objects.filter(pk__in=[obj.pk for obj in emptied]).delete()
+                for obj in decremented:
+                    obj.save(update_fields=['ref_count', 'updated_at'])
+                StorageTombstone.objects.filter(pk__in=[t.pk for t in tombstones]).delete()
+            counts['swept'] += len(tombstones)
+            counts['removed'] += len(remove)
+            counts['released'] += len(decremented)
+        except Exception as e:
+            print(f"Storage sweep failed for {len(ids)} object(s) in {bucket_name}: {e}")
+            counts['failed'] += len(ids)
+            for tombstone in StorageTombstone.objects.filter(pk__in=ids):
+                tombstone.attempts += 1
+                tombstone.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(tombstone.attempts))
+                tombstone.last_error = str(e)
+                tombstone.save(update_fields=['attempts', 'next_attempt_at', 'last_error'])
+    return counts
+
+
+def referenced_keys():
+    """Counter of object keys referenced by stored photo URLs and by uploads still in flight"""
+    refs = Counter()
+    for model, fields in PHOTO_FIELDS.items():
+        for urls in model.objects.values_list(*fields).iterator():
+            refs.update(filter(None, map(object_key, urls)))
+    # Browser uploads waiting to be normalized, or to be retried
+    refs.update(
+        PendingUpload.objects.exclude(status__in=['done', 'superseded']).exclude(source_key='')
+        .values_list('source_key', flat=True)
+    )
+    return refs
+
+
+def reconcile(prefixes, bucket_name='user-uploads', grace=RECONCILE_GRACE, dry_run=False):
+    """
+    Compare the objects under `prefixes` with the rows that reference them.
+    Objects older than `grace` that nothing references are tombstoned as
+    orphans, and reference counts in the index that drifted are corrected.
+    Returns (orphan keys, number of index rows corrected).
+    """
+    cutoff = timezone.now() - grace
+    refs = referenced_keys()
+    index = {obj.path: obj for obj in StoredObject.objects.filter(bucket_name=bucket_name)}
+    queued = set(StorageTombstone.objects.filter(bucket_name=bucket_name).values_list('key', flat=True))
+
+    orphans = []
+    for prefix in prefixes:
+        for key, created_at in list_objects(prefix, bucket_name):
+            if refs[key] or key in queued or (created_at and created_at > cutoff):
+                continue
+            obj = index.get(key)
+            # A recent reference may belong to an upload not yet written to its row
+            if obj and obj.ref_count and obj.updated_at > cutoff:
+                continue
+            orphans.append(key)
+
+    # Counts only change through uploads and sweeps, both of which touch
+    # updated_at, so rows untouched since the cutoff can be recounted safely
+    drifted = [
+        obj for obj in index.values()
+        if obj.updated_at <= cutoff and refs[obj.path] and obj.ref_count != refs[obj.path]
+    ]
+    if dry_run:
+        return orphans, len(drifted)
+
+    corrected = sum(
+        StoredObject.objects.filter(pk=obj.pk, updated_at__lte=cutoff).update(ref_count=refs[obj.path])
+        for obj in drifted
+    )
+    with transaction.atomic():
+        # Zeroed first so the sweep removes them unless an upload claims them again
+        StoredObject.objects.filter(
+            bucket_name=bucket_name, path__in=orphans, updated_at__lte=cutoff,
+        ).update(ref_count=0)
+        _tombstone(orphans, bucket_name, kind='orphan')
+    return orphans, corrected
@@ -0,0 +1,13 @@
+"""
+Template context processors for Labang Online
+"""
+
+from .models import Announcement
+
+
+def announcement_badge(request):
+    """Provide the notification badge count to every resident page"""
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return {}
+    return {'unread_count': Announcement.unread_count_for(user)}
@@ -0,0 +1,115 @@
+"""
+Image normalization for uploaded photos.
+Uploads are decoded, rotated upright and stripped of EXIF metadata, then
+re-encoded as a size-capped main image plus medium and small thumbnails.
+Pillow is optional; without it uploads are stored unchanged.
+"""
+
+import io
+import os
+
+from django.core.files.base import ContentFile
+
+from .storage_utils import delete_from_supabase, upload_to_supabase
+
+try:
+    from PIL import Image, ImageOps, features  # type: ignore
+except Exception:
+    Image = None
+
+# Longest side in pixels of each stored variant, largest first
+VARIANT_SIZES = {'main': 1600, 'medium': 640, 'small': 160}
+IMAGE_QUALITY = 80
+# Larger images are rejected rather than decoded (decompression bombs)
+MAX_PIXELS = 50_000_000
+
+
+def output_format():
+    """(Pillow format, extension, content type) used for stored images"""
+    if Image is not None and features.check('webp'):
+        return 'WEBP', 'webp', 'image/webp'
+    return 'JPEG', 'jpg', 'image/jpeg'
+
+
+def variant_fields(field):
+    """Model fields holding each variant of a photo URL field, e.g. profile_photo_small_url"""
+    base = field[:-len('_url')]
+    return {'main': field, 'medium': f"{base}_medium_url", 'small': f"{base}_small_url"}
+
+
+def _encode(image, fmt, ext, content_type, name, icc_profile):
+    buffer = io.BytesIO()
+    options = {'quality': IMAGE_QUALITY}
+    if fmt == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    if icc_profile:
+        # Kept so colours stay right; it carries no personal metadata
+        options['icc_profile'] = icc_profile
+    image.save(buffer, format=fmt, **options)
+    variant = ContentFile(buffer.getvalue(), name=f"{name}.{ext}")
+    variant.content_type = content_type
+    return variant
+
+
+def normalize_image(file):
+    """
+    Return {variant: ContentFile} for the main image and thumbnails, each
+    with content_type set, or None if Pillow is unavailable or the file is
+    not a decodable image.
+    """
+    if Image is None:
+        return None
+
+    fmt, ext, content_type = output_format()
+    name = os.path.splitext(os.path.basename(file.name or 'image'))[0]
+    try:
+        file.seek(0)
+        with Image.open(file) as source:
+            if source.width * source.height > MAX_PIXELS:
+                print(f"Image {file.name} is too large to normalize: {source.width}x{source.height}")
+                return None
+            # JPEGs are decoded at a reduced scale when that still covers the main size
+            main_size = VARIANT_SIZES['main']
+            source.draft('RGB', (main_size, main_size))
+            icc_profile = source.info.get('icc_profile')
+            image = ImageOps.exif_transpose(source)
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if has_alpha and fmt == 'WEBP':
+            image = image.convert('RGBA')
+        elif has_alpha:
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image.convert('RGBA'), mask=image.convert('RGBA').split()[-1])
+            image = background
+        else:
+            image = image.convert('RGB')
+
+        variants = {}
+        for variant, size in VARIANT_SIZES.items():
+            # Each thumbnail is scaled down from the previous, smaller variant
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            variants[variant] = _encode(image, fmt, ext, content_type, name, icc_profile)
+        return variants
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        print(f"Could not normalize image {file.name}: {e}")
+        return None
+
+
+def upload_variants(variants, field, folder, bucket_name='user-uploads'):
+    """
+    Upload each variant and return {model field: url}; fields of variants
+    that are missing map to None. Returns None if any upload fails, after
+    removing the variants already uploaded.
+    """
+    urls = {}
+    for variant, model_field in variant_fields(field).items():
+        if variant not in variants:
+            urls[model_field] = None
+            continue
+        url = upload_to_supabase(variants[variant], bucket_name=bucket_name, folder=folder)
+        if not url:
+            for uploaded in filter(None, urls.values()):
+                delete_from_supabase(uploaded, bucket_name=bucket_name)
+            return None
+        urls[model_field] = url
+    return urls
@@ -0,0 +1,140 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import RequestFactory
+
+from accounts.models import CertificateRequest, User
+from accounts.pagination_utils import capped_count, keyset_paginate
+from accounts.search_utils import search_certificate_requests, supports_full_text
+
+
+BENCH_PREFIX = '__bench_search_'
+FIRST_NAMES = ['Maria', 'Jose', 'Ana', 'Juan', 'Rosa', 'Pedro', 'Liza', 'Mark', 'Grace', 'Ramon']
+LAST_NAMES = ['Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Ramos', 'Villanueva']
+PURPOSE_WORDS = [
+    'employment', 'requirement', 'scholarship', 'application', 'loan', 'bank', 'travel', 'passport',
+    'school', 'enrollment', 'medical', 'assistance', 'burial', 'hospital', 'court', 'police',
+    'clearance', 'business', 'permit', 'renewal', 'water', 'electric', 'connection', 'insurance',
+]
+BUSINESS_WORDS = ['Sari-Sari', 'Carinderia', 'Bakery', 'Laundry', 'Salon', 'Hardware', 'Pharmacy', 'Vulcanizing']
+DEFAULT_TERMS = ['scholarship', 'Garcia', 'bakery', 'REQ-BENCH-0000042', 'medical assistance']
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure admin certificate search latency on synthetic data at growing "
+        "table sizes, comparing the full-text index with the old icontains "
+        "filter. Everything runs in one transaction that is rolled back unless "
+        "--keep is given (run `recount` afterwards in that case)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[100000, 1000000],
+            help='Table sizes to measure at (default: 100000 1000000).',
+        )
+        parser.add_argument('--terms', nargs='+', default=DEFAULT_TERMS, help='Search terms to time.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per term (default: 5).')
+        parser.add_argument('--batch', type=int, default=5000, help='Insert batch size (default: 5000).')
+        parser.add_argument('--keep', action='store_true', help='Commit the synthetic rows instead of rolling back.')
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        if not sizes or sizes[0] < 1 or options['repeat'] < 1 or options['batch'] < 1:
+            raise CommandError("--sizes, --repeat and --batch must be positive.")
+
+        self.stdout.write(
+            f"Benchmarking on {connection.vendor} "
+            f"({'full-text' if supports_full_text() else 'icontains fallback only'})"
+        )
+        self.random = random.Random(42)
+
+        with transaction.atomic():
+            users = self._create_users(200)
+            inserted = 0
+            for size in sizes:
+                inserted = self._insert_rows(users, inserted, size, options['batch'])
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute("ANALYZE accounts_certificaterequest")
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{size:,} rows"))
+                for term in options['terms']:
+                    self._report(term, options['repeat'])
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def _create_users(self, count):
+        users = [
+            User(
+                username=f'{BENCH_PREFIX}{n}',
+                email=f'{BENCH_PREFIX}{n}@labang-online.local',
+                full_name=f'{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}',
+                contact_number='0',
+                date_of_birth='2000-01-01',
+                address_line='Benchmark',
+                is_active=False,
+            )
+            for n in range(count)
+        ]
+        User.objects.bulk_create(users)
+        return list(User.objects.filter(username__startswith=BENCH_PREFIX).only('id'))
+
+    def _insert_rows(self, users, start, stop, batch):
+        self.stdout.write(f"Inserting rows {start:,}..{stop:,}...")
+        certificate_types = [value for value, _ in CertificateRequest.CERTIFICATE_TYPES]
+        for offset in range(start, stop, batch):
+            rows = []
+            for n in range(offset, min(offset + batch, stop)):
+                certificate_type = self.random.choice(certificate_types)
+                rows.append(CertificateRequest(
+                    user=self.random.choice(users),
+                    request_id=f'REQ-BENCH-{n:07d}',
+                    certificate_type=certificate_type,
+                    purpose=' '.join(self.random.choices(PURPOSE_WORDS, k=8)),
+                    business_name=(
+                        f'{self.random.choice(LAST_NAMES)} {self.random.choice(BUSINESS_WORDS)}'
+                        if certificate_type == 'business_clearance' else None
+                    ),
+                    payment_amount=50,
+                ))
+            CertificateRequest.objects.bulk_create(rows)
+        return stop
+
+    def _report(self, term, repeat):
+        request = RequestFactory().get('/', {'q': term})
+        indexed = self._time(repeat, lambda: self._search_page(request, term))
+        legacy = self._time(repeat, lambda: self._legacy_page(term))
+        self.stdout.write(
+            f"  {term!r:24} search p50 {statistics.median(indexed):8.1f} ms  max {max(indexed):8.1f} ms   "
+            f"icontains p50 {statistics.median(legacy):8.1f} ms  max {max(legacy):8.1f} ms"
+        )
+
+    def _time(self, repeat, run):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _search_page(self, request, term):
+        """The admin_certificates query path: ranked search, first page, capped total"""
+        certificates = CertificateRequest.objects.select_related('user').defer('search_vector')
+        certificates = search_certificate_requests(certificates, term)
+        list(keyset_paginate(certificates, request, fields=('search_rank', 'created_at', 'id')))
+        capped_count(certificates)
+
+    def _legacy_page(self, term):
+        """The previous OR-of-icontains filter over the same page and total"""
+        certificates = CertificateRequest.objects.select_related('user').defer('search_vector').filter(
+            Q(request_id__icontains=term) |
+            Q(user__username__icontains=term) |
+            Q(user__full_name__icontains=term) |
+            Q(purpose__icontains=term)
+        )
+        list(certificates.order_by('-created_at', '-id')[:25])
+        capped_count(certificates)
@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection
+
+from accounts.models import CertificateRequest, User
+
+
+BENCH_USERNAME = '__bench_request_ids__'
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire parallel certificate request submissions and report inserts/sec "
+        "and request_id collisions. Rows are removed afterwards unless --keep "
+        "is given; the per-year counter is not rewound."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Total submissions (default: 500).')
+        parser.add_argument('--workers', type=int, default=16, help='Parallel workers (default: 16).')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark rows and user.')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        workers = options['workers']
+        if total < 1 or workers < 1:
+            raise CommandError("--requests and --workers must be positive.")
+
+        user, _ = User.objects.get_or_create(
+            username=BENCH_USERNAME,
+            defaults={
+                'email': f'{BENCH_USERNAME}@labang-online.local',
+                'full_name': 'Request ID Benchmark',
+                'contact_number': '0',
+                'date_of_birth': '2000-01-01',
+                'address_line': 'Benchmark',
+                'is_active': False,
+            },
+        )
+
+        self.stdout.write(f"Submitting {total} requests with {workers} workers on {connection.vendor}...")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda _: self._submit(user), range(total)))
+        elapsed = time.perf_counter() - started
+
+        request_ids = [value for outcome, value in results if outcome == 'ok']
+        collisions = sum(1 for outcome, _ in results if outcome == 'collision')
+        errors = [value for outcome, value in results if outcome == 'error']
+        duplicates = len(request_ids) - len(set(request_ids))
+
+        self.stdout.write(f"Inserted:    {len(request_ids)}")
+        self.stdout.write(f"Collisions:  {collisions}")
+        self.stdout.write(f"Duplicates:  {duplicates}")
+        self.stdout.write(f"Errors:      {len(errors)}")
+        self.stdout.write(f"Elapsed:     {elapsed:.3f}s")
+        self.stdout.write(f"Inserts/sec: {len(request_ids) / elapsed if elapsed else 0:.1f}")
+        for message in sorted(set(errors))[:5]:
+            self.stdout.write(self.style.WARNING(f"  {message}"))
+
+        if not options['keep']:
+            CertificateRequest.objects.filter(user=user).delete()
+            user.delete()
+
+    def _submit(self, user):
+        try:
+            cert_request = CertificateRequest.objects.create(
+                user=user,
+                certificate_type='barangay_clearance',
+                purpose='Request ID allocator benchmark',
+                payment_amount=50.00,
+            )
+            return 'ok', cert_request.request_id
+        except IntegrityError as e:
+            return 'collision', str(e)
+        except Exception as e:
+            return 'error', f"{type(e).__name__}: {e}"
+        finally:
+            connection.close()
@@ -0,0 +1,114 @@
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.storage_backends import BACKENDS, REMOVE_BATCH_SIZE, get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Push files through storage backends and report throughput, p50/p99 "
+        "latency and peak Python memory per operation: put_stream (from a file "
+        "on disk), put (from bytes), delete one at a time and delete_many. "
+        "Objects go under a bench-<id>/ folder and are all deleted again. The "
+        "memory backend's peak includes the objects it holds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', action='append', dest='backends', choices=sorted(BACKENDS),
+            help='Backend to measure (can be given more than once; default: memory and local).',
+        )
+        parser.add_argument('--files', type=int, default=200, help='Files per operation (default: 200).')
+        parser.add_argument('--size', type=int, default=256 * 1024, help='Bytes per file (default: 262144).')
+        parser.add_argument('--concurrency', type=int, default=8, help='Worker threads (default: 8).')
+        parser.add_argument('--bucket', default='user-uploads', help='Bucket to write to (default: user-uploads).')
+
+    def handle(self, *args, **options):
+        if min(options['files'], options['size'], options['concurrency']) < 1:
+            raise CommandError("--files, --size and --concurrency must be positive.")
+
+        payload = os.urandom(options['size'])
+        with tempfile.NamedTemporaryFile(suffix='.bin') as source:
+            source.write(payload)
+            source.flush()
+            self.stdout.write(
+                f"{options['files']} files of {options['size']:,} bytes per operation, "
+                f"{options['concurrency']} threads"
+            )
+            for name in options['backends'] or ['memory', 'local']:
+                try:
+                    backend = get_backend(options['bucket'], name=name)
+                except ImproperlyConfigured as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f"{name}:")
+                self._bench(backend, source.name, payload, options)
+
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    def _bench(self, backend, source_path, payload, options):
+        folder = f"bench-{uuid.uuid4().hex[:8]}"
+        streamed = [f"{folder}/stream-{n}.bin" for n in range(options['files'])]
+        buffered = [f"{folder}/bytes-{n}.bin" for n in range(options['files'])]
+        content_type = 'application/octet-stream'
+
+        def put_stream(key):
+            with open(source_path, 'rb') as f:
+                backend.put_stream(key, File(f, name=os.path.basename(key)), content_type)
+
+        try:
+            self._run(options, 'put_stream', streamed, put_stream, len(payload))
+            self._run(options, 'put', buffered, lambda key: backend.put(key, payload, content_type), len(payload))
+            self._run(options, 'delete', streamed, backend.delete, 0)
+            batches = [buffered[i:i + REMOVE_BATCH_SIZE] for i in range(0, len(buffered), REMOVE_BATCH_SIZE)]
+            self._run(options, 'delete_many', batches, backend.delete_many, 0, files_per_call=REMOVE_BATCH_SIZE)
+        finally:
+            # Nothing is left behind if a phase fails part way
+            backend.delete_many(streamed + buffered)
+            if backend.name == 'local':
+                self._remove_empty_directories(default_storage.path(folder))
+
+    def _remove_empty_directories(self, path):
+        """Local storage keeps the (now empty) shard directories; drop them"""
+        for directory, _, files in os.walk(path, topdown=False):
+            if not files:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+
+    def _run(self, options, label, items, operation, size, files_per_call=1):
+        def timed(item):
+            started = time.perf_counter()
+            operation(item)
+            return (time.perf_counter() - started) * 1000
+
+        tracemalloc.start()
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                timings = list(pool.map(timed, items))
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        files = options['files']
+        ordered = sorted(timings)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        throughput = f"{files * size / elapsed / 1e6:8.2f} MB/s" if size else ' ' * 13
+        per = 'call' if files_per_call > 1 else 'file'
+        self.stdout.write(
+            f"  {label:12} {files / elapsed:9.1f} files/s {throughput}   "
+            f"p50 {statistics.median(timings):8.2f} ms   p99 {p99:8.2f} ms per {per}   "
+            f"peak {peak / 1e6:7.2f} MB"
+        )
@@ -0,0 +1,108 @@
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import storage_backends
+
+# Any three dot-separated segments pass the SDK's key format check
+FAKE_KEY = 'bench.bench.bench'
+
+
+class StandInStorageHandler(BaseHTTPRequestHandler):
+    """Accepts Supabase Storage uploads and discards the bytes"""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, delayed ACKs
+    # add ~40 ms to every response and hide the difference being measured
+    disable_nagle_algorithm = True
+    connect_delay = 0.0
+    request_delay = 0.0
+
+    def setup(self):
+        # Charged once per TCP connection, standing in for the TLS handshake
+        time.sleep(self.connect_delay)
+        super().setup()
+
+    def do_POST(self):
+        remaining = int(self.headers.get('Content-Length', 0))
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 65536)))
+        time.sleep(self.request_delay)
+        key = self.path.split('/storage/v1/object/', 1)[-1]
+        body = json.dumps({'Key': key}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare uploads through a new Supabase client per call (the old "
+        "behaviour) with the shared pooled client, against a local stand-in "
+        "storage server. --connect-ms adds a delay to every new connection to "
+        "stand in for the TLS handshake to the real Supabase endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=200, help='Uploads per mode (default: 200).')
+        parser.add_argument('--size', type=int, default=64 * 1024, help='Bytes per upload (default: 65536).')
+        parser.add_argument('--connect-ms', type=float, default=40.0, help='Per-connection setup delay (default: 40).')
+        parser.add_argument('--latency-ms', type=float, default=0.0, help='Per-request server delay (default: 0).')
+
+    def handle(self, *args, **options):
+        if options['uploads'] < 1 or options['size'] < 1:
+            raise CommandError("--uploads and --size must be positive.")
+        if not storage_backends.create_client:
+            raise CommandError("The supabase package is not installed.")
+
+        StandInStorageHandler.connect_delay = options['connect_ms'] / 1000
+        StandInStorageHandler.request_delay = options['latency_ms'] / 1000
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandInStorageHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        payload = b'\0' * options['size']
+
+        try:
+            self.stdout.write(
+                f"{options['uploads']} uploads of {options['size']:,} bytes to {url} "
+                f"(connect {options['connect_ms']:.0f} ms, latency {options['latency_ms']:.0f} ms)"
+            )
+            fresh = self._run(options['uploads'], lambda: storage_backends.create_client(url, FAKE_KEY), payload)
+            shared_client = storage_backends.create_client(url, FAKE_KEY)
+            pooled = self._run(options['uploads'], lambda: shared_client, payload)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self._report('New client per upload', fresh)
+        self._report('Shared pooled client', pooled)
+        saving = statistics.mean(fresh) - statistics.mean(pooled)
+        self.stdout.write(self.style.SUCCESS(f"Saving per upload: {saving:.2f} ms"))
+
+    def _run(self, uploads, get_client, payload):
+        timings = []
+        for n in range(uploads):
+            started = time.perf_counter()
+            client = get_client()
+            client.storage.from_('user-uploads').upload(
+                f'bench/{n}.bin', payload, file_options={'content-type': 'application/octet-stream'}
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _report(self, label, timings):
+        ordered = sorted(timings)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        self.stdout.write(
+            f"  {label:24} mean {statistics.mean(timings):7.2f} ms   "
+            f"p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms"
+        )
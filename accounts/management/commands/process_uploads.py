@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import PendingUpload
+from accounts.upload_utils import due_upload_ids, process_upload
+
+
+class Command(BaseCommand):
+    help = (
+        "Push spooled uploads that are due for an attempt to storage: retries "
+        "after failures and uploads left behind by a restarted web process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when idle.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop (default: 5).')
+        parser.add_argument('--batch', type=int, default=100, help='Uploads per poll (default: 100).')
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Give uploads that ran out of attempts a fresh set of retries first.',
+        )
+
+    def handle(self, *args, **options):
+        if options['interval'] <= 0 or options['batch'] < 1:
+            raise CommandError("--interval and --batch must be positive.")
+
+        if options['retry_failed']:
+            reset = PendingUpload.objects.filter(status='failed').update(
+                status='pending', attempts=0, next_attempt_at=timezone.now(),
+            )
+            self.stdout.write(f"Re-queued {reset} failed upload(s).")
+
+        while True:
+            counts = {}
+            for upload_id in due_upload_ids(options['batch']):
+                upload = process_upload(upload_id)
+                if upload is not None:
+                    counts[upload.status] = counts.get(upload.status, 0) + 1
+            if counts:
+                summary = ', '.join(f"{status}: {total}" for status, total in sorted(counts.items()))
+                self.stdout.write(f"Processed uploads ({summary})")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,83 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from accounts.models import CertificateRequest, IncidentReport, StatCounter, User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the StatCounter table from the source tables and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drift without rewriting the counters.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql' and not options['dry_run']:
+                # Writers block on their counter update until the rebuild commits,
+                # so no increment is lost between counting and rewriting
+                table = connection.ops.quote_name(StatCounter._meta.db_table)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+
+            expected = self._expected_counts()
+            current = {
+                (scope, dimension, value): total
+                for scope, dimension, value, total
+                in StatCounter.objects.values_list('scope', 'dimension', 'value', 'total')
+            }
+
+            drift = sorted(
+                (key, current.get(key, 0), expected.get(key, 0))
+                for key in set(current) | set(expected)
+                if current.get(key, 0) != expected.get(key, 0)
+            )
+            for (scope, dimension, value), stored, actual in drift:
+                self.stdout.write(
+                    self.style.WARNING(f"{scope} {dimension}={value}: stored {stored}, actual {actual}")
+                )
+
+            if options['dry_run']:
+                self.stdout.write(f"{len(drift)} counter(s) drifted; nothing changed (dry run).")
+                return
+
+            StatCounter.objects.all().delete()
+            StatCounter.objects.bulk_create([
+                StatCounter(scope=scope, dimension=dimension, value=value, total=total)
+                for (scope, dimension, value), total in expected.items()
+                if total
+            ], batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {sum(1 for total in expected.values() if total)} counter(s); {len(drift)} had drifted."
+        ))
+
+    def _expected_counts(self):
+        expected = Counter()
+
+        def add(user_id, dimension, value, total):
+            expected[(StatCounter.GLOBAL, dimension, value)] += total
+            if user_id is not None:
+                expected[(StatCounter.user_scope(user_id), dimension, value)] += total
+
+        for dimension, field in (('certificate_payment_status', 'payment_status'),
+                                 ('certificate_claim_status', 'claim_status')):
+            rows = CertificateRequest.objects.order_by().values_list('user_id', field).annotate(total=Count('id'))
+            for user_id, value, total in rows:
+                add(user_id, dimension, value, total)
+
+        rows = IncidentReport.objects.order_by().values_list('user_id', 'status').annotate(total=Count('id'))
+        for user_id, value, total in rows:
+            add(user_id, 'report_status', value, total)
+
+        rows = User.objects.filter(is_staff=False).order_by().values_list('resident_confirmation').annotate(total=Count('id'))
+        for confirmed, total in rows:
+            add(None, 'resident_verification', 'verified' if confirmed else 'pending', total)
+        add(None, 'role', 'admin', User.objects.filter(is_superuser=True).count())
+
+        return expected
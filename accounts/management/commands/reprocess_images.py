@@ -0,0 +1,99 @@
+import os
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.image_utils import Image, normalize_image, upload_variants, variant_fields
+from accounts.models import CertificateRequest, User
+from accounts.cleanup_utils import schedule_deletion
+from accounts.storage_utils import read_from_supabase
+from accounts.upload_utils import BUCKET_NAME, FIELD_FOLDERS
+
+MODELS = {
+    'profile_photo_url': User,
+    'resident_id_photo_url': User,
+    'proof_photo_url': CertificateRequest,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Normalize photos stored before image processing was added: re-encode "
+        "each original as a size-capped main image plus medium and small "
+        "thumbnails, point the record at them and delete the original."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--field', action='append', dest='fields', choices=sorted(MODELS),
+            help='Only process this photo field (can be given more than once).',
+        )
+        parser.add_argument('--all', action='store_true', help='Also reprocess photos that already have thumbnails.')
+        parser.add_argument('--limit', type=int, help='Stop after this many photos per field.')
+        parser.add_argument('--dry-run', action='store_true', help='Download and re-encode, but store nothing.')
+
+    def handle(self, *args, **options):
+        if Image is None:
+            raise CommandError("Pillow is not installed.")
+        if options['limit'] is not None and options['limit'] < 1:
+            raise CommandError("--limit must be positive.")
+
+        for field in options['fields'] or sorted(MODELS):
+            self._process_field(field, options)
+
+    def _process_field(self, field, options):
+        model = MODELS[field]
+        rows = model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+        if not options['all']:
+            rows = rows.filter(**{f"{variant_fields(field)['small']}__isnull": True})
+        rows = rows.order_by('pk').values_list('pk', field)
+        if options['limit']:
+            rows = rows[:options['limit']]
+
+        counts = {'done': 0, 'skipped': 0, 'failed': 0}
+        original_bytes = main_bytes = thumbnail_bytes = 0
+        for pk, url in rows.iterator():
+            data = read_from_supabase(url, BUCKET_NAME)
+            if data is None:
+                self.stderr.write(f"  {model.__name__} {pk}: could not download {url}")
+                counts['failed'] += 1
+                continue
+
+            variants = normalize_image(ContentFile(data, name=os.path.basename(url)))
+            if not variants:
+                counts['skipped'] += 1
+                continue
+            original_bytes += len(data)
+            main_bytes += variants['main'].size
+            thumbnail_bytes += sum(variant.size for name, variant in variants.items() if name != 'main')
+            if options['dry_run']:
+                counts['done'] += 1
+                continue
+
+            urls = upload_variants(variants, field, FIELD_FOLDERS[field], bucket_name=BUCKET_NAME)
+            if not urls:
+                counts['failed'] += 1
+                continue
+            # Each stored URL holds one reference to its object, so all
+            # replaced values are released, including any re-uploaded unchanged
+            new_urls = list(urls.values())
+            replaced_urls = list(model.objects.filter(pk=pk).values_list(*urls).first() or ())
+            # Only if the photo was not replaced while this one was processed
+            with transaction.atomic():
+                if not model.objects.filter(pk=pk, **{field: url}).update(**urls):
+                    replaced_urls = new_urls
+                    counts['skipped'] += 1
+                else:
+                    counts['done'] += 1
+                schedule_deletion(replaced_urls, bucket_name=BUCKET_NAME)
+
+        verb = 'Would reprocess' if options['dry_run'] else 'Reprocessed'
+        self.stdout.write(
+            f"{field}: {verb} {counts['done']}, skipped {counts['skipped']}, failed {counts['failed']}"
+        )
+        if original_bytes:
+            self.stdout.write(
+                f"  originals {original_bytes / 1e6:.2f} MB -> main images {main_bytes / 1e6:.2f} MB "
+                f"({original_bytes / max(main_bytes, 1):.1f}x smaller) + thumbnails {thumbnail_bytes / 1e6:.2f} MB"
+            )
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import CertificateRequest, RequestIdSequence
+
+
+class Command(BaseCommand):
+    help = (
+        "Repair or reseed the per-year certificate request ID counters "
+        "from the REQ-YYYY-NNNN values already stored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year', type=int, action='append', dest='years',
+            help='Only process this year (can be given more than once).',
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Set the counter to the highest issued number even if it is currently ahead.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drift without changing any counter.',
+        )
+
+    def handle(self, *args, **options):
+        years = options['years'] or self._known_years()
+        if not years:
+            self.stdout.write("No certificate requests or counters found.")
+            return
+
+        for year in sorted(set(years)):
+            if year < 1:
+                raise CommandError(f"Invalid year: {year}")
+            self._reseed(year, reset=options['reset'], dry_run=options['dry_run'])
+
+    def _known_years(self):
+        years = set(RequestIdSequence.objects.values_list('year', flat=True))
+        years.update(
+            created.year for created in CertificateRequest.objects.dates('created_at', 'year')
+        )
+        return years
+
+    def _reseed(self, year, reset, dry_run):
+        with transaction.atomic():
+            sequence = RequestIdSequence.objects.select_for_update().filter(year=year).first()
+            current = sequence.last_value if sequence else 0
+            highest = RequestIdSequence.highest_issued(year)
+
+            if current == highest:
+                self.stdout.write(f"{year}: counter at {current}, in sync.")
+                return
+
+            if current > highest and not reset:
+                self.stdout.write(
+                    f"{year}: counter at {current} is ahead of highest issued {highest}; "
+                    f"leaving it (use --reset to lower it)."
+                )
+                return
+
+            action = "would set" if dry_run else "set"
+            self.stdout.write(
+                self.style.WARNING(f"{year}: counter at {current}, highest issued {highest}; {action} to {highest}.")
+            )
+            if not dry_run:
+                RequestIdSequence.objects.update_or_create(year=year, defaults={'last_value': highest})
@@ -0,0 +1,55 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import DailyRollupProgress
+from accounts.rollup_utils import METRIC_SOURCES, first_day, store_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll certificate requests, paid revenue and incident reports up into "
+        "daily totals. By default only days completed since the last run are processed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--metric', action='append', dest='metrics', choices=sorted(METRIC_SOURCES),
+            help='Only process this metric (can be given more than once).',
+        )
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='Recompute the --since/--until range even if it was already processed.',
+        )
+        parser.add_argument('--since', type=datetime.date.fromisoformat, help='First day (YYYY-MM-DD).')
+        parser.add_argument('--until', type=datetime.date.fromisoformat, help='Last day (YYYY-MM-DD), default yesterday.')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        yesterday = today - datetime.timedelta(days=1)
+        until = options['until'] or yesterday
+        if until >= today:
+            raise CommandError("--until must be before today; today's totals are counted live.")
+        if options['backfill'] and not options['since']:
+            raise CommandError("--backfill requires --since.")
+
+        for metric in options['metrics'] or sorted(METRIC_SOURCES):
+            progress = DailyRollupProgress.objects.filter(metric=metric).first()
+
+            if options['backfill']:
+                since = options['since']
+            elif progress:
+                since = max(progress.last_day + datetime.timedelta(days=1), options['since'] or datetime.date.min)
+            else:
+                since = options['since'] or first_day(metric)
+
+            if since and since <= until:
+                rows = store_rollups(metric, since, until)
+                self.stdout.write(f"{metric}: rolled up {since} to {until} ({rows} rows).")
+                if not progress or progress.last_day < until:
+                    DailyRollupProgress.objects.update_or_create(metric=metric, defaults={'last_day': until})
+            else:
+                self.stdout.write(f"{metric}: up to date.")
+
+        self.stdout.write(self.style.SUCCESS("Daily rollups complete."))
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.cleanup_utils import RECONCILE_GRACE, SWEEP_BATCH_SIZE, preview, reconcile, sweep
+from accounts.upload_utils import BUCKET_NAME, FIELD_FOLDERS
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored files that are no longer used: remove tombstoned objects "
+        "in bulk, retrying failures, and optionally reconcile the bucket against "
+        "the database to find orphaned objects."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=SWEEP_BATCH_SIZE, help=f'Tombstones per sweep (default: {SWEEP_BATCH_SIZE}).')
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping batches until no tombstones are due.')
+        parser.add_argument(
+            '--reconcile', action='store_true',
+            help='First list the photo folders and tombstone objects no row references.',
+        )
+        parser.add_argument(
+            '--grace-hours', type=float, default=RECONCILE_GRACE.total_seconds() / 3600,
+            help='With --reconcile, leave objects younger than this alone (default: %(default)s).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting anything.')
+
+    def handle(self, *args, **options):
+        if options['batch'] < 1 or options['grace_hours'] < 0:
+            raise CommandError("--batch must be positive and --grace-hours not negative.")
+        dry_run = options['dry_run']
+
+        if options['reconcile']:
+            orphans, corrected = reconcile(
+                sorted(FIELD_FOLDERS.values()), bucket_name=BUCKET_NAME,
+                grace=timedelta(hours=options['grace_hours']), dry_run=dry_run,
+            )
+            verb = 'Would tombstone' if dry_run else 'Tombstoned'
+            self.stdout.write(f"{verb} {len(orphans)} orphaned object(s); {corrected} reference count(s) out of date.")
+            if dry_run:
+                for key in orphans:
+                    self.stdout.write(f"  orphan {key}")
+
+        if dry_run:
+            for tombstone, action in preview(options['batch']):
+                retry = f" (attempt {tombstone.attempts + 1}: {tombstone.last_error})" if tombstone.attempts else ''
+                self.stdout.write(f"  {action} {tombstone.bucket_name}/{tombstone.key}{retry}")
+            self.stdout.write(self.style.SUCCESS("Dry run; nothing deleted."))
+            return
+
+        totals = {'swept': 0, 'removed': 0, 'released': 0, 'failed': 0}
+        while True:
+            counts = sweep(options['batch'])
+            for name, total in counts.items():
+                totals[name] += total
+            # Failed tombstones are not due again until their retry time
+            if not options['loop'] or counts['failed'] or counts['swept'] < options['batch']:
+                break
+
+        self.stdout.write(
+            f"Removed {totals['removed']} object(s), released {totals['released']} shared reference(s), "
+            f"{totals['failed']} failed and queued for retry."
+        )
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,131 @@
+"""
+Local media storage used when Supabase is not configured.
+Files keep their logical names (and so their URLs), but on disk each one
+lives in hash-prefix subdirectories, e.g. profile-photos/3f/a0/<name>, so
+no directory grows to hundreds of thousands of entries. Writes go to a
+temporary file that is linked into place, so readers and the front server
+never see a partly written file.
+"""
+
+import hashlib
+import os
+import uuid
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+# Levels of shard directories, and hex characters per level (256 each)
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+# Files being written; never listed
+TEMP_PREFIX = '.tmp-'
+
+
+def shard_name(name):
+    """On-disk name for a logical name: its directory, shard directories, then its basename"""
+    directory, basename = os.path.split(name)
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    shards = [digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_DEPTH)]
+    return os.path.join(directory, *shards, basename)
+
+
+class ShardedFileSystemStorage(FileSystemStorage):
+    def path(self, name):
+        sharded = super().path(shard_name(name))
+        if os.path.exists(sharded):
+            return sharded
+        # Directories, and files stored before sharding, sit at their logical path
+        flat = super().path(name)
+        return flat if os.path.exists(flat) else sharded
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        self._make_directory(directory)
+        # Written once: a temporary upload is moved here, so it cannot be
+        # written again if the name turns out to be taken
+        temp_path = os.path.join(directory, f"{TEMP_PREFIX}{uuid.uuid4().hex}")
+        try:
+            self._write_temp(temp_path, content)
+            while True:
+                try:
+                    # link() rather than rename() so an existing file is never replaced
+                    os.link(temp_path, full_path)
+                except FileExistsError:
+                    # A new name is needed if the file exists.
+                    name = self.get_available_name(name)
+                    full_path = self.path(name)
+                    self._make_directory(os.path.dirname(full_path))
+                else:
+                    break
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        self._ensure_location_group_id(full_path)
+        return str(name).replace("\\", "/")
+
+    def _make_directory(self, directory):
+        try:
+            if self.directory_permissions_mode is not None:
+                # Set the umask because os.makedirs() doesn't apply the "mode"
+                # argument to intermediate-level directories.
+                old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+                try:
+                    os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+                finally:
+                    os.umask(old_umask)
+            else:
+                os.makedirs(directory, exist_ok=True)
+        except FileExistsError:
+            raise FileExistsError("%s exists and is not a directory." % directory)
+
+    def _write_temp(self, temp_path, content):
+        # Django's temporary upload files are moved rather than copied
+        if hasattr(content, "temporary_file_path"):
+            file_move_safe(content.temporary_file_path(), temp_path)
+            return
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+        with os.fdopen(fd, "wb") as temp_file:
+            for chunk in content.chunks():
+                temp_file.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+
+    def listdir(self, path):
+        """Logical listing: files in shard directories are listed under their own directory"""
+        directories, files = [], []
+        with os.scandir(self.path(path)) as entries:
+            for entry in entries:
+                if entry.name.startswith(TEMP_PREFIX):
+                    continue
+                if not entry.is_dir():
+                    files.append(entry.name)
+                    continue
+                sharded, other = self._shard_contents(path, [entry.name])
+                files.extend(sharded)
+                # Anything but this directory's own sharded files makes it a real subdirectory
+                if other or not sharded:
+                    directories.append(entry.name)
+        return directories, files
+
+    def _shard_contents(self, path, shards):
+        """
+        (names of files of `path` stored under these shard directories, whether
+        anything else is in there). Each file is checked against its hash, as a
+        real subdirectory's name can look like a shard.
+        """
+        names, other = [], False
+        with os.scandir(os.path.join(super().path(path), *shards)) as entries:
+            for entry in entries:
+                if entry.name.startswith(TEMP_PREFIX):
+                    continue
+                if len(shards) < SHARD_DEPTH and entry.is_dir():
+                    more, more_other = self._shard_contents(path, shards + [entry.name])
+                    names.extend(more)
+                    other = other or more_other
+                elif entry.is_file() and shard_name(os.path.join(path, entry.name)) == os.path.join(path, *shards, entry.name):
+                    names.append(entry.name)
+                else:
+                    other = True
+        return names, other
@@ -0,0 +1,74 @@
+"""
+Serving locally stored photos.
+Photos are personal documents (ID cards, proof of indigency), so /media/
+is served by an access-checked view instead of a public folder. The view
+only authorizes the request: the bytes are sent by the front server via
+X-Accel-Redirect (nginx) or X-Sendfile (Apache/lighttpd), or else by a
+FileResponse, which WSGI servers send with sendfile() where available.
+"""
+
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+
+from .image_utils import variant_fields
+from .models import CertificateRequest, User
+from .upload_utils import FIELD_FOLDERS
+
+# Stored names never change contents: content-hashed or random
+MEDIA_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+
+def can_view_media(user, name):
+    """Whether the user may see a stored photo: admins see all, residents their own"""
+    if not user.is_authenticated:
+        return False
+    if user.is_staff or user.is_superuser:
+        return True
+
+    parts = name.split('/')
+    field = next((field for field, folder in FIELD_FOLDERS.items() if folder == parts[0]), None)
+    if field is None:
+        return False
+    # Direct uploads sit under the uploader's id until they are processed
+    if len(parts) == 3 and parts[1] == str(user.pk):
+        return True
+
+    url = settings.MEDIA_URL.rstrip('/') + '/' + name
+    matches = Q()
+    for variant_field in variant_fields(field).values():
+        matches |= Q(**{variant_field: url})
+    if field == 'proof_photo_url':
+        return CertificateRequest.objects.filter(matches, user=user).exists()
+    return User.objects.filter(matches, pk=user.pk).exists()
+
+
+def media_response(name):
+    """Response sending a stored file, offloaded to the front server when configured"""
+    try:
+        full_path = default_storage.path(name)
+    except Exception:
+        raise Http404("File not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found.")
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+    if accel_prefix:
+        # The internal location maps onto MEDIA_ROOT; the on-disk path
+        # includes the shard directories
+        relative_path = os.path.relpath(full_path, default_storage.location).replace('\\', '/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(relative_path)
+    elif getattr(settings, 'MEDIA_X_SENDFILE', False):
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    response['Cache-Control'] = MEDIA_CACHE_CONTROL
+    return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+def seed_request_id_sequences(apps, schema_editor):
+    """Start each year's counter at the highest REQ-YYYY-NNNN already issued."""
+    CertificateRequest = apps.get_model('accounts', 'CertificateRequest')
+    RequestIdSequence = apps.get_model('accounts', 'RequestIdSequence')
+
+    highest = {}
+    for request_id in CertificateRequest.objects.values_list('request_id', flat=True).iterator():
+        parts = (request_id or '').split('-')
+        if len(parts) != 3 or parts[0] != 'REQ':
+            continue
+        try:
+            year, number = int(parts[1]), int(parts[2])
+        except ValueError:
+            continue
+        highest[year] = max(highest.get(year, 0), number)
+
+    RequestIdSequence.objects.bulk_create(
+        [RequestIdSequence(year=year, last_value=number) for year, number in highest.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_alter_certificaterequest_claim_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestIdSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_request_id_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_requestidsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='announcements_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['is_active', 'created_at'], name='accounts_an_is_acti_f2d07c_idx'),
+        ),
+    ]
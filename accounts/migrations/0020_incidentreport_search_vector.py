@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:40
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_trigger(apps, schema_editor):
+    """Keep incidentreport.search_vector current and GIN-indexed (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        CREATE TRIGGER accounts_incidentreport_search_vector_update
+        BEFORE INSERT OR UPDATE OF report_id, incident_type, place, message
+        ON accounts_incidentreport
+        FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger(
+            search_vector, 'pg_catalog.simple', report_id, incident_type, place, message
+        )
+    """)
+    schema_editor.execute("""
+        UPDATE accounts_incidentreport SET search_vector = to_tsvector(
+            'pg_catalog.simple',
+            coalesce(report_id, '') || ' ' || coalesce(incident_type, '') || ' ' ||
+            coalesce(place, '') || ' ' || coalesce(message, '')
+        )
+    """)
+    schema_editor.execute(
+        "CREATE INDEX accounts_incidentreport_search_gin "
+        "ON accounts_incidentreport USING gin (search_vector)"
+    )
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS accounts_incidentreport_search_gin")
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS accounts_incidentreport_search_vector_update ON accounts_incidentreport"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_announcement_read_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incidentreport',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
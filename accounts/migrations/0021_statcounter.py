@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_incidentreport_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=32)),
+                ('dimension', models.CharField(max_length=50)),
+                ('value', models.CharField(max_length=50)),
+                ('total', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'dimension', 'value'), name='accounts_statcounter_key')],
+            },
+        ),
+    ]
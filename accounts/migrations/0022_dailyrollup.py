@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_statcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollupProgress',
+            fields=[
+                ('metric', models.CharField(choices=[('certificate_requests', 'Certificate requests per type'), ('payments', 'Paid revenue per payment mode'), ('incidents', 'Incident reports per type')], max_length=30, primary_key=True, serialize=False)),
+                ('last_day', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('certificate_requests', 'Certificate requests per type'), ('payments', 'Paid revenue per payment mode'), ('incidents', 'Incident reports per type')], max_length=30)),
+                ('day', models.DateField()),
+                ('key', models.CharField(max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'ordering': ['metric', 'day', 'key'],
+                'constraints': [models.UniqueConstraint(fields=('metric', 'day', 'key'), name='accounts_dailyrollup_key')],
+            },
+        ),
+    ]
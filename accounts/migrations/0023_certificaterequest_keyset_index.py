@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='certificaterequest',
+            index=models.Index(fields=['created_at', 'id'], name='accounts_ce_created_10fde2_idx'),
+        ),
+    ]
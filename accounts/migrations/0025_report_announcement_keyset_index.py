@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_user_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['created_at', 'id'], name='accounts_an_created_585dbb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidentreport',
+            index=models.Index(fields=['created_at', 'id'], name='accounts_in_created_a02916_idx'),
+        ),
+    ]
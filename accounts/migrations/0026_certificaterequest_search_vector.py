@@ -0,0 +1,98 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:27
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_triggers(apps, schema_editor):
+    """
+    Keep certificaterequest.search_vector current and GIN-indexed (PostgreSQL only).
+    The requester's name lives on accounts_user, so a second trigger refreshes
+    a user's requests when their name changes.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        CREATE FUNCTION accounts_certificaterequest_search_document(req accounts_certificaterequest)
+        RETURNS tsvector LANGUAGE sql STABLE AS $$
+            SELECT
+                setweight(to_tsvector('pg_catalog.simple', coalesce(req.request_id, '')), 'A') ||
+                setweight(to_tsvector('pg_catalog.simple',
+                    coalesce((SELECT u.full_name || ' ' || u.username FROM accounts_user u WHERE u.id = req.user_id), '') ||
+                    ' ' || coalesce(req.business_name, '')
+                ), 'B') ||
+                setweight(to_tsvector('pg_catalog.simple', coalesce(req.purpose, '')), 'C')
+        $$
+    """)
+    schema_editor.execute("""
+        CREATE FUNCTION accounts_certificaterequest_search_vector_update()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector := accounts_certificaterequest_search_document(NEW);
+            RETURN NEW;
+        END
+        $$
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER accounts_certificaterequest_search_vector_update
+        BEFORE INSERT OR UPDATE OF request_id, purpose, business_name, user_id
+        ON accounts_certificaterequest
+        FOR EACH ROW EXECUTE FUNCTION accounts_certificaterequest_search_vector_update()
+    """)
+    schema_editor.execute("""
+        CREATE FUNCTION accounts_user_certificate_search_refresh()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE accounts_certificaterequest SET user_id = user_id WHERE user_id = NEW.id;
+            RETURN NULL;
+        END
+        $$
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER accounts_user_certificate_search_refresh
+        AFTER UPDATE OF full_name, username ON accounts_user
+        FOR EACH ROW
+        WHEN (OLD.full_name IS DISTINCT FROM NEW.full_name OR OLD.username IS DISTINCT FROM NEW.username)
+        EXECUTE FUNCTION accounts_user_certificate_search_refresh()
+    """)
+    schema_editor.execute("""
+        UPDATE accounts_certificaterequest req
+        SET search_vector = accounts_certificaterequest_search_document(req)
+    """)
+    schema_editor.execute(
+        "CREATE INDEX accounts_certificaterequest_search_gin "
+        "ON accounts_certificaterequest USING gin (search_vector)"
+    )
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS accounts_certificaterequest_search_gin")
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS accounts_user_certificate_search_refresh ON accounts_user"
+    )
+    schema_editor.execute("DROP FUNCTION IF EXISTS accounts_user_certificate_search_refresh()")
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS accounts_certificaterequest_search_vector_update ON accounts_certificaterequest"
+    )
+    schema_editor.execute("DROP FUNCTION IF EXISTS accounts_certificaterequest_search_vector_update()")
+    schema_editor.execute(
+        "DROP FUNCTION IF EXISTS accounts_certificaterequest_search_document(accounts_certificaterequest)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_report_announcement_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificaterequest',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:33
+
+from django.db import migrations
+
+# Columns searched from the admin users page. Each index is built over
+# UPPER(col::text), the expression Django emits for icontains on PostgreSQL,
+# so both substring and similarity searches can use it.
+TRIGRAM_COLUMNS = ('full_name', 'email', 'username', 'contact_number')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Trigram GIN indexes for admin user search (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f"CREATE INDEX accounts_user_{column}_trgm "
+            f"ON accounts_user USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS accounts_user_{column}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_certificaterequest_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:41
+
+from django.db import migrations
+
+
+def weight_search_vector(apps, schema_editor):
+    """
+    Weight incidentreport.search_vector (report ID > type, place and reporter
+    name > message) and index status and created_at alongside it, so text,
+    status and date-range filters are answered by a single GIN index scan
+    (PostgreSQL only).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS accounts_incidentreport_search_vector_update ON accounts_incidentreport"
+    )
+    schema_editor.execute("""
+        CREATE FUNCTION accounts_incidentreport_search_vector_update()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('pg_catalog.simple', coalesce(NEW.report_id, '')), 'A') ||
+                setweight(to_tsvector('pg_catalog.simple',
+                    coalesce(NEW.incident_type, '') || ' ' || coalesce(NEW.place, '') || ' ' ||
+                    coalesce((SELECT u.full_name || ' ' || u.username FROM accounts_user u WHERE u.id = NEW.user_id), '')
+                ), 'B') ||
+                setweight(to_tsvector('pg_catalog.simple', coalesce(NEW.message, '')), 'C');
+            RETURN NEW;
+        END
+        $$
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER accounts_incidentreport_search_vector_update
+        BEFORE INSERT OR UPDATE OF report_id, incident_type, place, message, user_id
+        ON accounts_incidentreport
+        FOR EACH ROW EXECUTE FUNCTION accounts_incidentreport_search_vector_update()
+    """)
+    schema_editor.execute("""
+        CREATE FUNCTION accounts_user_incident_search_refresh()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE accounts_incidentreport SET user_id = user_id WHERE user_id = NEW.id;
+            RETURN NULL;
+        END
+        $$
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER accounts_user_incident_search_refresh
+        AFTER UPDATE OF full_name, username ON accounts_user
+        FOR EACH ROW
+        WHEN (OLD.full_name IS DISTINCT FROM NEW.full_name OR OLD.username IS DISTINCT FROM NEW.username)
+        EXECUTE FUNCTION accounts_user_incident_search_refresh()
+    """)
+    # Fire the new trigger once for every existing row
+    schema_editor.execute("UPDATE accounts_incidentreport SET report_id = report_id")
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    schema_editor.execute("DROP INDEX IF EXISTS accounts_incidentreport_search_gin")
+    schema_editor.execute(
+        "CREATE INDEX accounts_incidentreport_search_gin "
+        "ON accounts_incidentreport USING gin (search_vector, status, created_at)"
+    )
+
+
+def unweight_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS accounts_incidentreport_search_gin")
+    schema_editor.execute(
+        "CREATE INDEX accounts_incidentreport_search_gin "
+        "ON accounts_incidentreport USING gin (search_vector)"
+    )
+    schema_editor.execute("DROP TRIGGER IF EXISTS accounts_user_incident_search_refresh ON accounts_user")
+    schema_editor.execute("DROP FUNCTION IF EXISTS accounts_user_incident_search_refresh()")
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS accounts_incidentreport_search_vector_update ON accounts_incidentreport"
+    )
+    schema_editor.execute("DROP FUNCTION IF EXISTS accounts_incidentreport_search_vector_update()")
+    schema_editor.execute("""
+        CREATE TRIGGER accounts_incidentreport_search_vector_update
+        BEFORE INSERT OR UPDATE OF report_id, incident_type, place, message
+        ON accounts_incidentreport
+        FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger(
+            search_vector, 'pg_catalog.simple', report_id, incident_type, place, message
+        )
+    """)
+    schema_editor.execute("UPDATE accounts_incidentreport SET report_id = report_id")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0027_user_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(weight_search_vector, unweight_search_vector),
+    ]
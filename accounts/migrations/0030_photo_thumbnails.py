@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0029_pendingupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificaterequest',
+            name='proof_photo_medium_url',
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificaterequest',
+            name='proof_photo_small_url',
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_photo_medium_url',
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_photo_small_url',
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='resident_id_photo_medium_url',
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='resident_id_photo_small_url',
+            field=models.URLField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0030_photo_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingupload',
+            name='source_key',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='pendingupload',
+            name='spool_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
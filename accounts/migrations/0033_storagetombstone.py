@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0032_storedobject'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_name', models.CharField(max_length=63)),
+                ('key', models.CharField(max_length=255)),
+                ('kind', models.CharField(choices=[('release', 'Release reference'), ('orphan', 'Orphaned object')], default='release', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['next_attempt_at'], name='accounts_st_next_at_e62e7a_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 from django.conf import settings
 import secrets
@@ -7,7 +8,60 @@ import string
 import uuid
 
 
-class User(AbstractUser):
+class CountedModelMixin:
+    """
+    Keeps StatCounter rows in step with the model's status fields.
+
+    Subclasses list the fields their counters depend on in COUNTER_FIELDS and
+    implement counter_keys(), returning the (scope, dimension, value) keys the
+    row contributes to. save() locks the stored row, reads its counted fields
+    and applies the difference between its keys and the keys being written,
+    inside the same transaction as the row itself, so stale copies of an
+    object never count a change twice. Deletions are handled by delete
+    signals, which also read the stored row, so cascades are counted too.
+    """
+    COUNTER_FIELDS = ()
+
+    def counter_keys(self):
+        raise NotImplementedError
+
+    def _counted_attnames(self):
+        return {self._meta.get_field(name).attname for name in self.COUNTER_FIELDS}
+
+    def _locked_stored_copy(self):
+        """The row's counted fields as currently stored, locked until the transaction ends; None if there is no row"""
+        if self._state.adding:
+            return None
+        return type(self)._base_manager.select_for_update().only(*self.COUNTER_FIELDS).filter(pk=self.pk).first()
+
+    def stored_counter_keys(self):
+        """Counter keys of the row as currently stored (none if it is gone), locking it"""
+        stored = self._locked_stored_copy()
+        return stored.counter_keys() if stored else []
+
+    def save(self, *args, **kwargs):
+        counted = self._counted_attnames()
+        update_fields = kwargs.get('update_fields')
+        written = None if update_fields is None else {self._meta.get_field(name).attname for name in update_fields}
+        if written is not None and not counted & written:
+            # Nothing counted is written
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            stored = self._locked_stored_copy()
+            old_keys = stored.counter_keys() if stored else []
+            super().save(*args, **kwargs)
+            if stored is None or written is None:
+                new_keys = self.counter_keys()
+            else:
+                # Counted fields left out of update_fields keep their stored values
+                for attname in counted & written:
+                    setattr(stored, attname, getattr(self, attname))
+                new_keys = stored.counter_keys()
+            StatCounter.apply_changes(old_keys, new_keys)
+
+
+class User(CountedModelMixin, AbstractUser):
     full_name = models.CharField(max_length=255)
     email = models.EmailField(unique=True)
     contact_number = models.CharField(max_length=20)
@@ -22,18 +76,43 @@ class User(AbstractUser):
 
     profile_photo_url = models.URLField(blank=True, null=True)
     resident_id_photo_url = models.URLField(blank=True, null=True)
+    # Thumbnails written by image_utils alongside the size-capped main image
+    profile_photo_medium_url = models.URLField(blank=True, null=True)
+    profile_photo_small_url = models.URLField(blank=True, null=True)
+    resident_id_photo_medium_url = models.URLField(blank=True, null=True)
+    resident_id_photo_small_url = models.URLField(blank=True, null=True)
 
     resident_confirmation = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
+
+    # Announcements created after this are unread for the user
+    announcements_seen_at = models.DateTimeField(blank=True, null=True)
     
     REQUIRED_FIELDS = ["email", "full_name", "contact_number", "date_of_birth"]
     civil_status = models.CharField(max_length=20, blank=True, null=True, choices=[
         ('Single','Single'), ('Married','Married'), ('Widowed','Widowed'), ('Separated','Separated'),
     ])
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination of the admin users list
+            models.Index(fields=['date_joined', 'id']),
+        ]
+
     def __str__(self):
         return self.username
 
+    COUNTER_FIELDS = ('is_staff', 'is_superuser', 'resident_confirmation')
+
+    def counter_keys(self):
+        keys = []
+        if not self.is_staff:
+            verification = 'verified' if self.resident_confirmation else 'pending'
+            keys.append((StatCounter.GLOBAL, 'resident_verification', verification))
+        if self.is_superuser:
+            keys.append((StatCounter.GLOBAL, 'role', 'admin'))
+        return keys
+
 
 class PasswordResetCode(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -70,7 +149,62 @@ class PasswordResetCode(models.Model):
         return f"Reset code for {self.user.email}: {self.code}"
 
 
-class CertificateRequest(models.Model):
+class RequestIdSequence(models.Model):
+    """Per-year counter backing the REQ-YYYY-NNNN certificate request IDs."""
+    year = models.PositiveIntegerField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"REQ-{self.year}: {self.last_value}"
+
+    @classmethod
+    def next_value(cls, year):
+        """
+        Reserve and return the next number for the given year.
+
+        PostgreSQL and SQLite do this in a single upsert statement, so the
+        increment is atomic across workers and nodes without any retry loop.
+        Other backends fall back to a row lock inside a transaction.
+        """
+        from django.db import connection, transaction
+
+        if connection.vendor in ('postgresql', 'sqlite'):
+            table = connection.ops.quote_name(cls._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (year, last_value, updated_at) VALUES (%s, 1, %s) "
+                    f"ON CONFLICT (year) DO UPDATE SET last_value = {table}.last_value + 1, "
+                    f"updated_at = EXCLUDED.updated_at "
+                    f"RETURNING last_value",
+                    [year, connection.ops.adapt_datetimefield_value(timezone.now())],
+                )
+                return cursor.fetchone()[0]
+
+        with transaction.atomic():
+            sequence, _ = cls.objects.select_for_update().get_or_create(year=year)
+            sequence.last_value = models.F('last_value') + 1
+            sequence.save(update_fields=['last_value', 'updated_at'])
+            sequence.refresh_from_db(fields=['last_value'])
+            return sequence.last_value
+
+    @classmethod
+    def highest_issued(cls, year):
+        """Return the highest REQ-<year>-NNNN number already stored, or 0."""
+        prefix = f"REQ-{year}-"
+        highest = 0
+        request_ids = CertificateRequest.objects.filter(
+            request_id__startswith=prefix
+        ).values_list('request_id', flat=True)
+        for request_id in request_ids.iterator():
+            try:
+                highest = max(highest, int(request_id[len(prefix):]))
+            except ValueError:
+                continue
+        return highest
+
+
+class CertificateRequest(CountedModelMixin, models.Model):
     CERTIFICATE_TYPES = [
         ('barangay_clearance', 'Barangay Clearance'),
         ('residency', 'Certificate of Residency'),
@@ -108,6 +242,8 @@ class CertificateRequest(models.Model):
     
     # UPDATED: Changed from BinaryField to URLField for Supabase Storage
     proof_photo_url = models.URLField(blank=True, null=True)
+    proof_photo_medium_url = models.URLField(blank=True, null=True)
+    proof_photo_small_url = models.URLField(blank=True, null=True)
     
     # Business Details
     business_name = models.CharField(max_length=255, blank=True, null=True)
@@ -130,6 +266,10 @@ class CertificateRequest(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     paid_at = models.DateTimeField(blank=True, null=True)
     claimed_at = models.DateTimeField(blank=True, null=True)
+
+    # Weighted full-text search document (request ID, requester, business,
+    # purpose), maintained by database triggers on PostgreSQL
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
@@ -137,55 +277,33 @@ class CertificateRequest(models.Model):
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['payment_status']),
             models.Index(fields=['certificate_type']),
+            models.Index(fields=['created_at', 'id']),
         ]
     
     def save(self, *args, **kwargs):
         if not self.request_id:
-            # Generate unique request ID (e.g., REQ-2025-0001)
+            # Generate unique request ID (e.g., REQ-2025-0001) from the per-year counter
             from django.utils import timezone
-            import random
             year = timezone.now().year
-            
-            # Try to generate a unique request ID with retry logic
-            max_attempts = 100
-            for attempt in range(max_attempts):
-                # Get the highest existing number for this year
-                existing_requests = CertificateRequest.objects.filter(
-                    request_id__startswith=f"REQ-{year}-"
-                ).order_by('-request_id').first()
-                
-                if existing_requests:
-                    # Extract the number from the last request ID
-                    try:
-                        last_number = int(existing_requests.request_id.split('-')[-1])
-                        next_number = last_number + 1
-                    except (ValueError, IndexError):
-                        next_number = 1
-                else:
-                    next_number = 1
-                
-                # Add some randomness to avoid collisions in concurrent requests
-                if attempt > 0:
-                    next_number += random.randint(1, 10)
-                
-                self.request_id = f"REQ-{year}-{next_number:04d}"
-                
-                # Check if this ID already exists
-                if not CertificateRequest.objects.filter(request_id=self.request_id).exists():
-                    break
-            else:
-                # If we couldn't generate a unique ID after max_attempts, use timestamp
-                import time
-                timestamp = int(time.time() * 1000) % 10000
-                self.request_id = f"REQ-{year}-{timestamp:04d}"
+            next_number = RequestIdSequence.next_value(year)
+            self.request_id = f"REQ-{year}-{next_number:04d}"
         
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.request_id} - {self.get_certificate_type_display()}"
 
+    COUNTER_FIELDS = ('user', 'payment_status', 'claim_status')
 
-class IncidentReport(models.Model):
+    def counter_keys(self):
+        keys = []
+        for scope in (StatCounter.GLOBAL, StatCounter.user_scope(self.user_id)):
+            keys.append((scope, 'certificate_payment_status', self.payment_status))
+            keys.append((scope, 'certificate_claim_status', self.claim_status))
+        return keys
+
+
+class IncidentReport(CountedModelMixin, models.Model):
     REPORT_TYPES = [
         ('Theft', 'Theft'),
         ('Assault', 'Assault'),
@@ -209,11 +327,16 @@ class IncidentReport(models.Model):
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Weighted full-text search document (report ID, type, place and reporter,
+    # message), maintained by database triggers on PostgreSQL
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['status']),
+            models.Index(fields=['created_at', 'id']),
         ]
 
     def save(self, *args, **kwargs):
@@ -223,6 +346,14 @@ class IncidentReport(models.Model):
 
     def __str__(self):
         return f"{self.report_id} - {self.incident_type}"
+
+    COUNTER_FIELDS = ('user', 'status')
+
+    def counter_keys(self):
+        return [
+            (StatCounter.GLOBAL, 'report_status', self.status),
+            (StatCounter.user_scope(self.user_id), 'report_status', self.status),
+        ]
     
 
 
@@ -247,7 +378,308 @@ class Announcement(models.Model):
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['is_active', 'created_at']),
+            models.Index(fields=['created_at', 'id']),
         ]
     
+    ACTIVE_COUNT_CACHE_KEY = 'announcements:active_count'
+    COUNTS_VERSION_CACHE_KEY = 'announcements:version'
+    # Signals invalidate the shared cache; the timeout bounds staleness when
+    # each worker has its own memory cache
+    COUNT_CACHE_TIMEOUT = 300
+
     def __str__(self):
-        return f"{self.title} - {self.created_at.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"{self.title} - {self.created_at.strftime('%Y-%m-%d')}"
+
+    @classmethod
+    def active_count(cls):
+        """Number of active announcements, served from cache until an announcement changes"""
+        from django.core.cache import cache
+        count = cache.get(cls.ACTIVE_COUNT_CACHE_KEY)
+        if count is None:
+            count = cls.objects.filter(is_active=True).count()
+            cache.set(cls.ACTIVE_COUNT_CACHE_KEY, count, cls.COUNT_CACHE_TIMEOUT)
+        return count
+
+    @classmethod
+    def unread_count_for(cls, user):
+        """
+        Active announcements created after the user's read watermark.
+        A single range count over (is_active, created_at), cached per user
+        and per announcement version.
+        """
+        from django.core.cache import cache
+        seen_at = user.announcements_seen_at
+        if seen_at is None:
+            return cls.active_count()
+
+        version = cache.get_or_set(cls.COUNTS_VERSION_CACHE_KEY, 1, None)
+        key = f"announcements:unread:{user.pk}:{version}:{seen_at.timestamp()}"
+        count = cache.get(key)
+        if count is None:
+            count = cls.objects.filter(is_active=True, created_at__gt=seen_at).count()
+            cache.set(key, count, cls.COUNT_CACHE_TIMEOUT)
+        return count
+
+    @classmethod
+    def mark_seen(cls, user):
+        """Advance the user's read watermark to now"""
+        user.announcements_seen_at = timezone.now()
+        User.objects.filter(pk=user.pk).update(announcements_seen_at=user.announcements_seen_at)
+
+    @classmethod
+    def invalidate_cached_counts(cls):
+        """Drop cached counts; call after bulk updates that skip model signals"""
+        import time
+        from django.core.cache import cache
+        cache.delete(cls.ACTIVE_COUNT_CACHE_KEY)
+        cache.set(cls.COUNTS_VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+class StatCounter(models.Model):
+    """
+    Denormalized row counts keyed by (scope, dimension, value), e.g.
+    ('global', 'certificate_payment_status', 'pending') or
+    ('user:42', 'report_status', 'Resolved').
+
+    Maintained by CountedModelMixin; rebuild with `manage.py recount`.
+    """
+    GLOBAL = 'global'
+
+    scope = models.CharField(max_length=32)
+    dimension = models.CharField(max_length=50)
+    value = models.CharField(max_length=50)
+    total = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'dimension', 'value'], name='accounts_statcounter_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.dimension}={self.value}: {self.total}"
+
+    @staticmethod
+    def user_scope(user_id):
+        return f"user:{user_id}"
+
+    @classmethod
+    def apply_changes(cls, old_keys, new_keys):
+        """Decrement counters for old_keys and increment them for new_keys"""
+        deltas = {}
+        for key in old_keys:
+            deltas[key] = deltas.get(key, 0) - 1
+        for key in new_keys:
+            deltas[key] = deltas.get(key, 0) + 1
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if deltas:
+            # Sorted so concurrent transactions lock rows in the same order
+            cls.increment(sorted(deltas.items()))
+
+    @classmethod
+    def increment(cls, deltas):
+        """Add each delta to its counter row, creating missing rows, in one statement"""
+        from django.db import connection
+
+        if connection.vendor in ('postgresql', 'sqlite'):
+            table = connection.ops.quote_name(cls._meta.db_table)
+            rows = ', '.join(['(%s, %s, %s, %s)'] * len(deltas))
+            params = [part for (scope, dimension, value), delta in deltas for part in (scope, dimension, value, delta)]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (scope, dimension, value, total) VALUES {rows} "
+                    f"ON CONFLICT (scope, dimension, value) DO UPDATE SET total = {table}.total + EXCLUDED.total",
+                    params,
+                )
+            return
+
+        with transaction.atomic():
+            for (scope, dimension, value), delta in deltas:
+                counter, _ = cls.objects.select_for_update().get_or_create(
+                    scope=scope, dimension=dimension, value=value,
+                )
+                counter.total = models.F('total') + delta
+                counter.save(update_fields=['total'])
+
+    @classmethod
+    def read(cls, scope):
+        """Return {dimension: {value: total}} for every counter in the scope, in one query"""
+        counters = {}
+        rows = cls.objects.filter(scope=scope).values_list('dimension', 'value', 'total')
+        for dimension, value, total in rows:
+            counters.setdefault(dimension, {})[value] = total
+        return counters
+
+
+class DailyRollup(models.Model):
+    """
+    Per-day totals for trend charts, filled by `manage.py rollup_daily`.
+    `key` is the certificate_type, payment_mode or incident_type of the metric.
+    """
+    METRICS = [
+        ('certificate_requests', 'Certificate requests per type'),
+        ('payments', 'Paid revenue per payment mode'),
+        ('incidents', 'Incident reports per type'),
+    ]
+
+    metric = models.CharField(max_length=30, choices=METRICS)
+    day = models.DateField()
+    key = models.CharField(max_length=50)
+    count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['metric', 'day', 'key']
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'day', 'key'], name='accounts_dailyrollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.day} {self.key}: {self.count}"
+
+
+class DailyRollupProgress(models.Model):
+    """Last fully rolled-up day per metric, so each run only processes new days"""
+    metric = models.CharField(max_length=30, primary_key=True, choices=DailyRollup.METRICS)
+    last_day = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.metric} through {self.last_day}"
+
+
+class StoredObject(models.Model):
+    """
+    Index of uploaded files, which are named by the SHA-256 of their bytes.
+    Identical uploads share one stored object; ref_count is the number of
+    saved URLs pointing at it. Maintained by storage_utils, which removes the
+    object when the last reference is deleted.
+    """
+    bucket_name = models.CharField(max_length=63)
+    path = models.CharField(max_length=255)
+    sha256 = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bucket_name', 'path'], name='accounts_storedobject_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket_name}/{self.path} ({self.ref_count} refs)"
+
+
+class StorageTombstone(models.Model):
+    """
+    A stored object waiting to be deleted. Recorded in the same transaction
+    as the change that stopped using it and removed in bulk by
+    `manage.py sweep_storage`, which retries failed removals.
+    """
+    KIND_CHOICES = [
+        # Drop one reference; the object goes once none are left
+        ('release', 'Release reference'),
+        # Found by reconciliation; removed only if still unreferenced
+        ('orphan', 'Orphaned object'),
+    ]
+
+    bucket_name = models.CharField(max_length=63)
+    key = models.CharField(max_length=255)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='release')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket_name}/{self.key} ({self.kind})"
+
+
+class PendingUpload(models.Model):
+    """
+    A user upload waiting to be normalized and stored. Processed by
+    upload_utils, which writes the resulting URLs to `field` and its
+    thumbnail fields on the user (or on `certificate_request` for proof photos).
+    """
+    FIELDS = [
+        ('profile_photo_url', 'Profile photo'),
+        ('resident_id_photo_url', 'Resident ID photo'),
+        ('proof_photo_url', 'Indigency proof photo'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('superseded', 'Superseded'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pending_uploads')
+    certificate_request = models.ForeignKey(
+        CertificateRequest, on_delete=models.CASCADE, blank=True, null=True, related_name='pending_uploads',
+    )
+    field = models.CharField(max_length=30, choices=FIELDS)
+    # Either a file in the local spool or an object the browser uploaded
+    # straight to storage through a signed URL
+    spool_name = models.CharField(max_length=255, blank=True)
+    source_key = models.CharField(max_length=255, blank=True)
+    original_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['user', 'field', '-id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_field_display()} for {self.user_id}: {self.status}"
+
+    # Only "nothing in flight" is cached, so pages never show a finished
+    # upload as processing; queue_upload clears the entry
+    IDLE_CACHE_TIMEOUT = 300
+
+    @staticmethod
+    def idle_cache_key(user_id):
+        return f"uploads:idle:{user_id}"
+
+    @classmethod
+    def states_for(cls, user, certificate_request=None):
+        """
+        Map each field with an unfinished upload to 'processing' or 'failed',
+        going by the latest upload for that field
+        """
+        from django.core.cache import cache
+        key = cls.idle_cache_key(user.pk) if certificate_request is None else None
+        if key and cache.get(key):
+            return {}
+
+        uploads = cls.objects.filter(user=user, certificate_request=certificate_request).exclude(status='superseded')
+        states = {}
+        for field, status in uploads.order_by('field', '-id').values_list('field', 'status'):
+            if field in states:
+                continue
+            states[field] = {'pending': 'processing', 'processing': 'processing', 'failed': 'failed'}.get(status)
+        states = {field: state for field, state in states.items() if state}
+
+        if key and not states:
+            cache.set(key, True, cls.IDLE_CACHE_TIMEOUT)
+        return states
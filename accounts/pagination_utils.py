@@ -0,0 +1,193 @@
+"""
+Keyset (cursor) pagination utilities.
+Pages are addressed by the sort key of their first/last row instead of an
+OFFSET, so every page costs one bounded index range scan no matter how deep
+the admin has paged.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, models
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+PAGE_SIZE_CHOICES = (10, 25, 50, 100)
+COUNT_CAP = 1000
+# Above this many rows the planner's estimate is shown instead of an exact count
+ESTIMATE_THRESHOLD = 10000
+
+
+class KeysetPage:
+    """One page of rows plus the cursors and query strings to reach its neighbours"""
+
+    def __init__(self, items, page_size, next_cursor, prev_cursor, params):
+        self.items = items
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self._params = params
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    @property
+    def next_query(self):
+        return self._query(self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self._query(self.prev_cursor)
+
+    @property
+    def first_query(self):
+        return self._query(None)
+
+    @property
+    def exact_count_query(self):
+        params = self._params.copy()
+        params['exact'] = '1'
+        return params.urlencode()
+
+    def _query(self, cursor):
+        params = self._params.copy()
+        params.pop('cursor', None)
+        if cursor:
+            params['cursor'] = cursor
+        return params.urlencode()
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """?page_size= clamped to the smallest choice and `maximum`"""
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        return default
+    return max(PAGE_SIZE_CHOICES[0], min(page_size, maximum))
+
+
+def encode_cursor(direction, values):
+    payload = [direction] + [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, fields):
+    """Return (direction, values) for a cursor string, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        direction, raw_values = payload[0], payload[1:]
+        if direction not in ('next', 'prev') or len(raw_values) != len(fields):
+            return None
+        values = []
+        for name, raw in zip(fields, raw_values):
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Annotations such as a search rank are numeric JSON values
+                if not isinstance(raw, (int, float)):
+                    return None
+                values.append(raw)
+                continue
+            values.append(datetime.fromisoformat(raw) if isinstance(field, models.DateTimeField) else field.to_python(raw))
+        return direction, values
+    except (ValueError, TypeError, IndexError, binascii.Error, json.JSONDecodeError):
+        return None
+
+
+def _beyond(fields, values, descending):
+    """
+    Rows strictly after the cursor in the given direction, e.g. for
+    descending (created_at, id): created_at <= c AND (created_at < c OR id < i).
+    The leading bound lets the database use a range scan on the first column.
+    """
+    op = 'lt' if descending else 'gt'
+    condition = Q()
+    for position, name in enumerate(fields):
+        term = Q(**{f'{name}__{op}': values[position]})
+        for previous in range(position):
+            term &= Q(**{fields[previous]: values[previous]})
+        condition |= term
+    bound = Q(**{f"{fields[0]}__{'lte' if descending else 'gte'}": values[0]})
+    return bound & condition
+
+
+def keyset_paginate(queryset, request, fields=('created_at', 'id'), page_size=None):
+    """
+    Paginate `queryset` newest-first on `fields` using the request's
+    `cursor` and `page_size` GET parameters.
+    """
+    page_size = page_size or get_page_size(request)
+    cursor = decode_cursor(request.GET.get('cursor'), queryset.model, fields)
+    descending_order = [f'-{name}' for name in fields]
+    ascending_order = list(fields)
+
+    if cursor and cursor[0] == 'prev':
+        rows = list(queryset.filter(_beyond(fields, cursor[1], descending=False)).order_by(*ascending_order)[:page_size + 1])
+        has_more_before = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_more_after = True
+    else:
+        if cursor:
+            queryset = queryset.filter(_beyond(fields, cursor[1], descending=True))
+        rows = list(queryset.order_by(*descending_order)[:page_size + 1])
+        has_more_after = len(rows) > page_size
+        rows = rows[:page_size]
+        has_more_before = cursor is not None
+
+    def key(row):
+        return [getattr(row, name) for name in fields]
+
+    next_cursor = encode_cursor('next', key(rows[-1])) if rows and has_more_after else None
+    prev_cursor = encode_cursor('prev', key(rows[0])) if rows and has_more_before else None
+    return KeysetPage(rows, page_size, next_cursor, prev_cursor, request.GET)
+
+
+def capped_count(queryset, cap=COUNT_CAP):
+    """
+    Count matching rows but stop after `cap`; returns (count, is_capped).
+    Bounds the cost of showing a total on very large filtered sets.
+    """
+    count = queryset.order_by().values('pk')[:cap + 1].count()
+    return min(count, cap), count > cap
+
+
+def planner_estimate(queryset):
+    """Row estimate from the PostgreSQL planner for `queryset`, or None on other databases"""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+    except (ValueError, TypeError):
+        return None
+    if isinstance(plan, list):
+        plan = plan[0]
+    return int(plan['Plan']['Plan Rows'])
+
+
+def estimated_count(queryset, threshold=ESTIMATE_THRESHOLD, exact=False):
+    """
+    Count matching rows, trusting the planner's estimate once it exceeds
+    `threshold`; returns (count, is_estimate). `exact` always runs COUNT(*).
+    """
+    if not exact:
+        estimate = planner_estimate(queryset)
+        if estimate is not None and estimate > threshold:
+            return estimate, True
+    return queryset.count(), False
@@ -0,0 +1,104 @@
+"""
+Daily rollup utilities.
+Aggregates certificate requests, paid revenue and incident reports into
+one DailyRollup row per (metric, day, key), and reads them back as
+zero-filled series for dashboard charts, counting today live.
+"""
+
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CertificateRequest, DailyRollup, IncidentReport
+
+METRIC_SOURCES = {
+    # metric: (queryset, timestamp field, key field, summed field)
+    'certificate_requests': (CertificateRequest.objects.all(), 'created_at', 'certificate_type', None),
+    'payments': (CertificateRequest.objects.filter(payment_status='paid'), 'paid_at', 'payment_mode', 'payment_amount'),
+    'incidents': (IncidentReport.objects.all(), 'created_at', 'incident_type', None),
+}
+UNSPECIFIED_KEY = 'unspecified'
+
+
+def local_day_bounds(start_day, end_day):
+    """Aware datetimes covering start_day 00:00 up to (not including) the day after end_day"""
+    start = timezone.make_aware(datetime.datetime.combine(start_day, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(end_day + datetime.timedelta(days=1), datetime.time.min))
+    return start, end
+
+
+def first_day(metric):
+    """Earliest local day with source data for the metric, or None"""
+    queryset, timestamp_field, _, _ = METRIC_SOURCES[metric]
+    earliest = queryset.aggregate(earliest=Min(timestamp_field))['earliest']
+    return timezone.localdate(earliest) if earliest else None
+
+
+def compute_rollups(metric, start_day, end_day):
+    """Build (unsaved) DailyRollup rows for every day in the inclusive range"""
+    queryset, timestamp_field, key_field, sum_field = METRIC_SOURCES[metric]
+    start, end = local_day_bounds(start_day, end_day)
+    aggregates = {'count': Count('id')}
+    if sum_field:
+        aggregates['amount'] = Sum(sum_field)
+
+    rows = (
+        queryset
+        .filter(**{f'{timestamp_field}__gte': start, f'{timestamp_field}__lt': end})
+        .order_by()
+        .annotate(day=TruncDate(timestamp_field))
+        .values('day', key_field)
+        .annotate(**aggregates)
+    )
+    return [
+        DailyRollup(
+            metric=metric,
+            day=row['day'],
+            key=row[key_field] or UNSPECIFIED_KEY,
+            count=row['count'],
+            amount=row.get('amount') or 0,
+        )
+        for row in rows
+    ]
+
+
+def store_rollups(metric, start_day, end_day):
+    """Replace the metric's rollups for the inclusive day range; returns the row count"""
+    rollups = compute_rollups(metric, start_day, end_day)
+    with transaction.atomic():
+        DailyRollup.objects.filter(metric=metric, day__gte=start_day, day__lte=end_day).delete()
+        DailyRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def read_series(metric, start_day, end_day):
+    """
+    Return chart-ready series for the range from the stored rollups, with
+    today's partial totals counted live:
+    {'labels': [...days], 'series': {key: {'count': [...], 'amount': [...]}}}
+    """
+    days = [start_day + datetime.timedelta(days=offset) for offset in range((end_day - start_day).days + 1)]
+    index = {day: position for position, day in enumerate(days)}
+    series = {}
+
+    # Only completed days are rolled up; today is still changing
+    today = timezone.localdate()
+    rows = list(DailyRollup.objects.filter(
+        metric=metric, day__gte=start_day, day__lte=min(end_day, today - datetime.timedelta(days=1)),
+    ).values_list('day', 'key', 'count', 'amount'))
+    if start_day <= today <= end_day:
+        rows += [(row.day, row.key, row.count, row.amount) for row in compute_rollups(metric, today, today)]
+
+    for day, key, count, amount in rows:
+        if key not in series:
+            series[key] = {'count': [0] * len(days), 'amount': [0.0] * len(days)}
+        series[key]['count'][index[day]] = count
+        series[key]['amount'][index[day]] = float(amount)
+
+    return {
+        'labels': [day.isoformat() for day in days],
+        'series': series,
+    }
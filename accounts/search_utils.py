@@ -0,0 +1,162 @@
+"""
+Text search utilities with optional PostgreSQL full-text support.
+On PostgreSQL, searches run against GIN-indexed tsvector columns that
+database triggers keep current. Other databases (SQLite in local
+development) fall back to icontains scans.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, Q, TextField, Value
+from django.db.models.functions import Cast, Greatest, Upper
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SEARCH_CONFIG = 'simple'
+# User columns covered by the trigram indexes from migration 0027
+USER_SEARCH_FIELDS = ('full_name', 'email', 'username', 'contact_number')
+# Control characters mark highlighted terms in database headlines so the
+# text can be HTML-escaped before <mark> tags are added
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+SNIPPET_CHARS = 160
+
+
+def supports_full_text():
+    """True when the default database can use the tsvector search columns."""
+    return connection.vendor == 'postgresql'
+
+
+def prefix_search_query(text, config=SEARCH_CONFIG):
+    """
+    Build a tsquery that matches every word of `text` as a prefix,
+    e.g. "basketball cour" -> 'basketball:* & cour:*'.
+
+    Returns None when `text` contains no searchable words.
+    """
+    terms = re.findall(r'\w+', text.lower())
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f"{term}:*" for term in terms), config=config, search_type='raw')
+
+
+def search_incident_reports(queryset, text, ranked=False):
+    """
+    Filter incident reports by report ID, type, place, reporter or message.
+
+    With `ranked`, rows are annotated with `search_rank` (constant 0 on the
+    icontains fallback) and, on PostgreSQL, a `search_headline` of the
+    message for incident_snippets().
+    """
+    query = prefix_search_query(text) if supports_full_text() else None
+    if query is not None:
+        queryset = queryset.filter(search_vector=query)
+        if ranked:
+            queryset = queryset.annotate(
+                search_rank=Cast(SearchRank(F('search_vector'), query), output_field=FloatField()),
+                search_headline=SearchHeadline(
+                    'message', query, config=SEARCH_CONFIG,
+                    start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP,
+                    max_words=30, min_words=12, max_fragments=2, fragment_delimiter=' … ',
+                ),
+            )
+        return queryset
+    queryset = queryset.filter(
+        Q(report_id__icontains=text) |
+        Q(incident_type__icontains=text) |
+        Q(place__icontains=text) |
+        Q(user__username__icontains=text) |
+        Q(user__full_name__icontains=text) |
+        Q(message__icontains=text)
+    )
+    if ranked:
+        queryset = queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset
+
+
+def _highlight(text):
+    """HTML-escape a headline and turn its highlight markers into <mark> tags"""
+    return mark_safe(
+        escape(text).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+    )
+
+
+def _fallback_headline(message, text):
+    """A window of `message` around the first searched word, with the words marked"""
+    terms = [term for term in re.findall(r'\w+', text.lower()) if term]
+    lowered = message.lower()
+    first = min((lowered.find(term) for term in terms if term in lowered), default=0)
+    start = max(0, first - SNIPPET_CHARS // 3)
+    window = message[start:start + SNIPPET_CHARS]
+    if terms:
+        pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        window = pattern.sub(lambda match: f'{HIGHLIGHT_START}{match.group(0)}{HIGHLIGHT_STOP}', window)
+    prefix = '… ' if start > 0 else ''
+    suffix = ' …' if start + SNIPPET_CHARS < len(message) else ''
+    return prefix + window + suffix
+
+
+def incident_snippets(reports, text):
+    """Set `search_snippet` (safe HTML with <mark>ed terms) on each report of a page"""
+    for report in reports:
+        headline = getattr(report, 'search_headline', None)
+        if headline is None:
+            headline = _fallback_headline(report.message or '', text)
+        report.search_snippet = _highlight(headline)
+    return reports
+
+
+def search_certificate_requests(queryset, text):
+    """
+    Filter certificate requests by request ID, requester, business name or
+    purpose, annotated with `search_rank` (higher is better). The rank is a
+    constant 0 on the icontains fallback.
+    """
+    query = prefix_search_query(text) if supports_full_text() else None
+    if query is not None:
+        # Cast to double precision so the rank round-trips exactly through
+        # pagination cursors
+        rank = Cast(SearchRank(F('search_vector'), query), output_field=FloatField())
+        return queryset.filter(search_vector=query).annotate(search_rank=rank)
+    return queryset.filter(
+        Q(request_id__icontains=text) |
+        Q(user__username__icontains=text) |
+        Q(user__full_name__icontains=text) |
+        Q(business_name__icontains=text) |
+        Q(purpose__icontains=text)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def _upper_text(name):
+    """UPPER(name::text), the expression the user trigram indexes are built on"""
+    return Upper(Cast(name, output_field=TextField()))
+
+
+def search_users(queryset, text, similar=False):
+    """
+    Filter users by name, email, username or contact number.
+
+    With `similar`, PostgreSQL matches by trigram word similarity, which
+    tolerates typos and spelling variants (the cutoff is the server's
+    pg_trgm.word_similarity_threshold), and annotates `search_rank`. Other
+    databases fall back to substring matching with a constant rank.
+    """
+    if similar and supports_full_text():
+        term = text.upper()
+        aliases = {f'{name}_trgm': _upper_text(name) for name in USER_SEARCH_FIELDS}
+        condition = Q()
+        for name in USER_SEARCH_FIELDS:
+            condition |= Q(**{f'{name}_trgm__trigram_word_similar': term})
+        rank = Greatest(*[TrigramWordSimilarity(Value(term), _upper_text(name)) for name in USER_SEARCH_FIELDS])
+        return queryset.alias(**aliases).filter(condition).annotate(
+            search_rank=Cast(rank, output_field=FloatField())
+        )
+    condition = Q()
+    for name in USER_SEARCH_FIELDS:
+        condition |= Q(**{f'{name}__icontains': text})
+    queryset = queryset.filter(condition)
+    if similar:
+        queryset = queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset
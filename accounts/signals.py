@@ -0,0 +1,40 @@
+"""
+Model signal handlers for Labang Online
+Keeps cached values and counters in sync with the rows they are derived from
+"""
+
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .cleanup_utils import photo_urls, schedule_deletion
+from .models import Announcement, CertificateRequest, IncidentReport, StatCounter, User
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def invalidate_announcement_count(sender, **kwargs):
+    Announcement.invalidate_cached_counts()
+
+
+@receiver(pre_delete, sender=User)
+@receiver(pre_delete, sender=CertificateRequest)
+@receiver(pre_delete, sender=IncidentReport)
+def read_stored_counter_keys(sender, instance, **kwargs):
+    # Runs inside the deletion's transaction; a row that is already gone
+    # (a second delete of a stale copy) decrements nothing
+    instance._deleted_counter_keys = instance.stored_counter_keys()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=CertificateRequest)
+@receiver(post_delete, sender=IncidentReport)
+def decrement_stat_counters(sender, instance, **kwargs):
+    StatCounter.apply_changes(instance._deleted_counter_keys, [])
+    if sender is User:
+        StatCounter.objects.filter(scope=StatCounter.user_scope(instance.pk)).delete()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=CertificateRequest)
+def release_stored_photos(sender, instance, **kwargs):
+    schedule_deletion(photo_urls(instance))
@@ -0,0 +1,85 @@
+"""
+Dashboard statistics utilities.
+Reads the admin dashboard figures from the StatCounter table and caches
+the result as a short-lived snapshot shared by all admins.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import StatCounter
+
+DASHBOARD_STATS_CACHE_KEY = 'dashboard:stats'
+DASHBOARD_STATS_LOCK_KEY = 'dashboard:stats:lock'
+# Seconds a snapshot is considered fresh; stale snapshots are kept around
+# (served while one admin recomputes) for STALE_FACTOR times as long
+DASHBOARD_STATS_TTL = getattr(settings, 'DASHBOARD_STATS_TTL', 30)
+STALE_FACTOR = 10
+LOCK_TIMEOUT = 10
+
+
+def compute_dashboard_stats():
+    """Read the global counters (one small query) and return a flat dict of statistics"""
+    counters = StatCounter.read(StatCounter.GLOBAL)
+    verification = counters.get('resident_verification', {})
+    payment_status = counters.get('certificate_payment_status', {})
+    report_status = counters.get('report_status', {})
+    return {
+        'total_users': sum(verification.values()),
+        'total_admin': counters.get('role', {}).get('admin', 0),
+        'verified_users': verification.get('verified', 0),
+        'pending_verification': verification.get('pending', 0),
+        'total_certificates': sum(payment_status.values()),
+        'pending_payments': payment_status.get('pending', 0),
+        'paid_certificates': payment_status.get('paid', 0),
+        'unpaid_certificates': payment_status.get('unpaid', 0),
+        'total_reports': sum(report_status.values()),
+        'pending_reports': report_status.get('Pending', 0),
+        'under_investigation': report_status.get('Under Investigation', 0),
+        'resolved_reports': report_status.get('Resolved', 0),
+    }
+
+
+def get_dashboard_stats():
+    """
+    Return the cached statistics snapshot as (stats, generated_at).
+
+    When the snapshot expires, only the admin who wins the cache lock
+    recomputes it; everyone else keeps getting the previous snapshot
+    until the new one is stored, or reads the counters directly if there
+    is none yet.
+    """
+    snapshot = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if snapshot and snapshot['fresh_until'] > time.time():
+        return snapshot['stats'], snapshot['generated_at']
+
+    if cache.add(DASHBOARD_STATS_LOCK_KEY, 1, LOCK_TIMEOUT):
+        try:
+            return _refresh_snapshot()
+        finally:
+            cache.delete(DASHBOARD_STATS_LOCK_KEY)
+
+    if snapshot:
+        return snapshot['stats'], snapshot['generated_at']
+
+    # Cold cache while another admin is computing: the counters are one
+    # small query, so reading them beats waiting for the other result
+    return compute_dashboard_stats(), timezone.now()
+
+
+def _refresh_snapshot():
+    stats = compute_dashboard_stats()
+    generated_at = timezone.now()
+    cache.set(
+        DASHBOARD_STATS_CACHE_KEY,
+        {
+            'stats': stats,
+            'generated_at': generated_at,
+            'fresh_until': time.time() + DASHBOARD_STATS_TTL,
+        },
+        DASHBOARD_STATS_TTL * STALE_FACTOR,
+    )
+    return stats, generated_at
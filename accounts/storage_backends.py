@@ -0,0 +1,394 @@
+"""
+Storage backends behind storage_utils.
+Each backend keeps objects by key within one bucket and implements the
+same small interface, so the upload pipeline, the storage sweeper and the
+benchmarks run unchanged against Supabase Storage, local media or an
+in-memory store. settings.STORAGE_BACKEND picks one: 'supabase', 'local',
+'memory', or 'auto' (Supabase when configured, otherwise local media).
+"""
+
+import mimetypes
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+try:
+    from supabase import create_client, Client  # type: ignore
+except Exception:
+    create_client = None
+    Client = None
+
+# Keys per remove call and entries per list page on the storage API
+REMOVE_BATCH_SIZE = 1000
+LIST_PAGE_SIZE = 1000
+
+# One client per key type for the life of the process. Each client keeps an
+# HTTP connection pool, so uploads after the first skip the TCP/TLS setup.
+_supabase_clients = {}
+_supabase_clients_lock = threading.Lock()
+
+
+def get_supabase_client(use_service_key: bool = False):
+    """Return the shared Supabase client for the service or anon key, creating it on first use."""
+    key_type = 'service' if use_service_key else 'anon'
+    client = _supabase_clients.get(key_type)
+    if client is not None:
+        return client
+    with _supabase_clients_lock:
+        client = _supabase_clients.get(key_type)
+        if client is None:
+            client = create_supabase_client(use_service_key)
+            if client is not None:
+                # Build the storage sub-client now so threads never race to create it
+                client.storage
+                _supabase_clients[key_type] = client
+    return client
+
+
+def reset_supabase_client(use_service_key: bool = False):
+    """Drop the shared client for a key type so the next call builds a fresh one."""
+    key_type = 'service' if use_service_key else 'anon'
+    with _supabase_clients_lock:
+        _supabase_clients.pop(key_type, None)
+
+
+def is_auth_error(error):
+    """True for storage errors caused by a rejected or expired key."""
+    status = str(getattr(error, 'status', '') or '')
+    message = str(getattr(error, 'message', error)).lower()
+    return status in ('401', '403') or 'jwt' in message or 'unauthorized' in message
+
+
+def call_storage(operation, use_service_key: bool = True):
+    """
+    Run operation(client) with the shared client. After an auth error the
+    client is re-created (picking up rotated keys) and the call retried once.
+    """
+    client = get_supabase_client(use_service_key)
+    try:
+        return operation(client)
+    except Exception as e:
+        if not is_auth_error(e):
+            raise
+        print(f"Supabase auth error, re-creating client: {e}")
+        reset_supabase_client(use_service_key)
+        client = get_supabase_client(use_service_key)
+        if client is None:
+            raise
+        return operation(client)
+
+
+def create_supabase_client(use_service_key: bool = False):
+    """Initialize Supabase client, preferring env-configured URL if available."""
+    if not create_client:
+        return None
+    project_ref = "egllznsxjgkhnwexidii"
+    # Prefer explicit URL from settings/env; otherwise fall back to project_ref
+    url = (
+        getattr(settings, "SUPABASE_URL", None)
+        or os.environ.get("SUPABASE_URL")
+        or f"https://{project_ref}.supabase.co"
+    )
+
+    # Choose service key for backend uploads, anon key otherwise
+    if use_service_key:
+        key = os.environ.get("SUPABASE_KEY_SERVICE") or getattr(settings, "SUPABASE_KEY_SERVICE", "")
+    else:
+        key = os.environ.get("SUPABASE_KEY") or getattr(settings, "SUPABASE_KEY", "")
+
+    try:
+        return create_client(url, key)
+    except Exception:
+        return None
+
+
+def bucket_object_path(file_url):
+    """Object path within the bucket for a Supabase public URL, or None"""
+    if '/object/public/' not in file_url:
+        return None
+    parts = file_url.split('/object/public/')
+    if len(parts) != 2:
+        return None
+    path_parts = parts[1].split('/', 1)
+    return path_parts[1] if len(path_parts) == 2 else None
+
+
+class StorageBackend:
+    """
+    Interface of a storage backend for one bucket. Keys are object paths,
+    e.g. 'profile-photos/<sha256>.webp'. put() and put_stream() fail if the
+    key is taken; deleting a key that does not exist is not an error.
+    """
+    name = None
+    # Whether browsers can upload straight to the backend (create_signed_upload)
+    signed_uploads = False
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name
+
+    def put(self, key, data, content_type):
+        """Store bytes under key"""
+        raise NotImplementedError
+
+    def put_stream(self, key, file, content_type):
+        """Store a Django File without reading it into memory where the backend can avoid it"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        """Delete objects in as few storage calls as the backend allows"""
+        raise NotImplementedError
+
+    def url(self, key):
+        """URL the object is served from"""
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def key_for_url(self, url):
+        """Key of an object from its URL, or None if the URL is not one of this backend's"""
+        raise NotImplementedError
+
+    def read(self, key):
+        """Object contents, or None if it does not exist"""
+        raise NotImplementedError
+
+    def info(self, key):
+        """dict of 'size' and 'content_type', or None if the object does not exist"""
+        raise NotImplementedError
+
+    def list(self, prefix):
+        """Yield (key, created_at) for every object under a folder, recursively"""
+        raise NotImplementedError
+
+    def create_signed_upload(self, key):
+        """dict of 'url' and 'token' a browser can PUT a new object to"""
+        raise NotImplementedError
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """Supabase Storage through the shared pooled client"""
+    name = 'supabase'
+    signed_uploads = True
+
+    def _bucket(self, client):
+        return client.storage.from_(self.bucket_name)
+
+    def put(self, key, data, content_type):
+        call_storage(lambda client: self._bucket(client).upload(key, data, file_options={"content-type": content_type}))
+
+    def put_stream(self, key, file, content_type):
+        # The SDK streams from a path, so files on disk are never held in
+        # memory as one bytes object; a path also survives an auth retry
+        if hasattr(file, 'temporary_file_path'):
+            source = file.temporary_file_path()
+        else:
+            source = getattr(getattr(file, 'file', None), 'name', None)
+            if not (isinstance(source, str) and os.path.isfile(source)):
+                file.seek(0)
+                source = file.read()
+        call_storage(lambda client: self._bucket(client).upload(key, source, file_options={"content-type": content_type}))
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        for start in range(0, len(keys), REMOVE_BATCH_SIZE):
+            batch = keys[start:start + REMOVE_BATCH_SIZE]
+            call_storage(lambda client: self._bucket(client).remove(batch))
+
+    def url(self, key):
+        return self._bucket(get_supabase_client(use_service_key=True)).get_public_url(key)
+
+    def exists(self, key):
+        return bool(call_storage(lambda client: self._bucket(client).exists(key)))
+
+    def key_for_url(self, url):
+        return bucket_object_path(url)
+
+    def read(self, key):
+        return call_storage(lambda client: self._bucket(client).download(key))
+
+    def info(self, key):
+        info = call_storage(lambda client: self._bucket(client).info(key))
+        metadata = info.get('metadata') or {}
+        return {
+            'size': int(info.get('size') or metadata.get('size') or 0),
+            'content_type': info.get('content_type') or metadata.get('mimetype') or '',
+        }
+
+    def list(self, prefix):
+        offset = 0
+        while True:
+            page = call_storage(lambda client: self._bucket(client).list(
+                prefix, {'limit': LIST_PAGE_SIZE, 'offset': offset, 'sortBy': {'column': 'name', 'order': 'asc'}},
+            ))
+            for entry in page:
+                key = f"{prefix}/{entry['name']}"
+                # Folders are listed without an id
+                if entry.get('id') is None:
+                    yield from self.list(key)
+                else:
+                    yield key, parse_datetime(entry.get('created_at') or '')
+            if len(page) < LIST_PAGE_SIZE:
+                return
+            offset += LIST_PAGE_SIZE
+
+    def create_signed_upload(self, key):
+        signed = call_storage(lambda client: self._bucket(client).create_signed_upload_url(key))
+        return {'url': signed['signed_url'], 'token': signed['token']}
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Django's default storage under MEDIA_ROOT, served at MEDIA_URL. Every
+    bucket shares it, as object keys already start with their folder.
+    """
+    name = 'local'
+
+    def put(self, key, data, content_type):
+        self._save(key, ContentFile(data))
+
+    def put_stream(self, key, file, content_type):
+        # Copied in chunks, or Django's temporary upload file moved into place
+        self._save(key, file)
+
+    def _save(self, key, content):
+        if default_storage.exists(key):
+            raise FileExistsError(f"{key} already exists.")
+        saved = default_storage.save(key, content)
+        if saved != key:
+            # Created by someone else between the check and the save
+            default_storage.delete(saved)
+            raise FileExistsError(f"{key} already exists.")
+
+    def delete_many(self, keys):
+        for key in keys:
+            default_storage.delete(key)
+
+    def url(self, key):
+        return settings.MEDIA_URL.rstrip('/') + '/' + key
+
+    def exists(self, key):
+        return default_storage.exists(key)
+
+    def key_for_url(self, url):
+        if not url.startswith(settings.MEDIA_URL):
+            return None
+        return url[len(settings.MEDIA_URL):].lstrip('/')
+
+    def read(self, key):
+        if not default_storage.exists(key):
+            return None
+        with default_storage.open(key, 'rb') as f:
+            return f.read()
+
+    def info(self, key):
+        if not default_storage.exists(key):
+            return None
+        # Local storage keeps no metadata; direct upload keys carry an
+        # extension derived from the signed content type
+        return {
+            'size': default_storage.size(key),
+            'content_type': mimetypes.guess_type(key)[0] or '',
+        }
+
+    def list(self, prefix):
+        if not default_storage.exists(prefix):
+            return
+        folders, files = default_storage.listdir(prefix)
+        for name in files:
+            key = f"{prefix}/{name}"
+            yield key, default_storage.get_modified_time(key)
+        for name in folders:
+            yield from self.list(f"{prefix}/{name}")
+
+    def create_signed_upload(self, key):
+        # Browsers use the local upload endpoint instead (see upload_utils)
+        return None
+
+
+class MemoryStorageBackend(StorageBackend):
+    """Objects kept in a dict for the life of the process: for tests and benchmarks, never the network"""
+    name = 'memory'
+
+    def __init__(self, bucket_name):
+        super().__init__(bucket_name)
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, data, content_type):
+        with self._lock:
+            if key in self._objects:
+                raise FileExistsError(f"{key} already exists.")
+            self._objects[key] = (bytes(data), content_type, timezone.now())
+
+    def put_stream(self, key, file, content_type):
+        file.seek(0)
+        self.put(key, b''.join(file.chunks()), content_type)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._objects.pop(key, None)
+
+    def url(self, key):
+        return f"memory://{self.bucket_name}/{key}"
+
+    def exists(self, key):
+        return key in self._objects
+
+    def key_for_url(self, url):
+        prefix = f"memory://{self.bucket_name}/"
+        return url[len(prefix):] if url.startswith(prefix) else None
+
+    def read(self, key):
+        stored = self._objects.get(key)
+        return stored[0] if stored else None
+
+    def info(self, key):
+        stored = self._objects.get(key)
+        return {'size': len(stored[0]), 'content_type': stored[1]} if stored else None
+
+    def list(self, prefix):
+        with self._lock:
+            listing = [(key, stored[2]) for key, stored in self._objects.items() if key.startswith(prefix + '/')]
+        yield from sorted(listing)
+
+    def create_signed_upload(self, key):
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+
+
+BACKENDS = {backend.name: backend for backend in (SupabaseStorageBackend, LocalStorageBackend, MemoryStorageBackend)}
+
+# One instance per backend and bucket; memory backends keep their objects
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(bucket_name='user-uploads', name=None):
+    """The storage backend for a bucket: `name`, or the one settings.STORAGE_BACKEND selects"""
+    name = name or getattr(settings, 'STORAGE_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'supabase' if get_supabase_client(use_service_key=True) else 'local'
+    if name not in BACKENDS:
+        raise ImproperlyConfigured(f"Unknown STORAGE_BACKEND {name!r}; expected one of {', '.join(BACKENDS)} or auto.")
+    if name == 'supabase' and not get_supabase_client(use_service_key=True):
+        raise ImproperlyConfigured("STORAGE_BACKEND is 'supabase' but Supabase is not configured.")
+
+    backend = _backends.get((name, bucket_name))
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.setdefault((name, bucket_name), BACKENDS[name](bucket_name))
+    return backend
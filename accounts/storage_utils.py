@@ -1,83 +1,94 @@
 """
-File upload utilities with optional Supabase support.
-Falls back to Django default storage when Supabase SDK is unavailable
-or not configured.
+File upload utilities on top of the configured storage backend.
+Stored files are content-addressed and reference-counted (StoredObject);
+the bytes go to Supabase Storage, local media or memory, whichever
+storage_backends.get_backend() selects.
 """
 
-import uuid
-import os
-from django.conf import settings
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-
-try:
-    from supabase import create_client, Client  # type: ignore
-except Exception:
-    create_client = None
-    Client = None
- 
- 
-def get_supabase_client(use_service_key: bool = False):
-    """Initialize Supabase client, preferring env-configured URL if available."""
-    if not create_client:
-        return None
-    project_ref = "egllznsxjgkhnwexidii"
-    # Prefer explicit URL from settings/env; otherwise fall back to project_ref
-    url = (
-        getattr(settings, "SUPABASE_URL", None)
-        or os.environ.get("SUPABASE_URL")
-        or f"https://{project_ref}.supabase.co"
-    )
-
-    # Choose service key for backend uploads, anon key otherwise
-    if use_service_key:
-        key = os.environ.get("SUPABASE_KEY_SERVICE") or getattr(settings, "SUPABASE_KEY_SERVICE", "")
-    else:
-        key = os.environ.get("SUPABASE_KEY") or getattr(settings, "SUPABASE_KEY", "")
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from django.core.files import File
+from django.db import transaction
+
+from .models import StoredObject
+from .storage_backends import get_backend
+
+
+# Bytes read at a time when copying an upload; peak memory per upload stays
+# around this size whatever the file size
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@contextmanager
+def hashed_upload_source(file):
+    """
+    Yield (path, sha256 hex digest, size) for an upload. The path holds the
+    upload's bytes for the storage SDK, which streams from an open file:
+    uploads Django already spooled to disk are used in place, anything else
+    is copied out chunk by chunk. The digest is computed in the same pass.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    if hasattr(file, 'temporary_file_path'):
+        while chunk := file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+        file.seek(0)
+        yield file.temporary_file_path(), digest.hexdigest(), size
+        return
+    with tempfile.NamedTemporaryFile(suffix='.upload') as spool:
+        # InMemoryUploadedFile.chunks() yields the whole buffer at once, so
+        # read fixed-size pieces instead
+        while chunk := file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+            spool.write(chunk)
+        spool.flush()
+        file.seek(0)
+        yield spool.name, digest.hexdigest(), size
+
 
-    try:
-        return create_client(url, key)
-    except Exception:
-        return None
- 
- 
- 
 def upload_to_supabase(file, bucket_name='user-uploads', folder=''):
     """
-    Upload file to Supabase Storage
-   
+    Upload file to the storage backend
+
+    Files are named by the SHA-256 of their contents, so identical uploads to
+    the same folder share one object: uploading bytes that are already stored
+    only adds a reference in the StoredObject index and skips the transfer.
+
     Args:
         file: Django UploadedFile object
-        bucket_name: Name of the Supabase storage bucket (default: 'user-uploads')
+        bucket_name: Name of the storage bucket (default: 'user-uploads')
         folder: Optional folder path within the bucket (e.g., 'profile-photos')
-   
+
     Returns:
         str: Public URL of the uploaded file, or None if upload fails
     """
     try:
-        supabase = get_supabase_client(use_service_key=True)
+        backend = get_backend(bucket_name)
 
         ext = file.name.split('.')[-1].lower() if '.' in file.name else 'jpg'
-        unique_id = uuid.uuid4().hex
-        filename = f"{folder}/{unique_id}.{ext}" if folder else f"{unique_id}.{ext}"
+        content_type = getattr(file, 'content_type', None) or 'application/octet-stream'
 
-        file.seek(0)
-        file_bytes = file.read()
-        content_type = getattr(file, 'content_type', 'application/octet-stream')
-
-        if supabase:
-            supabase.storage.from_(bucket_name).upload(
-                filename,
-                file_bytes,
-                file_options={"content-type": content_type}
-            )
-            public_url = supabase.storage.from_(bucket_name).get_public_url(filename)
-            return public_url
-
-        # Fallback: save to local MEDIA storage
-        media_path = os.path.join(folder or '', f"{unique_id}.{ext}")
-        default_storage.save(media_path, ContentFile(file_bytes))
-        return settings.MEDIA_URL.rstrip('/') + '/' + media_path.replace('\\', '/')
+        with hashed_upload_source(file) as (source_path, digest, size):
+            filename = f"{folder}/{digest}.{ext}" if folder else f"{digest}.{ext}"
+
+            # The index row stays locked while the object is written, so a
+            # concurrent delete of the last reference cannot remove it under us
+            with transaction.atomic():
+                stored, _ = StoredObject.objects.select_for_update().get_or_create(
+                    bucket_name=bucket_name,
+                    path=filename,
+                    defaults={'sha256': digest, 'size': size, 'content_type': content_type},
+                )
+                if not stored.ref_count:
+                    _put_object(backend, filename, file, source_path, content_type)
+                stored.ref_count += 1
+                stored.save(update_fields=['ref_count', 'updated_at'])
+
+        return backend.url(filename)
 
     except Exception as e:
         print(f"Error uploading file: {e}")
@@ -87,46 +98,136 @@ def upload_to_supabase(file, bucket_name='user-uploads', folder=''):
         except Exception:
             pass
         return None
- 
- 
+
+
+def _put_object(backend, key, file, source_path, content_type):
+    """Write an object that has no references yet; keeps one already stored under its key"""
+    try:
+        if hasattr(file, 'temporary_file_path'):
+            # Streamed from Django's temporary file, or moved into place locally
+            backend.put_stream(key, file, content_type)
+        else:
+            with open(source_path, 'rb') as source:
+                backend.put_stream(key, File(source, name=file.name), content_type)
+    except Exception:
+        # Content-addressed, so an existing object already has these bytes
+        if not backend.exists(key):
+            raise
+
+
+def _release_object(bucket_name, path, remove):
+    """
+    Drop one reference to a stored object, calling remove() to delete it once
+    none are left. Objects missing from the index are removed outright.
+    """
+    with transaction.atomic():
+        stored = StoredObject.objects.select_for_update().filter(bucket_name=bucket_name, path=path).first()
+        if stored and stored.ref_count > 1:
+            stored.ref_count -= 1
+            stored.save(update_fields=['ref_count', 'updated_at'])
+            return
+        # Removed while the row is locked so a concurrent upload of the same
+        # bytes waits and then stores the object again
+        remove()
+        if stored:
+            stored.delete()
+
+
 def delete_from_supabase(file_url, bucket_name='user-uploads'):
     """
-    Delete file from Supabase Storage
-   
+    Delete file from the storage backend
+
+    Removes one reference to the file; the stored object itself is deleted
+    only when no other upload of the same bytes still uses it.
+
     Args:
         file_url: Full public URL of the file to delete
-        bucket_name: Name of the Supabase storage bucket
-   
+        bucket_name: Name of the storage bucket
+
     Returns:
         bool: True if deletion successful, False otherwise
     """
     try:
-        if not file_url:
+        backend = get_backend(bucket_name)
+        key = object_key(file_url, bucket_name)
+        if not key:
             return False
+        _release_object(bucket_name, key, lambda: backend.delete(key))
+        return True
 
-        supabase = get_supabase_client(use_service_key=True)
+    except Exception as e:
+        print(f"Error deleting file: {e}")
+        return False
 
-        if supabase and '/object/public/' in file_url:
-            parts = file_url.split('/object/public/')
-            if len(parts) == 2:
-                path_parts = parts[1].split('/', 1)
-                if len(path_parts) == 2:
-                    filename = path_parts[1]
-                    supabase.storage.from_(bucket_name).remove([filename])
-                    return True
 
-        # Fallback: try deleting from local MEDIA storage
-        try:
-            if file_url.startswith(settings.MEDIA_URL):
-                relative_path = file_url[len(settings.MEDIA_URL):].lstrip('/')
-                default_storage.delete(relative_path)
-                return True
-        except Exception:
-            pass
+def object_key(file_url, bucket_name='user-uploads'):
+    """Key of a stored file within its bucket, or None for other URLs"""
+    if not file_url:
+        return None
+    return get_backend(bucket_name).key_for_url(file_url)
 
-        return False
+
+def remove_objects(object_keys, bucket_name='user-uploads'):
+    """
+    Delete stored objects in bulk, in as few storage calls as the backend
+    allows. Keys that do not exist are ignored; errors are raised so the
+    caller can retry.
+    """
+    get_backend(bucket_name).delete_many(list(object_keys))
+
+
+def list_objects(prefix, bucket_name='user-uploads'):
+    """Yield (key, created_at) for every object under a folder, recursively"""
+    return get_backend(bucket_name).list(prefix)
+
+
+def read_from_supabase(file_url, bucket_name='user-uploads'):
+    """
+    Download a stored file by its URL
+
+    Returns:
+        bytes: File contents, or None if the file cannot be read
+    """
+    try:
+        key = object_key(file_url, bucket_name)
+        if not key:
+            return None
+        return get_backend(bucket_name).read(key)
 
     except Exception as e:
-        print(f"Error deleting file: {e}")
-        return False
- 
+        print(f"Error reading file: {e}")
+        return None
+
+
+def object_public_url(object_key, bucket_name='user-uploads'):
+    """Public URL of an object stored under `object_key`"""
+    return get_backend(bucket_name).url(object_key)
+
+
+def create_signed_upload(object_key, bucket_name='user-uploads'):
+    """
+    Signed URL the browser can PUT a new object to, bypassing the app server
+
+    Returns:
+        dict: 'url' and 'token', or None if the backend has none or signing fails
+    """
+    try:
+        return get_backend(bucket_name).create_signed_upload(object_key)
+    except Exception as e:
+        print(f"Error creating signed upload URL: {e}")
+        return None
+
+
+def stored_object_info(object_key, bucket_name='user-uploads'):
+    """
+    Size and content type of a stored object
+
+    Returns:
+        dict: 'size' and 'content_type', or None if the object does not exist
+    """
+    try:
+        return get_backend(bucket_name).info(object_key)
+
+    except Exception as e:
+        print(f"Error reading object info: {e}")
+        return None
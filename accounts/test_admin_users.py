@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import User
+
+
+class AdminUsersViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='StrongPass123', email='admin@example.com',
+            full_name='Admin', contact_number='09170000000', date_of_birth='1990-01-01',
+            address_line='A',
+        )
+        self.client.force_login(self.admin)
+        now = timezone.now()
+        for i in range(25):
+            User.objects.create_user(
+                username=f'resident{i}', password='StrongPass123', email=f'resident{i}@example.com',
+                full_name=f'Resident {i}', contact_number='09171234567', date_of_birth='1990-01-01',
+                address_line='A', resident_confirmation=i % 2 == 0, date_joined=now - timedelta(days=i),
+            )
+
+    def test_pages_follow_cursor_and_keep_filters(self):
+        url = reverse('accounts:admin_users')
+        response = self.client.get(url, {'verification_status': 'verified', 'page_size': 10})
+        page = response.context['page']
+        self.assertEqual([u.username for u in page], [f'resident{i}' for i in range(0, 20, 2)])
+        self.assertEqual(response.context['total_users'], 13)
+        self.assertIn('verification_status=verified', page.next_query)
+        self.assertIn('password', page.items[0].get_deferred_fields())
+
+        response = self.client.get(f'{url}?{page.next_query}')
+        self.assertEqual([u.username for u in response.context['page']], ['resident20', 'resident22', 'resident24'])
+        self.assertFalse(response.context['page'].has_next)
+
+    def test_detail_endpoint(self):
+        resident = User.objects.get(username='resident1')
+        response = self.client.get(reverse('accounts:admin_user_detail', args=[resident.id]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['address_line'], 'A')
+        self.assertNotIn('password', data)
+
+    def test_similar_match_mode_pages(self):
+        url = reverse('accounts:admin_users')
+        response = self.client.get(url, {'q': 'resident', 'match': 'similar', 'page_size': 20})
+        page = response.context['page']
+        self.assertEqual(len(page), 20)
+        response = self.client.get(f'{url}?{page.next_query}')
+        self.assertEqual(len(response.context['page']), 5)
@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import Announcement, User
+
+
+class AnnouncementBadgeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01',
+            address_line='A', resident_confirmation=True,
+        )
+        self.client.force_login(self.user)
+        Announcement.objects.create(title='Clean-up drive', content='Saturday 7AM')
+        Announcement.objects.create(title='Water interruption', content='Sunday')
+
+    def badge(self):
+        return self.client.get(reverse('accounts:personal_info')).context['unread_count']
+
+    def test_opening_announcements_clears_badge(self):
+        self.assertEqual(self.badge(), 2)
+        self.client.get(reverse('accounts:announcements'))
+        self.assertEqual(self.badge(), 0)
+
+        Announcement.objects.create(title='Vaccination', content='Health center')
+        self.assertEqual(self.badge(), 1)
+
+    def test_badge_is_served_from_cache(self):
+        self.badge()
+        with self.assertNumQueries(2):  # session + user
+            self.badge()
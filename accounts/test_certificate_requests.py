@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import CertificateRequest, User
+
+
+class CertificateRequestsViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01',
+            address_line='A', resident_confirmation=True,
+        )
+        self.client.force_login(self.user)
+        for payment_status, claim_status in [
+            ('unpaid', 'processing'), ('pending', 'processing'), ('paid', 'ready'),
+            ('paid', 'claimed'), ('failed', 'failed'),
+        ]:
+            CertificateRequest.objects.create(
+                user=self.user, certificate_type='residency', purpose='For employment requirements',
+                payment_amount=30.00, payment_status=payment_status, claim_status=claim_status,
+            )
+
+    def test_summary_counts(self):
+        response = self.client.get(reverse('accounts:certificate_requests'))
+        self.assertEqual(response.context['total_requests'], 5)
+        self.assertEqual(response.context['unpaid_count'], 1)
+        self.assertEqual(response.context['pending_count'], 1)
+        self.assertEqual(response.context['paid_count'], 2)
+        self.assertEqual(response.context['failed_count'], 1)
+        self.assertEqual(response.context['processing_count'], 2)
+        self.assertEqual(response.context['ready_count'], 1)
+        self.assertEqual(response.context['claimed_count'], 1)
+
+    def test_query_count(self):
+        url = reverse('accounts:certificate_requests')
+        self.client.get(url)  # warm the announcement badge cache
+        # session, user, summary aggregate, request list
+        with self.assertNumQueries(4):
+            self.client.get(url, {'payment_status': 'paid'})
+
+    def test_feed_continues_filtered_history(self):
+        for _ in range(20):
+            CertificateRequest.objects.create(
+                user=self.user, certificate_type='residency', purpose='For employment requirements',
+                payment_amount=30.00, payment_status='paid', claim_status='ready',
+            )
+        response = self.client.get(reverse('accounts:certificate_requests'), {'payment_status': 'paid'})
+        self.assertEqual(len(response.context['requests']), 20)
+        cursor = response.context['next_cursor']
+        self.assertTrue(cursor)
+
+        data = self.client.get(
+            reverse('accounts:certificate_requests_feed'), {'payment_status': 'paid', 'cursor': cursor}
+        ).json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual({row['payment_status'] for row in data['results']}, {'paid'})
+        self.assertIsNone(data['next_cursor'])
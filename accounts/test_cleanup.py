@@ -0,0 +1,109 @@
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import cleanup_utils, storage_backends, storage_utils
+from .models import CertificateRequest, PendingUpload, StorageTombstone, StoredObject, User
+
+
+class StorageSweepTest(TestCase):
+    def setUp(self):
+        media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media_dir.cleanup)
+        self.media = FileSystemStorage(location=media_dir.name, base_url='/media/')
+        for patcher in (
+            mock.patch.object(storage_backends, 'default_storage', self.media),
+            mock.patch.object(storage_backends, 'get_supabase_client', return_value=None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01', address_line='A',
+        )
+        self.client.force_login(self.user)
+
+    def store(self, data, folder='indigency-proofs'):
+        return storage_utils.upload_to_supabase(ContentFile(data, name='proof.jpg'), folder=folder)
+
+    def key(self, url):
+        return url[len('/media/'):]
+
+    def test_cancelled_request_photos_are_swept(self):
+        url = self.store(b'proof')
+        shared = self.store(b'proof')
+        request = CertificateRequest.objects.create(
+            user=self.user, certificate_type='indigency', purpose='For medical assistance',
+            payment_amount=0, proof_photo_url=url,
+        )
+        CertificateRequest.objects.create(
+            user=self.user, certificate_type='indigency', purpose='For medical assistance',
+            payment_amount=0, proof_photo_url=shared,
+        )
+
+        self.client.get(reverse('accounts:cancel_request', args=[request.request_id]))
+        self.assertEqual(StorageTombstone.objects.get().key, self.key(url))
+        # Still used by the other request
+        self.assertEqual(cleanup_utils.sweep()['released'], 1)
+        self.assertTrue(self.media.exists(self.key(url)))
+
+        self.user.delete()
+        self.assertEqual(cleanup_utils.sweep()['removed'], 1)
+        self.assertFalse(self.media.exists(self.key(url)))
+        self.assertFalse(StoredObject.objects.exists())
+        self.assertFalse(StorageTombstone.objects.exists())
+
+    def test_batch_is_removed_in_one_call_and_retried(self):
+        keys = [self.key(self.store(data)) for data in (b'one', b'two', b'three')]
+        cleanup_utils.schedule_deletion([f'/media/{key}' for key in keys])
+
+        with mock.patch.object(cleanup_utils, 'remove_objects', side_effect=IOError('storage down')) as remove:
+            self.assertEqual(cleanup_utils.sweep()['failed'], 3)
+        remove.assert_called_once()
+        self.assertEqual(sorted(remove.call_args.args[0]), sorted(keys))
+        self.assertTrue(all(self.media.exists(key) for key in keys))
+        tombstone = StorageTombstone.objects.first()
+        self.assertEqual((tombstone.attempts, tombstone.last_error), (1, 'storage down'))
+        # Not due again until the backoff has passed
+        self.assertEqual(cleanup_utils.sweep()['swept'], 0)
+
+        StorageTombstone.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(cleanup_utils.sweep()['removed'], 3)
+        self.assertFalse(any(self.media.exists(key) for key in keys))
+
+    def test_reconcile_finds_abandoned_direct_uploads(self):
+        kept = self.store(b'profile', folder='profile-photos')
+        self.user.profile_photo_url = kept
+        self.user.save(update_fields=['profile_photo_url'])
+        abandoned = f'profile-photos/{self.user.pk}/{"a" * 32}.jpg'
+        submitted = f'profile-photos/{self.user.pk}/{"b" * 32}.jpg'
+        for key in (abandoned, submitted):
+            self.media.save(key, ContentFile(b'raw'))
+        PendingUpload.objects.create(
+            user=self.user, field='profile_photo_url', source_key=submitted,
+            original_name='b.jpg', content_type='image/jpeg',
+        )
+
+        # Everything is inside the grace period
+        self.assertEqual(cleanup_utils.reconcile(['profile-photos']), ([], 0))
+
+        out = StringIO()
+        call_command('sweep_storage', '--reconcile', '--grace-hours=0', '--dry-run', stdout=out)
+        self.assertIn(f'orphan {abandoned}', out.getvalue())
+        self.assertFalse(StorageTombstone.objects.exists())
+
+        orphans, _ = cleanup_utils.reconcile(['profile-photos'], grace=timedelta(0))
+        self.assertEqual(orphans, [abandoned])
+        cleanup_utils.sweep()
+        self.assertFalse(self.media.exists(abandoned))
+        self.assertTrue(self.media.exists(submitted))
+        self.assertTrue(self.media.exists(self.key(kept)))
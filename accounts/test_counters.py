@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .models import CertificateRequest, IncidentReport, StatCounter, User
+
+
+class StatCounterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01',
+            address_line='A',
+        )
+
+    def test_counters_follow_status_changes(self):
+        cert = CertificateRequest.objects.create(
+            user=self.user, certificate_type='residency',
+            purpose='For employment requirements', payment_amount=30.00,
+        )
+        IncidentReport.objects.create(user=self.user, incident_type='Theft', place='Market', message='Stolen bag')
+
+        cert = CertificateRequest.objects.get(pk=cert.pk)
+        cert.payment_status = 'paid'
+        cert.save()
+        self.user.resident_confirmation = True
+        self.user.save()
+
+        counters = StatCounter.read(StatCounter.GLOBAL)
+        self.assertEqual(counters['certificate_payment_status'], {'unpaid': 0, 'paid': 1})
+        self.assertEqual(counters['resident_verification'], {'pending': 0, 'verified': 1})
+        self.assertEqual(StatCounter.read(StatCounter.user_scope(self.user.pk))['report_status'], {'Pending': 1})
+
+        self.user.delete()
+        self.assertEqual(StatCounter.read(StatCounter.GLOBAL)['report_status'], {'Pending': 0})
+        self.assertFalse(StatCounter.objects.filter(scope=StatCounter.user_scope(self.user.pk)).exists())
+
+    def test_recount_repairs_drift(self):
+        IncidentReport.objects.create(user=self.user, incident_type='Theft', place='Market', message='Stolen bag')
+        StatCounter.objects.filter(dimension='report_status').update(total=7)
+
+        out = StringIO()
+        call_command('recount', stdout=out)
+
+        self.assertIn('2 had drifted', out.getvalue())
+        self.assertEqual(StatCounter.read(StatCounter.GLOBAL)['report_status'], {'Pending': 1})
+
+    def test_stale_copies_count_a_change_once(self):
+        cert = CertificateRequest.objects.create(
+            user=self.user, certificate_type='residency',
+            purpose='For employment requirements', payment_amount=30.00, payment_status='pending',
+        )
+        # Two admins acting on the same request at once
+        first, second = CertificateRequest.objects.get(pk=cert.pk), CertificateRequest.objects.get(pk=cert.pk)
+        for copy in (first, second):
+            copy.payment_status = 'paid'
+            copy.save()
+        self.assertEqual(
+            StatCounter.read(StatCounter.GLOBAL)['certificate_payment_status'], {'pending': 0, 'paid': 1},
+        )
+
+        # Only the counted fields being written are applied
+        second.claim_status = 'claimed'
+        second.payment_status = 'unpaid'
+        second.save(update_fields=['claim_status'])
+        counters = StatCounter.read(StatCounter.GLOBAL)
+        self.assertEqual(counters['certificate_payment_status'], {'pending': 0, 'paid': 1})
+        self.assertEqual(counters['certificate_claim_status'].get('claimed'), 1)
+
+        first.delete()
+        second.delete()
+        self.assertEqual(
+            StatCounter.read(StatCounter.GLOBAL)['certificate_payment_status'], {'pending': 0, 'paid': 0},
+        )
@@ -0,0 +1,83 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from . import stats_utils
+from .models import IncidentReport, User
+
+
+class DashboardStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='StrongPass123', email='admin@example.com',
+            full_name='Admin', contact_number='09170000000', date_of_birth='1990-01-01',
+            address_line='A',
+        )
+        self.resident = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01',
+            address_line='A',
+        )
+
+    def report(self):
+        IncidentReport.objects.create(user=self.resident, incident_type='Theft', place='Market', message='Stolen bag')
+
+    def expire_snapshot(self):
+        snapshot = cache.get(stats_utils.DASHBOARD_STATS_CACHE_KEY)
+        snapshot['fresh_until'] = time.time() - 1
+        cache.set(stats_utils.DASHBOARD_STATS_CACHE_KEY, snapshot)
+
+    def test_snapshot_is_shared_until_it_expires(self):
+        self.report()
+        stats, generated_at = stats_utils.get_dashboard_stats()
+        self.assertEqual(stats['total_reports'], 1)
+
+        self.report()
+        with self.assertNumQueries(0):
+            self.assertEqual(stats_utils.get_dashboard_stats(), (stats, generated_at))
+
+        self.expire_snapshot()
+        stats, _ = stats_utils.get_dashboard_stats()
+        self.assertEqual(stats['total_reports'], 2)
+        self.assertIsNone(cache.get(stats_utils.DASHBOARD_STATS_LOCK_KEY))
+
+    def test_stale_snapshot_is_served_while_another_admin_refreshes(self):
+        self.report()
+        stats, generated_at = stats_utils.get_dashboard_stats()
+        self.expire_snapshot()
+        self.report()
+
+        cache.add(stats_utils.DASHBOARD_STATS_LOCK_KEY, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(stats_utils.get_dashboard_stats(), (stats, generated_at))
+
+    def test_cold_cache_with_lock_taken_reads_counters_without_waiting(self):
+        self.report()
+        cache.add(stats_utils.DASHBOARD_STATS_LOCK_KEY, 1)
+
+        with mock.patch.object(stats_utils.time, 'sleep') as sleep:
+            stats, _ = stats_utils.get_dashboard_stats()
+        sleep.assert_not_called()
+        self.assertEqual(stats['total_reports'], 1)
+        # The lock holder stores the snapshot
+        self.assertIsNone(cache.get(stats_utils.DASHBOARD_STATS_CACHE_KEY))
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.report()
+        url = reverse('accounts:admin_dashboard_stats')
+
+        self.client.force_login(self.resident)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['stats']['total_reports'], 1)
+        self.assertEqual(data['stats']['pending_reports'], 1)
+        self.assertIn('generated_at', data)
+        self.assertIn('no-cache', response['Cache-Control'])
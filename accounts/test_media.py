@@ -0,0 +1,137 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import media_utils
+from .media_storage import ShardedFileSystemStorage, shard_name
+from .models import CertificateRequest, User
+
+
+def make_storage(test):
+    media_dir = tempfile.TemporaryDirectory()
+    test.addCleanup(media_dir.cleanup)
+    return ShardedFileSystemStorage(location=media_dir.name, base_url='/media/')
+
+
+class ShardedStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.storage = make_storage(self)
+
+    def test_files_are_sharded_under_their_logical_name(self):
+        name = self.storage.save('profile-photos/photo.webp', ContentFile(b'image'))
+        self.assertEqual(name, 'profile-photos/photo.webp')
+        self.assertEqual(self.storage.url(name), '/media/profile-photos/photo.webp')
+        self.assertEqual(
+            self.storage.path(name), os.path.join(self.storage.location, shard_name('profile-photos/photo.webp')),
+        )
+        self.assertEqual(len(shard_name(name).split('/')), 4)
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'image')
+
+        # Never overwritten, and no temporary files left behind
+        self.assertNotEqual(self.storage.save(name, ContentFile(b'other')), name)
+        shard_dir = os.path.dirname(self.storage.path(name))
+        self.assertFalse([entry for entry in os.listdir(shard_dir) if entry.startswith('.tmp-')])
+
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+
+    def test_temporary_uploads_are_moved_into_place(self):
+        upload = TemporaryUploadedFile('big.jpg', 'image/jpeg', 5, None)
+        self.addCleanup(upload.close)
+        upload.write(b'bytes')
+        upload.flush()
+        source = upload.temporary_file_path()
+        name = self.storage.save('resident-ids/big.jpg', upload)
+        self.assertFalse(os.path.exists(source))
+        self.assertEqual(self.storage.size(name), 5)
+
+    def test_temporary_upload_survives_a_name_taken_mid_save(self):
+        taken = self.storage.save('resident-ids/big.jpg', ContentFile(b'first'))
+        upload = TemporaryUploadedFile('big.jpg', 'image/jpeg', 5, None)
+        self.addCleanup(upload.close)
+        upload.write(b'bytes')
+        upload.flush()
+
+        # Another writer takes the name between the availability check and the link
+        with mock.patch.object(self.storage, 'get_available_name', side_effect=[taken, 'resident-ids/big_2.jpg']):
+            name = self.storage.save('resident-ids/big.jpg', upload)
+        self.assertEqual(name, 'resident-ids/big_2.jpg')
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'bytes')
+        with self.storage.open(taken) as f:
+            self.assertEqual(f.read(), b'first')
+        shard_dir = os.path.dirname(self.storage.path(taken))
+        self.assertFalse([entry for entry in os.listdir(shard_dir) if entry.startswith('.tmp-')])
+
+    def test_listing_is_logical(self):
+        self.storage.save('profile-photos/a.webp', ContentFile(b'a'))
+        self.storage.save('profile-photos/b.webp', ContentFile(b'b'))
+        # A real subdirectory whose name looks like a shard
+        self.storage.save('profile-photos/12/c.png', ContentFile(b'c'))
+        # Stored flat before sharding
+        legacy = os.path.join(self.storage.location, 'profile-photos', 'legacy.jpg')
+        with open(legacy, 'wb') as f:
+            f.write(b'old')
+
+        directories, files = self.storage.listdir('profile-photos')
+        self.assertEqual(directories, ['12'])
+        self.assertEqual(sorted(files), ['a.webp', 'b.webp', 'legacy.jpg'])
+        self.assertEqual(self.storage.listdir('profile-photos/12'), ([], ['c.png']))
+        with self.storage.open('profile-photos/legacy.jpg') as f:
+            self.assertEqual(f.read(), b'old')
+
+
+class ServeMediaTest(TestCase):
+    def setUp(self):
+        self.storage = make_storage(self)
+        patcher = mock.patch.object(media_utils, 'default_storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.owner = self.create_user('owner')
+        self.other = self.create_user('other')
+        self.proof = self.storage.save('indigency-proofs/proof.jpg', ContentFile(b'proof bytes'))
+        CertificateRequest.objects.create(
+            user=self.owner, certificate_type='indigency', purpose='For medical assistance',
+            payment_amount=0, proof_photo_url=f'/media/{self.proof}',
+        )
+
+    def create_user(self, username, **extra):
+        return User.objects.create_user(
+            username=username, password='StrongPass123', email=f'{username}@example.com',
+            full_name=username, contact_number='09171234567', date_of_birth='1990-01-01', address_line='A',
+            **extra,
+        )
+
+    def test_only_owner_and_admins_can_view(self):
+        url = f'/media/{self.proof}'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_login(self.owner)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'proof bytes')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('private', response['Cache-Control'])
+
+        self.client.force_login(self.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get('/media/indigency-proofs/missing.jpg').status_code, 404)
+
+    def test_front_server_sends_the_bytes_when_configured(self):
+        self.client.force_login(self.owner)
+        with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self.client.get(f'/media/{self.proof}')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + shard_name(self.proof))
+        self.assertEqual(response.content, b'')
+
+        with override_settings(MEDIA_X_SENDFILE=True):
+            response = self.client.get(f'/media/{self.proof}')
+        self.assertEqual(response['X-Sendfile'], self.storage.path(self.proof))
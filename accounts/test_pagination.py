@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import CertificateRequest, IncidentReport, User
+
+
+class AdminListPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='StrongPass123', email='admin@example.com',
+            full_name='Admin', contact_number='09170000000', date_of_birth='1990-01-01',
+            address_line='A',
+        )
+        self.client.force_login(self.admin)
+        for status in ['Pending', 'Resolved', 'Pending', 'Pending']:
+            IncidentReport.objects.create(
+                user=self.admin, incident_type='Theft', place='Market',
+                message='Bag stolen', status=status,
+            )
+
+    def test_status_filter_survives_paging(self):
+        for _ in range(8):
+            IncidentReport.objects.create(
+                user=self.admin, incident_type='Theft', place='Market', message='Bag stolen', status='Pending',
+            )
+        url = reverse('accounts:admin_reports')
+        response = self.client.get(url, {'status': 'Pending', 'page_size': 10})
+        page = response.context['page']
+        self.assertEqual(len(page), 10)
+        self.assertEqual(response.context['total_reports'], 11)
+        self.assertFalse(response.context['total_estimated'])
+
+        response = self.client.get(f'{url}?{page.next_query}')
+        self.assertEqual([r.status for r in response.context['page']], ['Pending'])
+
+    def test_page_size_is_clamped_to_choices(self):
+        url = reverse('accounts:admin_reports')
+        for requested, expected in [('1', 10), ('0', 10), ('500', 100), ('abc', 25)]:
+            response = self.client.get(url, {'page_size': requested})
+            self.assertEqual(response.context['page'].page_size, expected)
+
+    def test_planner_estimate_used_above_threshold(self):
+        url = reverse('accounts:admin_reports')
+        with mock.patch('accounts.pagination_utils.planner_estimate', return_value=250000):
+            response = self.client.get(url)
+            self.assertEqual(response.context['total_reports'], 250000)
+            self.assertTrue(response.context['total_estimated'])
+            self.assertContains(response, 'exact count')
+
+            response = self.client.get(url, {'exact': '1'})
+            self.assertEqual(response.context['total_reports'], 4)
+            self.assertFalse(response.context['total_estimated'])
+
+    def test_certificate_search_pages_by_rank_cursor(self):
+        hardware = [f'Garcia Hardware {n}' for n in range(10)]
+        for name in ['Garcia Bakery', 'Reyes Laundry', *hardware]:
+            CertificateRequest.objects.create(
+                user=self.admin, certificate_type='business_clearance', purpose='Permit renewal',
+                business_name=name, payment_amount=50,
+            )
+        url = reverse('accounts:admin_certificates')
+        response = self.client.get(url, {'q': 'garcia', 'page_size': 10})
+        page = response.context['page']
+        self.assertEqual(response.context['total_certificates'], 11)
+        self.assertEqual([c.business_name for c in page], hardware[::-1])
+
+        response = self.client.get(f'{url}?{page.next_query}')
+        self.assertEqual([c.business_name for c in response.context['page']], ['Garcia Bakery'])
+
+    def test_report_search_snippets_and_date_range(self):
+        old = IncidentReport.objects.create(
+            user=self.admin, incident_type='Theft', place='Plaza',
+            message='A <b>bicycle</b> was taken from the basketball court', status='Resolved',
+        )
+        IncidentReport.objects.filter(pk=old.pk).update(created_at=timezone.now() - timezone.timedelta(days=40))
+        IncidentReport.objects.create(
+            user=self.admin, incident_type='Theft', place='Court',
+            message='Another bicycle missing near the basketball court', status='Pending',
+        )
+        url = reverse('accounts:admin_reports')
+        response = self.client.get(url, {'q': 'bicycle'})
+        snippets = [str(r.search_snippet) for r in response.context['page']]
+        self.assertEqual(len(snippets), 2)
+        self.assertIn('<mark>bicycle</mark>', snippets[1])
+        self.assertIn('&lt;b&gt;', snippets[1])
+
+        since = (timezone.localdate() - timezone.timedelta(days=7)).isoformat()
+        response = self.client.get(url, {'q': 'bicycle', 'date_from': since, 'status': 'Pending'})
+        self.assertEqual([r.place for r in response.context['page']], ['Court'])
+
+        # Rows appended by infinite scroll carry the same escaped snippet
+        data = self.client.get(reverse('accounts:report_records_feed'), {'q': 'bicycle'}).json()
+        snippets = [row['snippet'] for row in data['results']]
+        self.assertEqual(len(snippets), 2)
+        self.assertTrue(all('<mark>bicycle</mark>' in snippet for snippet in snippets))
+        self.assertTrue(any('&lt;b&gt;' in snippet for snippet in snippets))
@@ -0,0 +1,40 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import CertificateRequest, RequestIdSequence, User
+
+
+class RequestIdSequenceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01',
+            address_line='A',
+        )
+        self.year = timezone.now().year
+
+    def create_request(self):
+        return CertificateRequest.objects.create(
+            user=self.user, certificate_type='residency',
+            purpose='For employment requirements', payment_amount=30.00,
+        )
+
+    def test_request_ids_are_sequential_per_year(self):
+        first = self.create_request()
+        second = self.create_request()
+        self.assertEqual(first.request_id, f"REQ-{self.year}-0001")
+        self.assertEqual(second.request_id, f"REQ-{self.year}-0002")
+        self.assertEqual(RequestIdSequence.objects.get(year=self.year).last_value, 2)
+
+    def test_reseed_repairs_counter_behind_existing_ids(self):
+        self.create_request()
+        self.create_request()
+        RequestIdSequence.objects.filter(year=self.year).update(last_value=0)
+
+        call_command('reseed_request_ids', stdout=StringIO())
+
+        self.assertEqual(RequestIdSequence.objects.get(year=self.year).last_value, 2)
+        self.assertEqual(self.create_request().request_id, f"REQ-{self.year}-0003")
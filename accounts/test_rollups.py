@@ -0,0 +1,138 @@
+import datetime
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import rollup_utils
+from .models import CertificateRequest, DailyRollup, DailyRollupProgress, IncidentReport, User
+
+
+def days_ago(days):
+    return timezone.localdate() - datetime.timedelta(days=days)
+
+
+def noon(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+
+
+class DailyRollupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01',
+            address_line='A',
+        )
+
+    def certificate(self, day, certificate_type='residency', paid_mode=None, amount=30):
+        cert = CertificateRequest.objects.create(
+            user=self.user, certificate_type=certificate_type, purpose='For employment requirements',
+            payment_amount=amount,
+        )
+        fields = {'created_at': noon(day)}
+        if paid_mode:
+            fields.update(payment_status='paid', payment_mode=paid_mode, paid_at=noon(day))
+        CertificateRequest.objects.filter(pk=cert.pk).update(**fields)
+
+    def incident(self, day, incident_type='Theft'):
+        report = IncidentReport.objects.create(user=self.user, incident_type=incident_type, place='Market', message='Stolen bag')
+        IncidentReport.objects.filter(pk=report.pk).update(created_at=noon(day))
+
+    def rollups(self, metric):
+        return list(DailyRollup.objects.filter(metric=metric).values_list('day', 'key', 'count', 'amount'))
+
+    def rollup_daily(self, *args):
+        out = StringIO()
+        call_command('rollup_daily', *args, stdout=out)
+        return out.getvalue()
+
+    def test_store_rollups_groups_by_day_and_key(self):
+        self.certificate(days_ago(3))
+        self.certificate(days_ago(3), certificate_type='indigency')
+        self.certificate(days_ago(3), paid_mode='gcash', amount=50)
+        self.certificate(days_ago(3), paid_mode='gcash', amount=25)
+        self.certificate(days_ago(2), paid_mode=None)
+
+        self.assertEqual(rollup_utils.store_rollups('certificate_requests', days_ago(3), days_ago(3)), 2)
+        self.assertEqual(self.rollups('certificate_requests'), [
+            (days_ago(3), 'indigency', 1, 0), (days_ago(3), 'residency', 3, 0),
+        ])
+        rollup_utils.store_rollups('payments', days_ago(3), days_ago(2))
+        self.assertEqual(self.rollups('payments'), [(days_ago(3), 'gcash', 2, 75)])
+
+        # Rerunning replaces the range instead of adding to it
+        rollup_utils.store_rollups('certificate_requests', days_ago(3), days_ago(3))
+        self.assertEqual(DailyRollup.objects.filter(metric='certificate_requests').count(), 2)
+
+    def test_command_resumes_from_progress_and_backfills(self):
+        self.incident(days_ago(5))
+        self.incident(days_ago(1))
+        self.incident(days_ago(0))
+
+        self.rollup_daily('--metric=incidents')
+        self.assertEqual(DailyRollupProgress.objects.get(metric='incidents').last_day, days_ago(1))
+        self.assertEqual(self.rollups('incidents'), [(days_ago(5), 'Theft', 1, 0), (days_ago(1), 'Theft', 1, 0)])
+        self.assertIn('incidents: up to date.', self.rollup_daily('--metric=incidents'))
+
+        # Late data for a processed day is only picked up by a backfill
+        self.incident(days_ago(5), incident_type='Fire')
+        self.rollup_daily('--metric=incidents')
+        self.assertEqual(DailyRollup.objects.filter(metric='incidents', day=days_ago(5)).count(), 1)
+        self.rollup_daily('--metric=incidents', '--backfill', f'--since={days_ago(5)}', f'--until={days_ago(5)}')
+        self.assertEqual(DailyRollup.objects.filter(metric='incidents', day=days_ago(5)).count(), 2)
+        # A backfill of older days does not move progress back
+        self.assertEqual(DailyRollupProgress.objects.get(metric='incidents').last_day, days_ago(1))
+
+        self.assertFalse(DailyRollup.objects.filter(metric='incidents', day=days_ago(0)).exists())
+
+        with self.assertRaises(CommandError):
+            self.rollup_daily('--backfill')
+        with self.assertRaises(CommandError):
+            self.rollup_daily(f'--until={days_ago(0)}')
+
+    def test_read_series_zero_fills_and_counts_today_live(self):
+        self.incident(days_ago(2))
+        self.incident(days_ago(0), incident_type='Fire')
+        rollup_utils.store_rollups('incidents', days_ago(2), days_ago(1))
+
+        data = rollup_utils.read_series('incidents', days_ago(3), days_ago(0))
+        self.assertEqual(data['labels'], [day.isoformat() for day in map(days_ago, (3, 2, 1, 0))])
+        self.assertEqual(data['series'], {
+            'Theft': {'count': [0, 1, 0, 0], 'amount': [0.0] * 4},
+            'Fire': {'count': [0, 0, 0, 1], 'amount': [0.0] * 4},
+        })
+
+        # Rollup rows for today are never used
+        DailyRollup.objects.create(metric='incidents', day=days_ago(0), key='Fire', count=7)
+        data = rollup_utils.read_series('incidents', days_ago(0), days_ago(0))
+        self.assertEqual(data['series']['Fire']['count'], [1])
+
+    def test_timeseries_endpoint(self):
+        admin = User.objects.create_superuser(
+            username='admin', password='StrongPass123', email='admin@example.com',
+            full_name='Admin', contact_number='09170000000', date_of_birth='1990-01-01',
+            address_line='A',
+        )
+        self.incident(days_ago(0))
+        url = reverse('accounts:admin_timeseries', args=['incidents'])
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(admin)
+        data = self.client.get(url).json()
+        self.assertEqual((data['start'], data['end']), (days_ago(29).isoformat(), days_ago(0).isoformat()))
+        self.assertEqual(len(data['labels']), 30)
+        self.assertEqual(data['series']['Theft']['count'][-1], 1)
+
+        self.assertEqual(self.client.get(reverse('accounts:admin_timeseries', args=['visits'])).status_code, 404)
+        for params in (
+            {'start': '2024-13-01'},
+            {'start': '2024-02-02', 'end': '2024-02-01'},
+            {'start': '2022-12-31', 'end': '2024-01-01'},
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
@@ -0,0 +1,222 @@
+import os
+import tempfile
+import tracemalloc
+from io import StringIO
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import storage_backends, storage_utils
+from .media_storage import ShardedFileSystemStorage
+from .models import StoredObject
+
+
+class AuthError(Exception):
+    status = 401
+    message = 'Invalid JWT'
+
+
+class SupabaseClientPoolTest(SimpleTestCase):
+    def setUp(self):
+        storage_backends._supabase_clients.clear()
+        self.addCleanup(storage_backends._supabase_clients.clear)
+
+    def test_one_client_per_key_type(self):
+        with mock.patch.object(storage_backends, 'create_client', side_effect=lambda url, key: mock.Mock()) as create:
+            service = storage_backends.get_supabase_client(use_service_key=True)
+            self.assertIs(storage_backends.get_supabase_client(use_service_key=True), service)
+            anon = storage_backends.get_supabase_client()
+        self.assertIsNot(anon, service)
+        self.assertEqual(create.call_count, 2)
+
+    def test_auth_error_recreates_client(self):
+        stale, fresh = mock.Mock(), mock.Mock()
+        with mock.patch.object(storage_backends, 'create_client', side_effect=[stale, fresh]):
+            calls = []
+
+            def operation(client):
+                calls.append(client)
+                if client is stale:
+                    raise AuthError()
+                return 'ok'
+
+            self.assertEqual(storage_backends.call_storage(operation), 'ok')
+        self.assertEqual(calls, [stale, fresh])
+        self.assertIs(storage_backends.get_supabase_client(use_service_key=True), fresh)
+
+
+class StreamingUploadTest(TestCase):
+    SIZE = 8 * 1024 * 1024
+    # Well under the file size; a whole-file read() would blow straight past it
+    PEAK_LIMIT = 1024 * 1024
+
+    def setUp(self):
+        self.upload = TemporaryUploadedFile('big.jpg', 'image/jpeg', self.SIZE, None)
+        chunk = b'\xab' * storage_utils.UPLOAD_CHUNK_SIZE
+        for _ in range(self.SIZE // len(chunk)):
+            self.upload.write(chunk)
+        self.addCleanup(self.upload.close)
+
+    def _peak(self, func):
+        tracemalloc.start()
+        try:
+            result = func()
+            return result, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def _streaming_client(self, received):
+        def upload(path, source, file_options=None):
+            # Stand-in for the SDK, which streams the file body over HTTP
+            with open(source, 'rb') as f:
+                while chunk := f.read(storage_utils.UPLOAD_CHUNK_SIZE):
+                    received.append(len(chunk))
+            return mock.Mock()
+        client = mock.Mock()
+        client.storage.from_.return_value.upload.side_effect = upload
+        client.storage.from_.return_value.get_public_url.return_value = 'https://cdn/x.jpg'
+        return client
+
+    def test_supabase_upload_memory_is_bounded(self):
+        received = []
+        with mock.patch.object(storage_backends, 'get_supabase_client', return_value=self._streaming_client(received)):
+            url, peak = self._peak(lambda: storage_utils.upload_to_supabase(self.upload, folder='profile-photos'))
+        self.assertEqual(url, 'https://cdn/x.jpg')
+        self.assertEqual(sum(received), self.SIZE)
+        self.assertLess(peak, self.PEAK_LIMIT)
+
+    def test_in_memory_upload_is_spooled_in_chunks(self):
+        received = []
+        data = tempfile.SpooledTemporaryFile()
+        data.write(b'\xcd' * self.SIZE)
+        upload = InMemoryUploadedFile(data, 'file', 'small.png', 'image/png', self.SIZE, None)
+        with mock.patch.object(storage_backends, 'get_supabase_client', return_value=self._streaming_client(received)):
+            _, peak = self._peak(lambda: storage_utils.upload_to_supabase(upload))
+        self.assertEqual(sum(received), self.SIZE)
+        self.assertLess(peak, self.PEAK_LIMIT)
+
+    def test_local_fallback_memory_is_bounded(self):
+        with tempfile.TemporaryDirectory() as media_root:
+            storage = FileSystemStorage(location=media_root, base_url='/media/')
+            with mock.patch.object(storage_backends, 'get_supabase_client', return_value=None), \
+                    mock.patch.object(storage_backends, 'default_storage', storage):
+                url, peak = self._peak(lambda: storage_utils.upload_to_supabase(self.upload, folder='resident-ids'))
+            self.assertTrue(url.startswith('/media/resident-ids/'))
+            self.assertEqual(os.path.getsize(storage.path(url[len('/media/'):])), self.SIZE)
+        self.assertLess(peak, self.PEAK_LIMIT)
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.storage = FileSystemStorage(location=media_root.name, base_url='/media/')
+        for patcher in (
+            mock.patch.object(storage_backends, 'get_supabase_client', return_value=None),
+            mock.patch.object(storage_backends, 'default_storage', self.storage),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _upload(self, data, name='photo.jpg'):
+        return storage_utils.upload_to_supabase(ContentFile(data, name=name), folder='resident-ids')
+
+    def test_identical_uploads_share_one_object(self):
+        first = self._upload(b'same bytes', name='a.jpg')
+        second = self._upload(b'same bytes', name='b.jpg')
+        other = self._upload(b'other bytes')
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(self.storage.listdir('resident-ids')[1]), 2)
+        self.assertEqual(StoredObject.objects.get(path=first[len('/media/'):]).ref_count, 2)
+
+    def test_object_is_removed_with_its_last_reference(self):
+        url = self._upload(b'same bytes')
+        self._upload(b'same bytes')
+        path = url[len('/media/'):]
+
+        self.assertTrue(storage_utils.delete_from_supabase(url))
+        self.assertTrue(self.storage.exists(path))
+        self.assertTrue(storage_utils.delete_from_supabase(url))
+        self.assertFalse(self.storage.exists(path))
+        self.assertFalse(StoredObject.objects.exists())
+
+        # Stored again from scratch once gone
+        self.assertEqual(self._upload(b'same bytes'), url)
+        self.assertTrue(self.storage.exists(path))
+
+    def test_duplicate_skips_the_network_upload(self):
+        client = mock.Mock()
+        client.storage.from_.return_value.get_public_url.side_effect = lambda key: f'https://cdn/{key}'
+        with mock.patch.object(storage_backends, 'get_supabase_client', return_value=client):
+            first = self._upload(b'same bytes')
+            second = self._upload(b'same bytes')
+            storage_utils.delete_from_supabase(first)
+        self.assertEqual(first, second)
+        self.assertEqual(client.storage.from_.return_value.upload.call_count, 1)
+        client.storage.from_.return_value.remove.assert_not_called()
+
+
+class StorageBackendTest(SimpleTestCase):
+    """The same contract holds for every backend that runs without a network"""
+
+    def backends(self):
+        media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media_dir.cleanup)
+        patcher = mock.patch.object(
+            storage_backends, 'default_storage', ShardedFileSystemStorage(location=media_dir.name, base_url='/media/'),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return [storage_backends.LocalStorageBackend('user-uploads'), storage_backends.MemoryStorageBackend('user-uploads')]
+
+    def test_contract(self):
+        for backend in self.backends():
+            with self.subTest(backend=backend.name):
+                backend.put('profile-photos/a.jpg', b'bytes', 'image/jpeg')
+                with tempfile.NamedTemporaryFile() as f:
+                    f.write(b'streamed')
+                    f.flush()
+                    with open(f.name, 'rb') as source:
+                        backend.put_stream('profile-photos/7/b.png', File(source, name='b.png'), 'image/png')
+                with self.assertRaises(FileExistsError):
+                    backend.put('profile-photos/a.jpg', b'other', 'image/jpeg')
+
+                url = backend.url('profile-photos/a.jpg')
+                self.assertEqual(backend.key_for_url(url), 'profile-photos/a.jpg')
+                self.assertIsNone(backend.key_for_url('https://elsewhere/a.jpg'))
+                self.assertEqual(backend.read('profile-photos/7/b.png'), b'streamed')
+                self.assertEqual(backend.info('profile-photos/a.jpg'), {'size': 5, 'content_type': 'image/jpeg'})
+                self.assertEqual(
+                    sorted(key for key, _ in backend.list('profile-photos')),
+                    ['profile-photos/7/b.png', 'profile-photos/a.jpg'],
+                )
+
+                backend.delete('profile-photos/a.jpg')
+                backend.delete_many(['profile-photos/7/b.png', 'profile-photos/missing.jpg'])
+                self.assertFalse(backend.exists('profile-photos/a.jpg'))
+                self.assertIsNone(backend.read('profile-photos/7/b.png'))
+                self.assertIsNone(backend.info('profile-photos/a.jpg'))
+
+    @override_settings(STORAGE_BACKEND='memory')
+    def test_backend_is_selected_by_settings(self):
+        backend = storage_backends.get_backend('bench-test')
+        self.assertIsInstance(backend, storage_backends.MemoryStorageBackend)
+        self.assertIs(storage_backends.get_backend('bench-test'), backend)
+        with override_settings(STORAGE_BACKEND='nosuch'), self.assertRaises(ImproperlyConfigured):
+            storage_backends.get_backend()
+
+    def test_benchmark_reports_each_operation(self):
+        out = StringIO()
+        call_command('bench_storage', '--backend=memory', '--files=20', '--size=1024', '--concurrency=4', stdout=out)
+        for operation in ('put_stream', 'put', 'delete', 'delete_many'):
+            self.assertIn(f'  {operation} ', out.getvalue())
+        # Everything written is deleted again
+        self.assertEqual(storage_backends.get_backend(name='memory')._objects, {})
@@ -0,0 +1,61 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TestCase
+from django.urls import reverse
+
+from . import typeahead_utils
+from .models import CertificateRequest, User
+
+
+class AdminTypeaheadTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='StrongPass123', email='admin@example.com',
+            full_name='Admin', contact_number='09170000000', date_of_birth='1990-01-01',
+            address_line='A',
+        )
+        self.client.force_login(self.admin)
+
+    def test_exact_request_id_short_circuits(self):
+        cert = CertificateRequest.objects.create(
+            user=self.admin, certificate_type='residency', purpose='Travel', payment_amount=30,
+        )
+        with mock.patch.object(typeahead_utils, '_executor') as executor:
+            data = self.client.get(reverse('accounts:admin_search'), {'q': cert.request_id.lower()}).json()
+        executor.submit.assert_not_called()
+        self.assertEqual([row['label'] for row in data['results']['certificates']], [cert.request_id])
+
+    def test_slow_category_returns_partial_results(self):
+        def slow(text):
+            time.sleep(0.5)
+            return [{'label': 'late'}]
+
+        categories = {'users': lambda text: [{'label': 'fast'}], 'certificates': slow, 'reports': lambda text: []}
+        with mock.patch.dict(typeahead_utils.CATEGORIES, categories):
+            data = typeahead_utils.typeahead_search('garcia', budget_ms=100)
+        self.assertEqual(data['results']['users'], [{'label': 'fast'}])
+        self.assertEqual(data['results']['certificates'], [])
+        self.assertEqual(data['timed_out'], ['certificates'])
+        self.assertLess(data['took_ms'], 400)
+
+    def test_worker_threads_keep_their_connections(self):
+        wrapper = type(connections['default'])
+        with mock.patch.object(wrapper, 'close', autospec=True, side_effect=wrapper.close) as close:
+            for _ in range(6):
+                typeahead_utils._executor.submit(typeahead_utils._run_category, lambda text: [], 'garcia').result()
+            close.assert_not_called()
+
+            def break_then_search():
+                typeahead_utils._run_category(lambda text: [], 'garcia')
+                # As left by a failed rollback
+                connection.errors_occurred = True
+                with mock.patch.object(wrapper, 'is_usable', return_value=False):
+                    typeahead_utils._run_category(lambda text: [], 'garcia')
+
+            typeahead_utils._executor.submit(break_then_search).result()
+        # An unusable connection is replaced
+        close.assert_called_once()
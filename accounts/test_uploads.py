@@ -0,0 +1,309 @@
+import io
+import tempfile
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from . import cleanup_utils, image_utils, storage_backends, upload_utils
+from .models import CertificateRequest, PendingUpload, StorageTombstone, User
+
+
+def photo(name='photo.jpg'):
+    return SimpleUploadedFile(name, b'\xff\xd8 fake jpeg', content_type='image/jpeg')
+
+
+class BackgroundUploadTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        patcher = mock.patch.object(upload_utils, 'spool_storage', FileSystemStorage(location=spool_dir.name))
+        self.spool = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01',
+            address_line='A', profile_photo_url='https://cdn/old.jpg',
+        )
+        self.client.force_login(self.user)
+
+    def edit_profile(self, **files):
+        data = {
+            'full_name': 'Resident Two', 'contact_number': '09171234567', 'address_line': 'A',
+            'username': 'resident', 'date_of_birth': '1990-01-01', **files,
+        }
+        # The worker thread is started on commit; tests run the job directly
+        with mock.patch.object(upload_utils, '_executor'), self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('accounts:edit_profile'), data)
+
+    def test_edit_profile_returns_before_upload(self):
+        with mock.patch.object(image_utils, 'upload_to_supabase') as upload:
+            response = self.edit_profile(profile_photo=photo())
+        self.assertRedirects(response, reverse('accounts:personal_info'), fetch_redirect_response=False)
+        upload.assert_not_called()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.full_name, 'Resident Two')
+        self.assertEqual(self.user.profile_photo_url, 'https://cdn/old.jpg')
+        pending = PendingUpload.objects.get()
+        self.assertTrue(self.spool.exists(pending.spool_name))
+        self.assertEqual(PendingUpload.states_for(self.user), {'profile_photo_url': 'processing'})
+        self.assertContains(self.client.get(reverse('accounts:personal_info')), 'Processing upload')
+
+    def test_worker_fills_url_and_replaces_old_photo(self):
+        self.edit_profile(profile_photo=photo())
+        pending = PendingUpload.objects.get()
+        with mock.patch.object(image_utils, 'upload_to_supabase', return_value='https://cdn/new.jpg'), \
+                mock.patch.object(cleanup_utils, 'object_key', side_effect=lambda url, bucket_name: url.rsplit('/', 1)[-1]):
+            upload_utils.run_upload(pending.pk)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_photo_url, 'https://cdn/new.jpg')
+        # The old photo is left for the storage sweeper
+        self.assertEqual(list(StorageTombstone.objects.values_list('key', flat=True)), ['old.jpg'])
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'done')
+        self.assertFalse(self.spool.exists(pending.spool_name))
+        self.assertEqual(self.client.get(reverse('accounts:upload_status')).json(), {'states': {}})
+
+    def test_failures_back_off_then_give_up(self):
+        self.edit_profile(resident_id_photo=photo())
+        pending = PendingUpload.objects.get()
+        with mock.patch.object(image_utils, 'upload_to_supabase', return_value=None):
+            pending = upload_utils.process_upload(pending.pk)
+            self.assertEqual((pending.status, pending.attempts), ('pending', 1))
+            # Not due yet
+            self.assertIsNone(upload_utils.process_upload(pending.pk))
+
+            for _ in range(upload_utils.MAX_ATTEMPTS - 1):
+                PendingUpload.objects.filter(pk=pending.pk).update(next_attempt_at=pending.created_at)
+                pending = upload_utils.process_upload(pending.pk)
+
+        self.assertEqual(pending.status, 'failed')
+        self.assertTrue(self.spool.exists(pending.spool_name))
+        self.assertEqual(PendingUpload.states_for(self.user), {'resident_id_photo_url': 'failed'})
+
+    def test_worker_does_not_wait_out_the_backoff(self):
+        self.edit_profile(resident_id_photo=photo())
+        pending = PendingUpload.objects.get()
+        with mock.patch.object(image_utils, 'upload_to_supabase', return_value=None), \
+                mock.patch.object(upload_utils.threading, 'Timer') as timer:
+            upload_utils.run_upload(pending.pk)
+
+        pending.refresh_from_db()
+        self.assertEqual((pending.status, pending.attempts), ('pending', 1))
+        # The retry is resubmitted to the pool when it is due
+        delay, submit = timer.call_args.args
+        self.assertGreater(delay, 0)
+        self.assertEqual(submit, upload_utils._executor.submit)
+        self.assertEqual(timer.call_args.kwargs['args'], (upload_utils.run_upload, pending.pk))
+        timer.return_value.start.assert_called_once()
+
+    def test_newer_upload_supersedes_pending_one(self):
+        self.edit_profile(profile_photo=photo('first.jpg'))
+        self.edit_profile(profile_photo=photo('second.jpg'))
+        first, second = PendingUpload.objects.order_by('pk')
+        self.assertEqual(first.status, 'superseded')
+        self.assertFalse(self.spool.exists(first.spool_name))
+        self.assertIsNone(upload_utils.process_upload(first.pk))
+        self.assertEqual(second.status, 'pending')
+
+    def test_rolled_back_edit_leaves_no_spooled_files(self):
+        self.edit_profile(profile_photo=photo('first.jpg'))
+        first = PendingUpload.objects.get()
+
+        # The ID photo key is rejected after the profile photo was spooled
+        response = self.edit_profile(profile_photo=photo('second.jpg'), resident_id_photo_key='bogus')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(PendingUpload.objects.all()), [first])
+        first.refresh_from_db()
+        # The older upload is still pending, so its file is kept
+        self.assertEqual(first.status, 'pending')
+        self.assertEqual(self.spool.listdir('')[1], [first.spool_name])
+
+    def test_indigency_request_gets_proof_in_background(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.client.post(reverse('accounts:brgy_indigency_cert'), {
+                'purpose': 'Medical assistance application', 'proof_photo': photo(),
+            })
+        cert_request = CertificateRequest.objects.get()
+        self.assertRedirects(
+            response, reverse('accounts:payment_mode_selection', args=[cert_request.request_id]),
+            fetch_redirect_response=False,
+        )
+        self.assertIsNone(cert_request.proof_photo_url)
+
+        pending = PendingUpload.objects.get(certificate_request=cert_request)
+        with mock.patch.object(image_utils, 'upload_to_supabase', return_value='https://cdn/proof.jpg') as upload:
+            upload_utils.process_upload(pending.pk)
+        self.assertEqual(upload.call_args.kwargs['folder'], 'indigency-proofs')
+        cert_request.refresh_from_db()
+        self.assertEqual(cert_request.proof_photo_url, 'https://cdn/proof.jpg')
+
+
+@skipIf(image_utils.Image is None, 'Pillow is not installed')
+class ImageNormalizationTest(TestCase):
+    def phone_photo(self):
+        from PIL import Image
+        image = Image.new('RGB', (4000, 3000), (200, 120, 40))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90° clockwise
+        exif[0x8827] = 100  # ISO, stands in for the personal metadata phones add
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=95, exif=exif)
+        return ContentFile(buffer.getvalue(), name='IMG_0001.JPG')
+
+    def test_variants_are_upright_capped_and_stripped(self):
+        from PIL import Image
+        variants = image_utils.normalize_image(self.phone_photo())
+        sizes = {}
+        for name, variant in variants.items():
+            with Image.open(variant) as image:
+                sizes[name] = image.size
+                self.assertFalse(image.getexif())
+        # Portrait after applying the orientation tag
+        self.assertEqual(sizes, {'main': (1200, 1600), 'medium': (480, 640), 'small': (120, 160)})
+
+    def test_worker_stores_thumbnails(self):
+        user = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01', address_line='A',
+        )
+        with tempfile.TemporaryDirectory() as spool_dir, \
+                mock.patch.object(upload_utils, 'spool_storage', FileSystemStorage(location=spool_dir)), \
+                self.captureOnCommitCallbacks(execute=False):
+            pending = upload_utils.queue_upload(self.phone_photo(), user, 'resident_id_photo_url')
+            stored = []
+
+            def upload(file, bucket_name, folder):
+                stored.append(file)
+                return f'https://cdn/{folder}/{len(stored)}.{file.name.rsplit(".", 1)[-1]}'
+
+            with mock.patch.object(image_utils, 'upload_to_supabase', side_effect=upload):
+                upload_utils.process_upload(pending.pk)
+
+        user.refresh_from_db()
+        ext = image_utils.output_format()[1]
+        self.assertEqual(user.resident_id_photo_url, f'https://cdn/resident-ids/1.{ext}')
+        self.assertEqual(user.resident_id_photo_medium_url, f'https://cdn/resident-ids/2.{ext}')
+        self.assertEqual(user.resident_id_photo_small_url, f'https://cdn/resident-ids/3.{ext}')
+        self.assertLess(stored[0].size * 10, len(self.phone_photo().read()))
+
+
+class DirectUploadTest(TestCase):
+    """The local-media signed upload contract, end to end without Supabase"""
+
+    def setUp(self):
+        cache.clear()
+        media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media_dir.cleanup)
+        self.media = FileSystemStorage(location=media_dir.name, base_url='/media/')
+        for target, name, value in [
+            (storage_backends, 'default_storage', self.media),
+            (storage_backends, 'get_supabase_client', lambda use_service_key=False: None),
+        ]:
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(
+            username='resident', password='StrongPass123', email='resident@example.com',
+            full_name='Resident', contact_number='09171234567', date_of_birth='1990-01-01', address_line='A',
+        )
+        self.client.force_login(self.user)
+
+    def png(self):
+        if image_utils.Image is None:
+            return b'\x89PNG\r\n\x1a\n not really a png'
+        buffer = io.BytesIO()
+        image_utils.Image.new('RGB', (2400, 1800), 'white').save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def sign(self, **data):
+        data = {'folder': 'profile-photos', 'content_type': 'image/png', 'size': 1000, **data}
+        return self.client.post(reverse('accounts:upload_sign'), data)
+
+    def test_upload_then_submit_key(self):
+        grant = self.sign().json()
+        data = self.png()
+        response = self.client.put(grant['upload_url'], data, content_type='image/png')
+        self.assertEqual(response.status_code, 200)
+        key = response.json()['Key']
+        self.assertTrue(key.startswith(f'profile-photos/{self.user.pk}/'))
+        self.assertEqual(self.media.size(key), len(data))
+
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.client.post(reverse('accounts:edit_profile'), {
+                'full_name': 'Resident', 'contact_number': '09171234567', 'address_line': 'A',
+                'username': 'resident', 'date_of_birth': '1990-01-01', 'profile_photo_key': grant['key'],
+            })
+        self.assertEqual(response.status_code, 302)
+        pending = PendingUpload.objects.get()
+        self.assertEqual(pending.source_key, key)
+
+        upload_utils.process_upload(pending.pk)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.profile_photo_url.startswith('/media/profile-photos/'))
+        if image_utils.Image is not None:
+            self.assertIsNotNone(self.user.profile_photo_small_url)
+            # The raw upload is replaced by the normalized variants
+            cleanup_utils.sweep()
+            self.assertFalse(self.media.exists(key))
+
+        # A key is good for one submission only
+        with self.assertRaises(upload_utils.DirectUploadError):
+            upload_utils.verify_direct_upload(grant['key'], self.user, 'profile_photo_url')
+
+    def test_sign_rejects_bad_requests(self):
+        self.assertEqual(self.sign(folder='static').status_code, 400)
+        self.assertEqual(self.sign(content_type='application/pdf').status_code, 400)
+        self.assertEqual(self.sign(size=upload_utils.MAX_UPLOAD_BYTES + 1).status_code, 400)
+
+    def test_upload_endpoint_enforces_grant(self):
+        grant = self.sign().json()
+        self.assertEqual(self.client.put(grant['upload_url'], b'x', content_type='image/jpeg').status_code, 400)
+        with mock.patch.object(upload_utils, 'MAX_UPLOAD_BYTES', 10):
+            self.assertEqual(self.client.put(grant['upload_url'], b'x' * 11, content_type='image/png').status_code, 400)
+        self.assertEqual(self.client.put(grant['upload_url'], b'x', content_type='image/png').status_code, 200)
+        # No overwriting an existing object
+        self.assertEqual(self.client.put(grant['upload_url'], b'y', content_type='image/png').status_code, 400)
+
+    def test_submitted_key_must_be_issued_to_user_and_uploaded(self):
+        grant = self.sign().json()
+        other = User.objects.create_user(
+            username='other', password='StrongPass123', email='other@example.com',
+            full_name='Other', contact_number='09171234567', date_of_birth='1990-01-01', address_line='A',
+        )
+        cases = [
+            (grant['key'], self.user),  # never uploaded
+            (grant['key'], other),  # someone else's key
+            (grant['key'] + 'x', self.user),  # tampered signature
+        ]
+        for key, user in cases:
+            with self.assertRaises(upload_utils.DirectUploadError):
+                upload_utils.verify_direct_upload(key, user, 'profile_photo_url')
+        # Right user, wrong folder
+        self.client.put(grant['upload_url'], b'x', content_type='image/png')
+        with self.assertRaises(upload_utils.DirectUploadError):
+            upload_utils.verify_direct_upload(grant['key'], self.user, 'resident_id_photo_url')
+
+    def test_rejected_object_is_scheduled_for_deletion(self):
+        grant = self.sign(folder='indigency-proofs').json()
+        key = self.client.put(grant['upload_url'], b'x' * 100, content_type='image/png').json()['Key']
+
+        with mock.patch.object(upload_utils, 'MAX_UPLOAD_BYTES', 10):
+            response = self.client.post(reverse('accounts:brgy_indigency_cert'), {
+                'purpose': 'Medical assistance application', 'proof_photo_key': grant['key'],
+            })
+        self.assertIn('Invalid image', ' '.join(map(str, response.context['messages'])))
+        self.assertFalse(CertificateRequest.objects.exists())
+        # Recorded outside the rolled-back request transaction
+        self.assertEqual(list(StorageTombstone.objects.values_list('key', flat=True)), [key])
+        cleanup_utils.sweep()
+        self.assertFalse(self.media.exists(key))
@@ -0,0 +1,140 @@
+"""
+Global admin typeahead search.
+Users, certificate requests and incident reports are looked up concurrently
+on a small shared thread pool; whatever has finished when the latency
+budget runs out is returned and slower categories are reported as timed out.
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import CertificateRequest, IncidentReport, User
+from .search_utils import search_certificate_requests, search_incident_reports, search_users
+
+# Milliseconds the endpoint waits for all categories before answering
+TYPEAHEAD_BUDGET_MS = getattr(settings, 'ADMIN_TYPEAHEAD_BUDGET_MS', 100)
+# Queries still running this long after the budget are cancelled by PostgreSQL
+STATEMENT_TIMEOUT_MS = TYPEAHEAD_BUDGET_MS * 5
+CATEGORY_LIMIT = 5
+MIN_QUERY_LENGTH = 2
+
+REQUEST_ID_PATTERN = re.compile(r'^REQ-\d{4}-\d+$', re.IGNORECASE)
+REPORT_ID_PATTERN = re.compile(r'^RPT-[0-9A-F]{8}$', re.IGNORECASE)
+CERTIFICATE_TYPE_LABELS = dict(CertificateRequest.CERTIFICATE_TYPES)
+
+# One worker per category. Each keeps its own database connection for the
+# life of the thread, whatever CONN_MAX_AGE is, so a lookup does not pay for
+# a new connection and a process never holds more than three for searches
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='typeahead')
+
+
+def _admin_link(name, query):
+    return f"{reverse(name)}?{urlencode({'q': query})}"
+
+
+def _user_results(text):
+    users = search_users(User.objects.filter(is_staff=False), text).order_by('-date_joined')
+    return [
+        {
+            'label': row['full_name'] or row['username'],
+            'detail': f"{row['username']} · {row['email']}",
+            'url': _admin_link('accounts:admin_users', row['username']),
+        }
+        for row in users.values('username', 'full_name', 'email')[:CATEGORY_LIMIT]
+    ]
+
+
+def _certificate_rows(queryset):
+    return [
+        {
+            'label': row['request_id'],
+            'detail': f"{row['user__full_name']} · {CERTIFICATE_TYPE_LABELS.get(row['certificate_type'], row['certificate_type'])}",
+            'url': _admin_link('accounts:admin_certificates', row['request_id']),
+        }
+        for row in queryset.values('request_id', 'user__full_name', 'certificate_type')[:CATEGORY_LIMIT]
+    ]
+
+
+def _report_rows(queryset):
+    return [
+        {
+            'label': row['report_id'],
+            'detail': f"{row['incident_type']} · {row['place']} · {row['status']}",
+            'url': _admin_link('accounts:admin_reports', row['report_id']),
+        }
+        for row in queryset.values('report_id', 'incident_type', 'place', 'status')[:CATEGORY_LIMIT]
+    ]
+
+
+def _certificate_results(text):
+    certificates = search_certificate_requests(CertificateRequest.objects.all(), text)
+    return _certificate_rows(certificates.order_by('-search_rank', '-created_at'))
+
+
+def _report_results(text):
+    reports = search_incident_reports(IncidentReport.objects.all(), text, ranked=True)
+    return _report_rows(reports.order_by('-search_rank', '-created_at'))
+
+
+CATEGORIES = {
+    'users': _user_results,
+    'certificates': _certificate_results,
+    'reports': _report_results,
+}
+
+
+def _run_category(lookup, text):
+    """Run one category lookup on a worker thread with a server-side time limit"""
+    # Only replace the thread's connection if an error left it unusable
+    if connection.errors_occurred:
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+        connection.errors_occurred = False
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"SET LOCAL statement_timeout = {int(STATEMENT_TIMEOUT_MS)}")
+        return lookup(text)
+
+
+def typeahead_search(text, budget_ms=TYPEAHEAD_BUDGET_MS):
+    """
+    Search every category for `text` and return a JSON-ready dict with one
+    list per category plus `timed_out` / `failed` category names.
+    """
+    started = time.perf_counter()
+    text = text.strip()
+    results = {name: [] for name in CATEGORIES}
+    response = {'query': text, 'results': results, 'timed_out': [], 'failed': []}
+
+    if len(text) < MIN_QUERY_LENGTH:
+        response['took_ms'] = 0
+        return response
+
+    # Exact identifiers go straight to the unique index
+    if REQUEST_ID_PATTERN.match(text):
+        results['certificates'] = _certificate_rows(CertificateRequest.objects.filter(request_id=text.upper()))
+    elif REPORT_ID_PATTERN.match(text):
+        results['reports'] = _report_rows(IncidentReport.objects.filter(report_id=text.upper()))
+    else:
+        futures = {_executor.submit(_run_category, lookup, text): name for name, lookup in CATEGORIES.items()}
+        done, pending = wait(futures, timeout=budget_ms / 1000)
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"Typeahead {name} lookup failed: {e}")
+                response['failed'].append(name)
+        for future in pending:
+            future.cancel()
+            response['timed_out'].append(futures[future])
+
+    response['took_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return response
@@ -0,0 +1,416 @@
+"""
+Background upload pipeline.
+Views spool the uploaded file to local disk, record a PendingUpload and
+return straight away. A worker thread then normalizes the image, pushes
+it and its thumbnails to storage, writes the URLs onto the user or
+certificate request, and resubmits failed attempts once their exponential
+backoff has passed. `manage.py process_uploads` picks up retries and
+anything a restarted process left behind.
+
+Browsers can also upload straight to storage: issue_direct_upload() hands
+out a signed object key and upload URL, and queue_direct_upload() verifies
+the uploaded object before queueing it like a spooled file.
+"""
+
+import os
+import random
+import re
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core import signing
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .cleanup_utils import schedule_deletion
+from .image_utils import normalize_image, upload_variants, variant_fields
+from .models import CertificateRequest, PendingUpload, User
+from .storage_backends import get_backend
+from .storage_utils import (
+    UPLOAD_CHUNK_SIZE, create_signed_upload, object_public_url,
+    read_from_supabase, stored_object_info,
+)
+
+BUCKET_NAME = 'user-uploads'
+FIELD_FOLDERS = {
+    'profile_photo_url': 'profile-photos',
+    'resident_id_photo_url': 'resident-ids',
+    'proof_photo_url': 'indigency-proofs',
+}
+
+# Direct uploads: accepted types, size limit and how long an issued key stays valid
+DIRECT_UPLOAD_TYPES = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp'}
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+DIRECT_UPLOAD_TTL_SECONDS = 15 * 60
+_key_signer = signing.TimestampSigner(salt='accounts.direct-upload.key')
+LOCAL_UPLOAD_SALT = 'accounts.direct-upload.local'
+
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+# A claim this old belongs to a worker that died mid-upload
+STALE_CLAIM = timedelta(minutes=10)
+
+spool_storage = FileSystemStorage(
+    location=getattr(settings, 'UPLOAD_SPOOL_ROOT', os.path.join(settings.BASE_DIR, 'upload_spool'))
+)
+# Uploads run off the request thread; two workers keep a storage outage
+# from piling up threads while jobs wait safely in the database
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='uploads')
+
+
+class SpooledFile(File):
+    """A spooled upload on disk, presented to upload_to_supabase like a Django upload"""
+
+    def __init__(self, path, name, content_type):
+        super().__init__(open(path, 'rb'), name=name)
+        self.content_type = content_type
+        self._path = path
+
+    def temporary_file_path(self):
+        return self._path
+
+
+def queue_upload(file, user, field, certificate_request=None):
+    """
+    Spool `file` and record a PendingUpload for `field`. The upload starts
+    once the surrounding transaction commits. Raises OSError if the file
+    cannot be spooled.
+    """
+    ext = file.name.split('.')[-1].lower() if '.' in file.name else 'jpg'
+    spool_name = spool_storage.save(f"{uuid.uuid4().hex}.{ext}", file)
+    try:
+        return _queue(
+            user, field, certificate_request, spool_name=spool_name, original_name=file.name,
+            content_type=getattr(file, 'content_type', None) or 'application/octet-stream',
+        )
+    except Exception:
+        spool_storage.delete(spool_name)
+        raise
+
+
+def _discard_source(upload):
+    if upload.spool_name:
+        spool_storage.delete(upload.spool_name)
+    if upload.source_key:
+        schedule_deletion([object_public_url(upload.source_key, bucket_name=BUCKET_NAME)], bucket_name=BUCKET_NAME)
+
+
+def discard_queued_uploads(uploads):
+    """
+    Delete the spooled files of uploads queued in a transaction that was
+    then rolled back; nothing else would ever remove them.
+    """
+    for upload in uploads:
+        if upload.spool_name:
+            spool_storage.delete(upload.spool_name)
+
+
+def _queue(user, field, certificate_request, **source):
+    with transaction.atomic():
+        # Older uploads that have not started yet would only be overwritten
+        stale = PendingUpload.objects.filter(
+            user=user, certificate_request=certificate_request, field=field, status='pending',
+        )
+        for stale_upload in stale.only('spool_name', 'source_key'):
+            # Kept if the surrounding transaction rolls back and the upload stays pending
+            transaction.on_commit(lambda stale_upload=stale_upload: _discard_source(stale_upload))
+        stale.update(status='superseded')
+
+        upload = PendingUpload.objects.create(
+            user=user, certificate_request=certificate_request, field=field, **source,
+        )
+
+    cache.delete(PendingUpload.idle_cache_key(user.pk))
+    transaction.on_commit(lambda: _start(upload))
+    return upload
+
+
+def _start(upload):
+    # Cleared again in case a page cached the idle state before the commit
+    cache.delete(PendingUpload.idle_cache_key(upload.user_id))
+    _executor.submit(run_upload, upload.pk)
+
+
+class DirectUploadError(Exception):
+    """A direct upload request or submitted object key that cannot be accepted; the message is user-facing"""
+
+    def __init__(self, message, rejected_key=None):
+        super().__init__(message)
+        # A stored object that failed verification and should be deleted
+        self.rejected_key = rejected_key
+
+
+def discard_rejected_upload(error):
+    """
+    Schedule deletion of the object a DirectUploadError rejected. Call it
+    outside the failed transaction, which would roll the tombstone back.
+    """
+    if error.rejected_key:
+        schedule_deletion([object_public_url(error.rejected_key, bucket_name=BUCKET_NAME)], bucket_name=BUCKET_NAME)
+
+
+def issue_direct_upload(request, folder, content_type, size):
+    """
+    Reserve an object key in `folder` for the current user and return a
+    JSON-ready dict with the signed key and where to PUT the file. Uses a
+    Supabase signed upload URL, or the local upload endpoint without Supabase.
+    """
+    if folder not in FIELD_FOLDERS.values():
+        raise DirectUploadError("Unknown upload folder.")
+    if content_type not in DIRECT_UPLOAD_TYPES:
+        raise DirectUploadError("Invalid image type. Please upload a JPG, PNG or WebP file.")
+    if not 0 < size <= MAX_UPLOAD_BYTES:
+        raise DirectUploadError(f"Image too large. Please upload a file under {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+
+    # The user's ID in the key ties the object to whoever requested it
+    key = f"{folder}/{request.user.pk}/{uuid.uuid4().hex}.{DIRECT_UPLOAD_TYPES[content_type]}"
+    if get_backend(BUCKET_NAME).signed_uploads:
+        signed = create_signed_upload(key, bucket_name=BUCKET_NAME)
+        if not signed:
+            raise DirectUploadError("Uploads are unavailable right now. Please try again.")
+        upload_url = signed['url']
+    else:
+        token = signing.dumps(
+            {'key': key, 'content_type': content_type, 'size': size}, salt=LOCAL_UPLOAD_SALT, compress=True,
+        )
+        upload_url = request.build_absolute_uri(reverse('accounts:direct_upload', args=[token]))
+
+    return {
+        'key': _key_signer.sign(key),
+        'upload_url': upload_url,
+        'method': 'PUT',
+        'headers': {'Content-Type': content_type},
+        'expires_in': DIRECT_UPLOAD_TTL_SECONDS,
+    }
+
+
+def verify_direct_upload(signed_key, user, field):
+    """
+    Check a submitted key was issued to `user` for `field`'s folder recently
+    and that the uploaded object has an accepted size and type. Returns the
+    object key and content type. An object that fails the checks is named
+    in the error's rejected_key; see discard_rejected_upload().
+    """
+    try:
+        key = _key_signer.unsign(signed_key, max_age=DIRECT_UPLOAD_TTL_SECONDS)
+    except signing.BadSignature:
+        raise DirectUploadError("The upload expired. Please choose the photo again.")
+
+    extensions = '|'.join(DIRECT_UPLOAD_TYPES.values())
+    if not re.fullmatch(rf"{re.escape(FIELD_FOLDERS[field])}/{user.pk}/[0-9a-f]{{32}}\.({extensions})", key):
+        raise DirectUploadError("Invalid upload.")
+
+    if PendingUpload.objects.filter(source_key=key).exists():
+        raise DirectUploadError("This photo was already submitted.")
+
+    info = stored_object_info(key, bucket_name=BUCKET_NAME)
+    if info is None:
+        raise DirectUploadError("The photo did not finish uploading. Please try again.")
+    if not 0 < info['size'] <= MAX_UPLOAD_BYTES or info['content_type'] not in DIRECT_UPLOAD_TYPES:
+        raise DirectUploadError("Invalid image. Please upload a JPG, PNG or WebP file under 5 MB.", rejected_key=key)
+    return key, info['content_type']
+
+
+def store_local_direct_upload(token, content_type, stream):
+    """
+    Local stand-in for a Supabase signed upload URL: write the request body
+    read from `stream` to the storage backend under the token's key. Returns the key.
+    """
+    try:
+        grant = signing.loads(token, salt=LOCAL_UPLOAD_SALT, max_age=DIRECT_UPLOAD_TTL_SECONDS)
+    except signing.BadSignature:
+        raise DirectUploadError("The upload URL is invalid or has expired.")
+    if content_type != grant['content_type']:
+        raise DirectUploadError("Content type does not match the signed upload.")
+    backend = get_backend(BUCKET_NAME)
+    if backend.exists(grant['key']):
+        raise DirectUploadError("The object already exists.")
+
+    with tempfile.TemporaryFile() as body:
+        size = 0
+        while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise DirectUploadError("Upload is larger than allowed.")
+            body.write(chunk)
+        try:
+            backend.put_stream(grant['key'], File(body, name=os.path.basename(grant['key'])), content_type)
+        except FileExistsError:
+            raise DirectUploadError("The object already exists.")
+    return grant['key']
+
+
+def queue_direct_upload(signed_key, user, field, certificate_request=None):
+    """
+    Verify a directly uploaded object and record a PendingUpload to
+    normalize it. Raises DirectUploadError if the object is not acceptable.
+    """
+    key, content_type = verify_direct_upload(signed_key, user, field)
+    return _queue(
+        user, field, certificate_request, source_key=key, original_name=os.path.basename(key),
+        content_type=content_type,
+    )
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the given number of failed attempts, with jitter"""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _due(now):
+    return Q(status='pending', next_attempt_at__lte=now) | Q(status='processing', claimed_at__lt=now - STALE_CLAIM)
+
+
+def _claim(upload_id):
+    """Atomically mark a due upload as processing; False if it is not due or already taken"""
+    now = timezone.now()
+    return bool(
+        PendingUpload.objects.filter(_due(now), pk=upload_id).update(
+            status='processing', claimed_at=now, attempts=F('attempts') + 1,
+        )
+    )
+
+
+def _apply(upload, urls):
+    """Write the uploaded URLs onto their target unless a newer upload has replaced it"""
+    # Every stored URL holds one reference to its object, so each replaced
+    # value is released even when identical bytes were uploaded again
+    new_urls = list(urls.values())
+    with transaction.atomic():
+        newer = PendingUpload.objects.filter(
+            user_id=upload.user_id,
+            certificate_request_id=upload.certificate_request_id,
+            field=upload.field,
+            pk__gt=upload.pk,
+        ).exclude(status__in=['failed', 'superseded'])
+
+        if newer.exists():
+            upload.status = 'superseded'
+            replaced_urls = new_urls
+        else:
+            if upload.certificate_request_id:
+                target = CertificateRequest.objects.filter(pk=upload.certificate_request_id)
+            else:
+                target = User.objects.filter(pk=upload.user_id)
+            replaced_urls = list(target.select_for_update().values_list(*urls).first() or ())
+            # update() rather than save() so concurrent profile edits are not
+            # overwritten; if the row was deleted meanwhile the new files go too
+            if not target.update(**urls):
+                replaced_urls = new_urls
+            upload.status = 'done'
+
+        upload.last_error = ''
+        upload.save(update_fields=['status', 'last_error', 'updated_at'])
+        schedule_deletion(replaced_urls, bucket_name=BUCKET_NAME)
+
+
+def process_upload(upload_id):
+    """
+    Make one attempt at a due upload. Returns the updated PendingUpload, or
+    None if it is not due or another worker has it.
+    """
+    if not _claim(upload_id):
+        return None
+    upload = PendingUpload.objects.get(pk=upload_id)
+
+    if upload.spool_name and not spool_storage.exists(upload.spool_name):
+        upload.status = 'failed'
+        upload.last_error = 'Spooled file is missing.'
+        upload.save(update_fields=['status', 'last_error', 'updated_at'])
+        return upload
+
+    urls = None
+    error = 'Storage upload failed.'
+    try:
+        if upload.source_key:
+            urls = _store_direct_upload(upload)
+        else:
+            with SpooledFile(spool_storage.path(upload.spool_name), upload.original_name, upload.content_type) as file:
+                # Files that cannot be decoded as images are stored unchanged
+                variants = normalize_image(file) or {'main': file}
+                urls = upload_variants(variants, upload.field, FIELD_FOLDERS[upload.field], bucket_name=BUCKET_NAME)
+    except OSError as e:
+        error = str(e)
+
+    if urls:
+        _apply(upload, urls)
+        if upload.spool_name:
+            spool_storage.delete(upload.spool_name)
+        return upload
+
+    upload.last_error = error
+    if upload.attempts >= MAX_ATTEMPTS:
+        # The spooled file is kept so `process_uploads --retry-failed` can try again
+        upload.status = 'failed'
+    else:
+        upload.status = 'pending'
+        upload.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(upload.attempts))
+    upload.save(update_fields=['status', 'last_error', 'next_attempt_at', 'updated_at'])
+    print(f"Upload {upload.pk} attempt {upload.attempts} failed: {error}")
+    return upload
+
+
+def _store_direct_upload(upload):
+    """
+    Normalize an object the browser uploaded to storage. The raw object is
+    replaced by the normalized variants, or kept as the main image if it
+    cannot be decoded. Returns {model field: url}, or None to retry.
+    """
+    source_url = object_public_url(upload.source_key, bucket_name=BUCKET_NAME)
+    data = read_from_supabase(source_url, bucket_name=BUCKET_NAME)
+    if data is None:
+        return None
+
+    variants = normalize_image(ContentFile(data, name=upload.original_name))
+    if not variants:
+        return {
+            model_field: source_url if variant == 'main' else None
+            for variant, model_field in variant_fields(upload.field).items()
+        }
+
+    urls = upload_variants(variants, upload.field, FIELD_FOLDERS[upload.field], bucket_name=BUCKET_NAME)
+    if urls:
+        schedule_deletion([source_url], bucket_name=BUCKET_NAME)
+    return urls
+
+
+def _retry_later(upload):
+    """Resubmit a failed upload to the pool once its backoff has passed"""
+    delay = max(0.0, (upload.next_attempt_at - timezone.now()).total_seconds())
+    # The timer waits instead of a pool worker, so failing uploads never
+    # hold up new ones; if process_uploads claims it first the resubmitted
+    # attempt finds it not due and returns
+    timer = threading.Timer(delay, _executor.submit, args=(run_upload, upload.pk))
+    timer.daemon = True
+    timer.start()
+
+
+def run_upload(upload_id):
+    """Worker thread entry point: make one attempt, scheduling another if it is to be retried"""
+    close_old_connections()
+    try:
+        upload = process_upload(upload_id)
+        if upload is not None and upload.status == 'pending':
+            _retry_later(upload)
+    except Exception as e:
+        print(f"Upload worker error for {upload_id}: {e}")
+    finally:
+        close_old_connections()
+
+
+def due_upload_ids(limit=100):
+    """IDs of uploads that are due for an attempt, oldest first"""
+    due = PendingUpload.objects.filter(_due(timezone.now()))
+    return list(due.order_by('next_attempt_at').values_list('pk', flat=True)[:limit])
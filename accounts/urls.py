@@ -16,11 +16,16 @@ urlpatterns = [
     path('logout_confirm/', views.logout_confirm, name='logout_confirm'),
     path('personal_info/', views.personal_info, name='personal_info'),
     path('edit_profile/', views.edit_profile, name='edit_profile'),
+    path('uploads/status/', views.upload_status, name='upload_status'),
+    path('uploads/sign/', views.upload_sign, name='upload_sign'),
+    path('uploads/direct/<str:token>/', views.direct_upload, name='direct_upload'),
     path('complete_profile/', views.complete_profile, name='complete_profile'),
     path('document_request/', views.document_request, name='document_request'),
     path('certificate_requests/', views.certificate_requests, name='certificate_requests'),
+    path('certificate_requests/feed/', views.certificate_requests_feed, name='certificate_requests_feed'),
     path('request-detail/<str:request_id>/', views.request_detail, name='request_detail'),
     path('report_records/', views.report_records, name='report_records'),
+    path('report_records/feed/', views.report_records_feed, name='report_records_feed'),
     path('file_report/', views.file_report, name='file_report'),
 
 
@@ -49,9 +54,13 @@ urlpatterns = [
 
     # Admin/Dashboard
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/dashboard/stats/', views.admin_dashboard_stats, name='admin_dashboard_stats'),
+    path('admin/stats/<slug:metric>/daily/', views.admin_timeseries, name='admin_timeseries'),
+    path('admin/search/', views.admin_search, name='admin_search'),
 
     # User Management URLs
     path('admin/users/', views.admin_users, name='admin_users'),
+    path('admin/users/<int:user_id>/detail/', views.admin_user_detail, name='admin_user_detail'),
     path('admin/users/<int:user_id>/verify/', views.admin_verify_user, name='admin_verify_user'),
     path('admin/users/<int:user_id>/deactivate/', views.admin_deactivate_user, name='admin_deactivate_user'),
     path('admin/users/<int:user_id>/activate/', views.admin_activate_user, name='admin_activate_user'),
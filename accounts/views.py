@@ -8,7 +8,7 @@ Handles authentication, user management, and password recovery
 
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib import messages
-from django.http import HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse
 from django.shortcuts import redirect, render, get_object_or_404
 from django.core.mail import send_mail
 from django.conf import settings
@@ -19,8 +19,14 @@ from django.views.decorators.cache import never_cache
 from django.shortcuts import render
 from .models import User, PasswordResetCode
 from .forms import RegistrationForm
-from .models import User, PasswordResetCode, CertificateRequest, IncidentReport, Announcement
+from .search_utils import incident_snippets, search_certificate_requests, search_incident_reports, search_users
+from .stats_utils import get_dashboard_stats
+from .typeahead_utils import typeahead_search
+from .rollup_utils import METRIC_SOURCES, local_day_bounds, read_series
+from .pagination_utils import PAGE_SIZE_CHOICES, capped_count, estimated_count, keyset_paginate
+from .models import User, PasswordResetCode, CertificateRequest, IncidentReport, Announcement, StatCounter, PendingUpload
 from django.db import models  # Add this for Q queries
+from django.db import transaction
 
 
 from django.db.models import Q, Count
@@ -32,6 +38,7 @@ from django.contrib.auth.decorators import login_required
 import json
 import os
 import requests
+from datetime import date, timedelta
 import google.generativeai as genai 
 
 
@@ -327,12 +334,9 @@ def personal_info(request):
 
     user = request.user
     
-    # Get unread announcement count
-    unread_count = Announcement.objects.filter(is_active=True).count()
-
     context = {
         'user': user,
-        'unread_count': unread_count,
+        'upload_states': PendingUpload.states_for(user),
     }   
     return render(request, 'accounts/personal_info.html', context)
 
@@ -343,8 +347,6 @@ def personal_info(request):
 def edit_profile(request):
     user = request.user
     
-    unread_count = Announcement.objects.filter(is_active=True).count()
-
     if request.method == 'POST':
         save_ok = True
         # Update text fields
@@ -371,64 +373,132 @@ def edit_profile(request):
         if civil_status:
             user.civil_status = civil_status
 
-        # Handle file uploads to Supabase Storage
-        from .storage_utils import upload_to_supabase, delete_from_supabase
-        
-        profile_photo = request.FILES.get('profile_photo')
-        if profile_photo:
-            # Delete old photo if it exists
-            if user.profile_photo_url:
-                delete_from_supabase(user.profile_photo_url, bucket_name='user-uploads')
-            
-            # Upload new photo
-            new_url = upload_to_supabase(
-                profile_photo, 
-                bucket_name='user-uploads',
-                folder='profile-photos'
-            )
-            
-            if new_url:
-                user.profile_photo_url = new_url
-            else:
-                messages.error(request, "Failed to upload profile photo. Please try again.")
-                save_ok = False
+        # Photos arrive either as object keys the browser uploaded straight
+        # to storage, or as files that are spooled locally. Both are stored in
+        # the background; the upload worker replaces the old photo when done
+        from .upload_utils import (
+            DirectUploadError, discard_queued_uploads, discard_rejected_upload, queue_direct_upload, queue_upload,
+        )
 
-        resident_id_photo = request.FILES.get('resident_id_photo')
-        if resident_id_photo:
-            # Delete old ID photo if it exists
-            if user.resident_id_photo_url:
-                delete_from_supabase(user.resident_id_photo_url, bucket_name='user-uploads')
-            
-            # Upload new ID photo
-            new_url = upload_to_supabase(
-                resident_id_photo, 
-                bucket_name='user-uploads',
-                folder='resident-ids'
-            )
-            
-            if new_url:
-                user.resident_id_photo_url = new_url
-            else:
-                messages.error(request, "Failed to upload resident ID photo. Please try again.")
+        photos = [
+            (request.POST.get('profile_photo_key', '').strip(), request.FILES.get('profile_photo'), 'profile_photo_url'),
+            (request.POST.get('resident_id_photo_key', '').strip(), request.FILES.get('resident_id_photo'), 'resident_id_photo_url'),
+        ]
+        photos = [(key, photo, field) for key, photo, field in photos if key or photo]
+
+        if save_ok:
+            queued = []
+            try:
+                with transaction.atomic():
+                    # Only the edited fields, so a photo URL written by the
+                    # upload worker in the meantime is not overwritten
+                    user.save(update_fields=[
+                        'username', 'full_name', 'contact_number', 'address_line', 'date_of_birth', 'civil_status',
+                    ])
+                    for key, photo, field in photos:
+                        if key:
+                            queue_direct_upload(key, user, field)
+                        else:
+                            queued.append(queue_upload(photo, user, field))
+            except DirectUploadError as e:
+                # After the rollback, so the deletion is not rolled back too
+                discard_rejected_upload(e)
+                discard_queued_uploads(queued)
+                messages.error(request, str(e))
+                save_ok = False
+            except OSError as e:
+                discard_queued_uploads(queued)
+                print(f"Error spooling photo upload: {e}")
+                messages.error(request, "Failed to upload photo. Please try again.")
                 save_ok = False
 
         if save_ok:
-            user.save()
-            messages.success(request, "Profile updated successfully!")
+            if photos:
+                messages.success(request, "Profile updated successfully! Your new photo is being processed and will appear shortly.")
+            else:
+                messages.success(request, "Profile updated successfully!")
             return redirect('accounts:personal_info')
         else:
             context = {
                 'user': user,
+                'upload_states': PendingUpload.states_for(user),
             }
             return render(request, 'accounts/edit_profile.html', context)
 
     context = {
         'user': user,
-        'unread_count': unread_count,
+        'upload_states': PendingUpload.states_for(user),
     }
     return render(request, 'accounts/edit_profile.html', context)
 
 
+@login_required(login_url='accounts:login')
+@never_cache
+def upload_status(request):
+    """
+    Background upload states for the user's photos, or for one certificate
+    request's proof photo with ?request_id=; polled by the "processing" UI
+    """
+    cert_request = None
+    request_id = request.GET.get('request_id', '').strip()
+    if request_id:
+        cert_request = get_object_or_404(CertificateRequest, request_id=request_id, user=request.user)
+    return JsonResponse({'states': PendingUpload.states_for(request.user, cert_request)})
+
+
+@login_required(login_url='accounts:login')
+@never_cache
+def upload_sign(request):
+    """
+    Issue a signed object key and upload URL so the browser can send a photo
+    straight to storage. POST data: folder, content_type, size
+    """
+    from .upload_utils import DirectUploadError, issue_direct_upload
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST method required'}, status=405)
+    try:
+        size = int(request.POST.get('size', 0))
+    except ValueError:
+        size = 0
+    try:
+        data = issue_direct_upload(
+            request, request.POST.get('folder', ''), request.POST.get('content_type', '').lower(), size,
+        )
+    except DirectUploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(data)
+
+
+@csrf_exempt
+def direct_upload(request, token):
+    """
+    Local-media stand-in for a Supabase signed upload URL; the signed token
+    is the credential, as it is for Supabase
+    """
+    from .upload_utils import DirectUploadError, store_local_direct_upload
+
+    if request.method != 'PUT':
+        return JsonResponse({'error': 'PUT method required'}, status=405)
+    try:
+        key = store_local_direct_upload(token, request.content_type, request)
+    except DirectUploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'Key': key})
+
+
+def serve_media(request, path):
+    """
+    Locally stored photo, for its owner or an admin. Anyone else gets a 404,
+    so the view does not reveal which files exist.
+    """
+    from .media_utils import can_view_media, media_response
+
+    if not can_view_media(request.user, path):
+        raise Http404("File not found.")
+    return media_response(path)
+
+
 # -------------------- VIEW COMPLETE PROFILE --------------------
 @login_required(login_url='accounts:login')
 @never_cache
@@ -449,28 +519,81 @@ def complete_profile(request):
 @never_cache
 def document_request(request):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
     
     context = {
         'user': user,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/document_request.html', context)
 
 
+# Rows rendered per page on the resident history pages and their feeds
+HISTORY_PAGE_SIZE = 20
+
+
 @login_required(login_url='accounts:login')
 @never_cache
 def certificate_requests(request):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
+    
+    # First page of the user's filtered requests; the rest is fetched by
+    # certificate_requests_feed as the user scrolls
+    page = keyset_paginate(filter_certificate_requests(request, user), request, page_size=HISTORY_PAGE_SIZE)
+    
+    # Summary statistics (always from all user requests, not filtered),
+    # read from the user's maintained counters
+    counters = StatCounter.read(StatCounter.user_scope(user.pk))
+    payment_counts = counters.get('certificate_payment_status', {})
+    claim_counts = counters.get('certificate_claim_status', {})
+    
+    context = {
+        'user': user,
+        'requests': page,
+        'next_cursor': page.next_cursor or '',
+        'total_requests': sum(payment_counts.values()),
+        'pending_count': payment_counts.get('pending', 0),
+        'paid_count': payment_counts.get('paid', 0),
+        'unpaid_count': payment_counts.get('unpaid', 0),
+        'failed_count': payment_counts.get('failed', 0),
+        'processing_count': claim_counts.get('processing', 0),
+        'ready_count': claim_counts.get('ready', 0),
+        'claimed_count': claim_counts.get('claimed', 0),
+    }
+    return render(request, 'accounts/certificate_requests.html', context)
+
 
+@login_required(login_url='accounts:login')
+@never_cache
+def certificate_requests_feed(request):
+    """
+    JSON pages of the user's certificate request history for infinite scroll
+    """
+    page = keyset_paginate(filter_certificate_requests(request, request.user), request, page_size=HISTORY_PAGE_SIZE)
+    results = [
+        {
+            'request_id': req.request_id,
+            'certificate_type': req.get_certificate_type_display(),
+            'payment_mode': req.get_payment_mode_display() if req.payment_mode else '',
+            'payment_amount': str(req.payment_amount),
+            'payment_status': req.payment_status,
+            'payment_status_display': req.get_payment_status_display(),
+            'claim_status': req.claim_status,
+            'claim_status_display': req.get_claim_status_display(),
+            'created_at': timezone.localtime(req.created_at).strftime('%b %d, %Y - %I:%M %p'),
+        }
+        for req in page
+    ]
+    return JsonResponse({'results': results, 'next_cursor': page.next_cursor})
+
+
+def filter_certificate_requests(request, user):
+    """The user's certificate requests narrowed by the request's GET filters"""
     # Get filter parameters - use .get() with empty string default
     certificate_type = request.GET.get('certificate_type', '').strip()
     payment_status = request.GET.get('payment_status', '').strip()
     claim_status = request.GET.get('claim_status', '').strip()
     payment_mode = request.GET.get('payment_mode', '').strip()
     
-    # Base queryset - all user's requests ordered by most recent first
+    # Base queryset - all user's requests
     requests = CertificateRequest.objects.filter(user=user)
     
     # Apply filters only if values are provided and valid
@@ -490,35 +613,14 @@ def certificate_requests(request):
     if payment_mode and payment_mode in valid_payment_modes:
         requests = requests.filter(payment_mode=payment_mode)
     
-    # Order by most recent first
-    requests = requests.order_by('-created_at')
-    
-    # Calculate summary statistics (always from all user requests, not filtered)
-    all_requests = CertificateRequest.objects.filter(user=user)
-    total_requests = all_requests.count()
-    pending_count = all_requests.filter(payment_status='pending').count()
-    paid_count = all_requests.filter(payment_status='paid').count()
-    unpaid_count = all_requests.filter(payment_status='unpaid').count()
-    
-    context = {
-        'user': user,
-        'requests': requests,
-        'total_requests': total_requests,
-        'pending_count': pending_count,
-        'paid_count': paid_count,
-        'unpaid_count': unpaid_count,
-        'unread_count': unread_count,
-        
-    }
-    return render(request, 'accounts/certificate_requests.html', context)
+    return requests
 
 
 @login_required(login_url='accounts:login')
 @never_cache
 def request_detail(request, request_id):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
-
+    
     cert_request = get_object_or_404(CertificateRequest, request_id=request_id, user=user)
     
     # Determine recommended action for convenience
@@ -544,7 +646,7 @@ def request_detail(request, request_id):
         'user': user,
         'cert_request': cert_request,
         'next_action': next_action,
-        'unread_count': unread_count,
+        'upload_states': PendingUpload.states_for(user, cert_request),
     }
     return render(request, 'accounts/request_detail.html', context)
 
@@ -553,7 +655,6 @@ def request_detail(request, request_id):
 @never_cache
 def barangay_clearance_request(request):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
     
     if request.method == 'POST':
         purpose = request.POST.get('purpose')
@@ -581,7 +682,6 @@ def barangay_clearance_request(request):
     
     context = {
         'user': user,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/barangay_clearance_request.html', context)
 
@@ -590,7 +690,6 @@ def barangay_clearance_request(request):
 @never_cache
 def brgy_residency_cert(request):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
     
     if request.method == 'POST':
         purpose = request.POST.get('purpose')
@@ -618,7 +717,6 @@ def brgy_residency_cert(request):
     
     context = {
         'user': user,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/brgy_residency_cert.html', context)
 
@@ -627,11 +725,12 @@ def brgy_residency_cert(request):
 @never_cache
 def brgy_indigency_cert(request):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
     
     if request.method == 'POST':
         purpose = request.POST.get('purpose')
         proof_photo = request.FILES.get('proof_photo')
+        # Set instead of proof_photo when the browser uploaded straight to storage
+        proof_photo_key = request.POST.get('proof_photo_key', '').strip()
         
         # Validate purpose and proof photo
         if not purpose or len(purpose.strip()) < 10:
@@ -641,16 +740,16 @@ def brgy_indigency_cert(request):
             }
             return render(request, 'accounts/brgy_indigency_cert.html', context)
         
-        if not proof_photo:
+        if not proof_photo and not proof_photo_key:
             messages.error(request, "Please upload a proof photo for your indigency certificate request.")
             context = {
                 'user': user,
             }
             return render(request, 'accounts/brgy_indigency_cert.html', context)
 
-        # Validate image type and size
+        # Validate image type and size (direct uploads are checked when queued)
         allowed_types = {'image/jpeg', 'image/jpg', 'image/png'}
-        if getattr(proof_photo, 'content_type', '').lower() not in allowed_types:
+        if proof_photo and getattr(proof_photo, 'content_type', '').lower() not in allowed_types:
             messages.error(request, "Invalid image type. Please upload a JPG or PNG file.")
             context = { 'user': user }
             return render(request, 'accounts/brgy_indigency_cert.html', context)
@@ -661,30 +760,42 @@ def brgy_indigency_cert(request):
             context = { 'user': user }
             return render(request, 'accounts/brgy_indigency_cert.html', context)
 
-        # Upload proof photo using storage utils (Supabase or local fallback)
-        from .storage_utils import upload_to_supabase
-        proof_photo_url = upload_to_supabase(
-            proof_photo, 
-            bucket_name='user-uploads',
-            folder='indigency-proofs'
+        # Create the certificate request; the proof photo is spooled and
+        # uploaded in the background, filling in proof_photo_url when done
+        from .upload_utils import (
+            DirectUploadError, discard_queued_uploads, discard_rejected_upload, queue_direct_upload, queue_upload,
         )
-
-        if not proof_photo_url:
-            messages.error(request, "Failed to upload proof photo. Please try again later.")
+        upload_error = None
+        queued = []
+        try:
+            with transaction.atomic():
+                cert_request = CertificateRequest.objects.create(
+                    user=user,
+                    certificate_type='indigency',
+                    purpose=purpose,
+                    payment_amount=30.00,  # Certificate of Indigency fee
+                )
+                if proof_photo_key:
+                    queue_direct_upload(proof_photo_key, user, 'proof_photo_url', certificate_request=cert_request)
+                else:
+                    queued.append(queue_upload(proof_photo, user, 'proof_photo_url', certificate_request=cert_request))
+        except DirectUploadError as e:
+            # After the rollback, so the deletion is not rolled back too
+            discard_rejected_upload(e)
+            discard_queued_uploads(queued)
+            upload_error = str(e)
+        except OSError as e:
+            discard_queued_uploads(queued)
+            print(f"Error spooling proof photo: {e}")
+            upload_error = "Failed to upload proof photo. Please try again later."
+
+        if upload_error:
+            messages.error(request, upload_error)
             context = {
                 'user': user,
             }
             return render(request, 'accounts/brgy_indigency_cert.html', context)
         
-        # Create the certificate request
-        cert_request = CertificateRequest.objects.create(
-            user=user,
-            certificate_type='indigency',
-            purpose=purpose,
-            proof_photo_url=proof_photo_url,
-            payment_amount=30.00,  # Certificate of Indigency fee
-        )
-        
         messages.success(request, f"Request submitted successfully! Your request ID is {cert_request.request_id}. Please proceed to payment.")
         
         # Redirect to payment mode selection
@@ -692,7 +803,6 @@ def brgy_indigency_cert(request):
     
     context = {
         'user': user,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/brgy_indigency_cert.html', context)
 
@@ -701,7 +811,6 @@ def brgy_indigency_cert(request):
 @never_cache
 def brgy_goodmoral_character(request):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
     
     if request.method == 'POST':
         purpose = request.POST.get('purpose')
@@ -729,7 +838,6 @@ def brgy_goodmoral_character(request):
     
     context = {
         'user': user,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/brgy_goodmoral_character.html', context)
 
@@ -738,7 +846,6 @@ def brgy_goodmoral_character(request):
 @never_cache
 def brgy_business_cert(request):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
     
     if request.method == 'POST':
         purpose = request.POST.get('purpose')
@@ -794,7 +901,6 @@ def brgy_business_cert(request):
     
     context = {
         'user': user,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/brgy_business_cert.html', context)
 
@@ -803,7 +909,6 @@ def brgy_business_cert(request):
 @never_cache
 def payment_mode_selection(request, request_id):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
     
     # Get the certificate request
     cert_request = get_object_or_404(CertificateRequest, request_id=request_id, user=user)
@@ -838,7 +943,6 @@ def payment_mode_selection(request, request_id):
     context = {
         'user': user,
         'cert_request': cert_request,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/payment_mode_selection.html', context)
 
@@ -847,7 +951,6 @@ def payment_mode_selection(request, request_id):
 @never_cache
 def gcash_payment(request, request_id):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
     
     # Get the certificate request
     cert_request = get_object_or_404(CertificateRequest, request_id=request_id, user=user)
@@ -898,7 +1001,6 @@ def gcash_payment(request, request_id):
     context = {
         'user': user,
         'cert_request': cert_request,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/gcash_payment.html', context)
 
@@ -907,7 +1009,6 @@ def gcash_payment(request, request_id):
 @never_cache
 def counter_payment(request, request_id):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
 
     cert_request = get_object_or_404(CertificateRequest, request_id=request_id, user=user)
 
@@ -931,7 +1032,6 @@ def counter_payment(request, request_id):
     context = {
         'user': user,
         'cert_request': cert_request,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/counter_payment.html', context)
 
@@ -968,12 +1068,64 @@ def cancel_request(request, request_id):
 @never_cache
 def report_records(request):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
-    
-    # Get all incident reports for the current user
-    all_records = IncidentReport.objects.filter(user=user)
-    records = all_records.order_by('-created_at')
     
+    # First page of the user's filtered reports; the rest is fetched by
+    # report_records_feed as the user scrolls
+    records, order_fields = filter_report_records(request, user)
+    page = keyset_paginate(records, request, fields=order_fields, page_size=HISTORY_PAGE_SIZE)
+    query = request.GET.get('q', '').strip()
+    if query:
+        incident_snippets(page, query)
+
+    # Summary statistics (always from all user reports, not filtered),
+    # read from the user's maintained counters
+    status_counts = StatCounter.read(StatCounter.user_scope(user.pk)).get('report_status', {})
+
+    context = {
+        'user': user,
+        'records': page,
+        'next_cursor': page.next_cursor or '',
+        'total_reports': sum(status_counts.values()),
+        'pending_count': status_counts.get('Pending', 0),
+        'investigation_count': status_counts.get('Under Investigation', 0),
+        'mediation_count': status_counts.get('Mediation Scheduled', 0),
+        'resolved_count': status_counts.get('Resolved', 0),
+    }
+    return render(request, 'accounts/report_records.html', context)
+
+
+@login_required(login_url='accounts:login')
+@never_cache
+def report_records_feed(request):
+    """
+    JSON pages of the user's incident report history for infinite scroll
+    """
+    records, order_fields = filter_report_records(request, request.user)
+    page = keyset_paginate(records, request, fields=order_fields, page_size=HISTORY_PAGE_SIZE)
+    query = request.GET.get('q', '').strip()
+    if query:
+        incident_snippets(page, query)
+    results = [
+        {
+            'report_id': r.report_id,
+            'incident_type': r.incident_type,
+            'place': r.place,
+            'status': r.status,
+            'created_at': timezone.localtime(r.created_at).strftime('%b %d, %Y - %I:%M %p'),
+            'snippet': getattr(r, 'search_snippet', ''),
+        }
+        for r in page
+    ]
+    return JsonResponse({'results': results, 'next_cursor': page.next_cursor})
+
+
+def filter_report_records(request, user):
+    """
+    The user's incident reports narrowed by the request's GET filters, and
+    the keyset fields to order them by (best match first when searching)
+    """
+    records = IncidentReport.objects.filter(user=user).defer('search_vector')
+    order_fields = ('created_at', 'id')
 
     # Get filter parameters
     query = request.GET.get('q', '').strip()
@@ -981,39 +1133,38 @@ def report_records(request):
 
     # Apply filters
     if query:
-        records = records.filter(
-            models.Q(report_id__icontains=query) |
-            models.Q(incident_type__icontains=query) |
-            models.Q(place__icontains=query) |
-            models.Q(message__icontains=query)
-        )
+        records = search_incident_reports(records, query, ranked=True)
+        order_fields = ('search_rank', 'created_at', 'id')
     
     if status:
         records = records.filter(status=status)
 
-    # Calculate summary statistics (always from all user reports, not filtered)
-    total_reports = all_records.count()
-    pending_count = all_records.filter(status='Pending').count()
-    investigation_count = all_records.filter(status='Under Investigation').count()
-    resolved_count = all_records.filter(status='Resolved').count()
+    records = filter_date_range(request, records)
 
-    context = {
-        'user': user,
-        'records': records,
-        'total_reports': total_reports,
-        'pending_count': pending_count,
-        'investigation_count': investigation_count,
-        'resolved_count': resolved_count,
-        'unread_count': unread_count,
-    }
-    return render(request, 'accounts/report_records.html', context)
+    return records, order_fields
+
+
+def filter_date_range(request, queryset, field='created_at'):
+    """
+    Narrow `queryset` to the request's date_from/date_to GET params (local
+    days, inclusive). Bad dates are ignored.
+    """
+    try:
+        date_from = date.fromisoformat(request.GET['date_from']) if request.GET.get('date_from') else None
+        date_to = date.fromisoformat(request.GET['date_to']) if request.GET.get('date_to') else None
+    except ValueError:
+        return queryset
+    if date_from:
+        queryset = queryset.filter(**{f'{field}__gte': local_day_bounds(date_from, date_from)[0]})
+    if date_to:
+        queryset = queryset.filter(**{f'{field}__lt': local_day_bounds(date_to, date_to)[1]})
+    return queryset
 
 
 @login_required(login_url='accounts:login')
 @never_cache
 def file_report(request):
     user = request.user
-    unread_count = Announcement.objects.filter(is_active=True).count()
     
     if request.method == 'POST':
         report_type = request.POST.get('report_type')
@@ -1079,7 +1230,6 @@ def file_report(request):
 
     context = {
         'user': user,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/file_report.html', context)
 
@@ -1094,13 +1244,9 @@ def announcements(request):
     # Get all active announcements
     active_announcements = Announcement.objects.filter(is_active=True).order_by('-created_at')
     
-    # Get unread announcement count
-    unread_count = Announcement.objects.filter(is_active=True).count()
-    
     context = {
         'user': user,
         'announcements': active_announcements,
-        'unread_count': unread_count,
     }
     return render(request, 'accounts/announcements.html', context)
 
@@ -1233,51 +1379,19 @@ def admin_dashboard(request):
     Implements US-33 (Admin Dashboard UI) and US-34 (Admin Dashboard Functionality)
     """
     
-    # Summary Statistics
-    total_users = User.objects.filter(is_staff=False).count()
-    total_admin = User.objects.filter(is_superuser=True).count()
-    verified_users = User.objects.filter(resident_confirmation=True, is_staff=False).count()
-    pending_verification = User.objects.filter(resident_confirmation=False, is_staff=False).count()
-    
-    # Certificate Statistics
-    total_certificates = CertificateRequest.objects.count()
-    pending_payments = CertificateRequest.objects.filter(payment_status='pending').count()
-    paid_certificates = CertificateRequest.objects.filter(payment_status='paid').count()
-    unpaid_certificates = CertificateRequest.objects.filter(payment_status='unpaid').count()
-    
-    # Report Statistics
-    total_reports = IncidentReport.objects.count()
-    pending_reports = IncidentReport.objects.filter(status='Pending').count()
-    under_investigation = IncidentReport.objects.filter(status='Under Investigation').count()
-    resolved_reports = IncidentReport.objects.filter(status='Resolved').count()
+    # Summary statistics from the shared, short-lived snapshot
+    stats, stats_generated_at = get_dashboard_stats()
     
     # Recent Activities (last 10 items)
     recent_certificates = CertificateRequest.objects.select_related('user').order_by('-created_at')[:5]
     recent_reports = IncidentReport.objects.select_related('user').order_by('-created_at')[:5]
     recent_users = User.objects.filter(is_staff=False).order_by('-date_joined')[:5]
-
-
-    # Debug: Print total_admin to verify it's being calculated
-    print(f"DEBUG: total_admin = {total_admin}")
-    print(f"DEBUG: Admin users: {list(User.objects.filter(is_superuser=True).values_list('username', flat=True))}")
     
     context = {
         'user': request.user,
-        # User statistics
-        'total_users': total_users,
-        'total_admin': total_admin,
-        'verified_users': verified_users,
-        'pending_verification': pending_verification,
-        # Certificate statistics
-        'total_certificates': total_certificates,
-        'pending_payments': pending_payments,
-        'paid_certificates': paid_certificates,
-        'unpaid_certificates': unpaid_certificates,
-        # Report statistics
-        'total_reports': total_reports,
-        'pending_reports': pending_reports,
-        'under_investigation': under_investigation,
-        'resolved_reports': resolved_reports,
+        # User, certificate and report statistics
+        **stats,
+        'stats_generated_at': stats_generated_at,
         # Recent activities
         'recent_certificates': recent_certificates,
         'recent_reports': recent_reports,
@@ -1287,7 +1401,75 @@ def admin_dashboard(request):
     return render(request, 'admin/dashboard.html', context)
 
 
+@login_required(login_url='accounts:login')
+@user_passes_test(is_admin, login_url='accounts:personal_info')
+@never_cache
+def admin_dashboard_stats(request):
+    """
+    JSON version of the dashboard statistics snapshot, polled by the dashboard
+    """
+    stats, generated_at = get_dashboard_stats()
+    return JsonResponse({
+        'stats': stats,
+        'generated_at': generated_at.isoformat(),
+    })
+
+
+@login_required(login_url='accounts:login')
+@user_passes_test(is_admin, login_url='accounts:personal_info')
+@never_cache
+def admin_search(request):
+    """
+    Global typeahead across users, certificate requests and incident reports
+    GET params: q
+    """
+    return JsonResponse(typeahead_search(request.GET.get('q', '')))
+
+
+# Longest date range a single time-series request may cover
+MAX_TIMESERIES_DAYS = 366
+
+
+@login_required(login_url='accounts:login')
+@user_passes_test(is_admin, login_url='accounts:personal_info')
+@never_cache
+def admin_timeseries(request, metric):
+    """
+    Daily trend data for dashboard charts, served from the DailyRollup table
+    plus today's live partial totals
+    GET params: start, end (YYYY-MM-DD; default the last 30 days up to today)
+    """
+    if metric not in METRIC_SOURCES:
+        return JsonResponse({'error': 'Unknown metric.'}, status=404)
+
+    try:
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - timedelta(days=29)
+    except ValueError:
+        return JsonResponse({'error': 'Dates must be in YYYY-MM-DD format.'}, status=400)
+
+    if start > end:
+        return JsonResponse({'error': 'start must not be after end.'}, status=400)
+    if (end - start).days >= MAX_TIMESERIES_DAYS:
+        return JsonResponse({'error': f'Date range is limited to {MAX_TIMESERIES_DAYS} days.'}, status=400)
+
+    return JsonResponse({
+        'metric': metric,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        **read_series(metric, start, end),
+    })
+
+
 # -------------------- USER MANAGEMENT --------------------
+# Columns rendered by the admin users list; everything else is fetched by
+# admin_user_detail when a row is opened
+ADMIN_USER_LIST_FIELDS = (
+    'id', 'username', 'full_name', 'email', 'contact_number', 'date_joined',
+    'resident_confirmation', 'is_active', 'is_staff', 'is_superuser',
+)
+
+
 @login_required(login_url='accounts:login')
 @user_passes_test(is_admin, login_url='accounts:personal_info')
 @never_cache
@@ -1300,18 +1482,17 @@ def admin_users(request):
     # Get filter parameters
     query = request.GET.get('q', '').strip()
     verification_status = request.GET.get('verification_status', '').strip()
+    similar = request.GET.get('match', '') == 'similar'
     
-    # Base queryset - exclude staff users
-    users = User.objects.filter(is_staff=False).order_by('-date_joined')
+    # Base queryset - exclude staff users; only the columns the list renders
+    users = User.objects.filter(is_staff=False).only(*ADMIN_USER_LIST_FIELDS)
     
-    # Apply search filter
+    # Apply search filter; similarity matches are ordered best-first
+    order_fields = ('date_joined', 'id')
     if query:
-        users = users.filter(
-            Q(username__icontains=query) |
-            Q(email__icontains=query) |
-            Q(full_name__icontains=query) |
-            Q(contact_number__icontains=query)
-        )
+        users = search_users(users, query, similar=similar)
+        if similar:
+            order_fields = ('search_rank', 'date_joined', 'id')
     
     # Apply verification filter
     if verification_status == 'verified':
@@ -1319,15 +1500,55 @@ def admin_users(request):
     elif verification_status == 'pending':
         users = users.filter(resident_confirmation=False)
     
+    # Keyset pagination on (date_joined, id) with a capped total
+    page = keyset_paginate(users, request, fields=order_fields)
+    total_users, total_capped = capped_count(users)
+    
     context = {
         'user': request.user,
-        'users': users,
-        'total_users': users.count(),
+        'users': page,
+        'page': page,
+        'page_size_choices': PAGE_SIZE_CHOICES,
+        'total_users': total_users,
+        'total_capped': total_capped,
     }
     
     return render(request, 'admin/users.html', context)
 
 
+@login_required(login_url='accounts:login')
+@user_passes_test(is_admin, login_url='accounts:personal_info')
+@never_cache
+def admin_user_detail(request, user_id):
+    """
+    Full profile of one user as JSON, loaded on demand by the users page
+    """
+    usr = get_object_or_404(User, id=user_id)
+    return JsonResponse({
+        'id': usr.id,
+        'username': usr.username,
+        'full_name': usr.full_name,
+        'email': usr.email,
+        'contact_number': usr.contact_number,
+        'date_of_birth': usr.date_of_birth.strftime('%b %d, %Y') if usr.date_of_birth else '',
+        'civil_status': usr.civil_status or '',
+        'address_line': usr.address_line,
+        'barangay': usr.barangay,
+        'city': usr.city,
+        'province': usr.province,
+        'postal_code': usr.postal_code,
+        'profile_photo_url': usr.profile_photo_url or '',
+        'profile_photo_medium_url': usr.profile_photo_medium_url or '',
+        'resident_id_photo_url': usr.resident_id_photo_url or '',
+        'resident_id_photo_medium_url': usr.resident_id_photo_medium_url or '',
+        'resident_confirmation': usr.resident_confirmation,
+        'is_active': usr.is_active,
+        'is_superuser': usr.is_superuser,
+        'date_joined': timezone.localtime(usr.date_joined).strftime('%b %d, %Y %I:%M %p'),
+        'last_login': timezone.localtime(usr.last_login).strftime('%b %d, %Y %I:%M %p') if usr.last_login else '',
+    })
+
+
 @login_required(login_url='accounts:login')
 @user_passes_test(is_admin, login_url='accounts:personal_info')
 @never_cache
@@ -1399,16 +1620,13 @@ def admin_certificates(request):
     claim_status = request.GET.get('claim_status', '').strip()
     
     # Base queryset
-    certificates = CertificateRequest.objects.select_related('user').order_by('-created_at')
+    certificates = CertificateRequest.objects.select_related('user').defer('search_vector')
     
-    # Apply search filter
+    # Apply search filter; matches are ordered by relevance first
+    order_fields = ('created_at', 'id')
     if query:
-        certificates = certificates.filter(
-            Q(request_id__icontains=query) |
-            Q(user__username__icontains=query) |
-            Q(user__full_name__icontains=query) |
-            Q(purpose__icontains=query)
-        )
+        certificates = search_certificate_requests(certificates, query)
+        order_fields = ('search_rank', 'created_at', 'id')
     
     # Apply filters
     if certificate_type:
@@ -1420,10 +1638,18 @@ def admin_certificates(request):
     if claim_status:
         certificates = certificates.filter(claim_status=claim_status)
     
+    # Keyset pagination on (created_at, id); the total is capped so deep pages
+    # cost the same as the first one
+    page = keyset_paginate(certificates, request, fields=order_fields)
+    total_certificates, total_capped = capped_count(certificates)
+    
     context = {
         'user': request.user,
-        'certificates': certificates,
-        'total_certificates': certificates.count(),
+        'certificates': page,
+        'page': page,
+        'page_size_choices': PAGE_SIZE_CHOICES,
+        'total_certificates': total_certificates,
+        'total_capped': total_capped,
     }
     
     return render(request, 'admin/certificates.html', context)
@@ -1545,17 +1771,13 @@ def admin_reports(request):
     status = request.GET.get('status', '').strip()
     
     # Base queryset
-    reports = IncidentReport.objects.select_related('user').order_by('-created_at')
+    reports = IncidentReport.objects.select_related('user').defer('search_vector')
     
-    # Apply search filter
+    # Apply search filter; matches are ordered by relevance first
+    order_fields = ('created_at', 'id')
     if query:
-        reports = reports.filter(
-            Q(report_id__icontains=query) |
-            Q(user__username__icontains=query) |
-            Q(user__full_name__icontains=query) |
-            Q(place__icontains=query) |
-            Q(message__icontains=query)
-        )
+        reports = search_incident_reports(reports, query, ranked=True)
+        order_fields = ('search_rank', 'created_at', 'id')
     
     # Apply filters
     if incident_type:
@@ -1564,10 +1786,22 @@ def admin_reports(request):
     if status:
         reports = reports.filter(status=status)
     
+    reports = filter_date_range(request, reports)
+    
+    # Keyset pagination on (created_at, id); large totals come from the
+    # planner estimate unless ?exact=1 is given
+    page = keyset_paginate(reports, request, fields=order_fields)
+    if query:
+        incident_snippets(page, query)
+    total_reports, total_estimated = estimated_count(reports, exact=request.GET.get('exact') == '1')
+    
     context = {
         'user': request.user,
-        'reports': reports,
-        'total_reports': reports.count(),
+        'reports': page,
+        'page': page,
+        'page_size_choices': PAGE_SIZE_CHOICES,
+        'total_reports': total_reports,
+        'total_estimated': total_estimated,
     }
     
     return render(request, 'admin/reports.html', context)
@@ -1651,13 +1885,12 @@ def announcements(request):
     if announcement_type and announcement_type in ['general', 'event', 'alert', 'maintenance']:
         announcements_list = announcements_list.filter(announcement_type=announcement_type)
     
-    # Count unread (for badge) - for now, show total active announcements
-    unread_count = announcements_list.count()
+    # Opening the page marks everything posted so far as read (clears the badge)
+    Announcement.mark_seen(user)
     
     context = {
         'user': user,
         'announcements': announcements_list,
-        'unread_count': unread_count,
     }
     
     return render(request, 'accounts/announcements.html', context)
@@ -1682,7 +1915,7 @@ def admin_announcements(request):
     status = request.GET.get('status', '').strip()
     
     # Base queryset
-    announcements_list = Announcement.objects.select_related('posted_by').order_by('-created_at')
+    announcements_list = Announcement.objects.select_related('posted_by')
     
     # Apply search filter
     if query:
@@ -1701,10 +1934,19 @@ def admin_announcements(request):
     elif status == 'inactive':
         announcements_list = announcements_list.filter(is_active=False)
     
+    # Keyset pagination on (created_at, id) with an estimated total
+    page = keyset_paginate(announcements_list, request)
+    total_announcements, total_estimated = estimated_count(
+        announcements_list, exact=request.GET.get('exact') == '1'
+    )
+    
     context = {
         'user': request.user,
-        'announcements': announcements_list,
-        'total_announcements': announcements_list.count(),
+        'announcements': page,
+        'page': page,
+        'page_size_choices': PAGE_SIZE_CHOICES,
+        'total_announcements': total_announcements,
+        'total_estimated': total_estimated,
     }
     
     return render(request, 'admin/announcements.html', context)
@@ -1820,12 +2062,9 @@ def personal_info(request):
 
     user = request.user
     
-    # Get unread announcement count
-    unread_count = Announcement.objects.filter(is_active=True).count()
-
     context = {
         'user': user,
-        'unread_count': unread_count,
+        'upload_states': PendingUpload.states_for(user),
     }   
     return render(request, 'accounts/personal_info.html', context)
 
@@ -58,6 +58,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'accounts',
 ]
  
@@ -86,6 +87,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.announcement_badge',
             ],
         },
     },
@@ -104,12 +106,39 @@ SUPABASE_URL = os.environ.get('SUPABASE_URL', '')
 SUPABASE_KEY = os.environ.get('SUPABASE_KEY', '')
 SUPABASE_KEY_SERVICE = os.environ.get("SUPABASE_KEY_SERVICE", "")
 db_url = os.environ.get('DATABASE_URL')
+# Request threads close their connection after each request unless
+# DB_CONN_MAX_AGE is set. Persistent connections are opt-in, because every
+# thread (request, upload or typeahead worker) would hold one open, and a
+# few workers can use up the Supabase session pooler.
 DATABASES = {
-    'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
+    'default': dj_database_url.config(
+        default=os.environ.get('DATABASE_URL'),
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '0')),
+        conn_health_checks=True,
+    )
 }
  
 
  
+# Cache (Redis when REDIS_URL is set; per-process memory cache otherwise)
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'labang-online',
+        }
+    }
+ 
+ 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
  
@@ -186,3 +215,24 @@ AUTH_USER_MODEL = 'accounts.User'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Where uploaded photos are stored: 'supabase', 'local' (MEDIA_ROOT),
+# 'memory' (tests and benchmarks only) or 'auto' (Supabase when configured)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'auto')
+
+# Local media is written into hash-prefix subdirectories. Static files keep
+# the storage Django has been using: 5.x no longer reads STATICFILES_STORAGE
+STORAGES = {
+    'default': {'BACKEND': 'accounts.media_storage.ShardedFileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# /media/ is served by an access-checked view. In production let the front
+# server send the bytes: set MEDIA_ACCEL_REDIRECT_PREFIX to an nginx
+# `internal` location aliased to MEDIA_ROOT (e.g. /protected-media/), or
+# MEDIA_X_SENDFILE=True behind Apache/lighttpd with mod_xsendfile
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+MEDIA_X_SENDFILE = os.environ.get('MEDIA_X_SENDFILE', 'false').lower() == 'true'
+
+# Uploads wait here until the background pipeline pushes them to storage
+UPLOAD_SPOOL_ROOT = os.environ.get('UPLOAD_SPOOL_ROOT', BASE_DIR / 'upload_spool')
+
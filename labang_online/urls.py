@@ -18,7 +18,6 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from accounts import views
-from django.conf.urls.static import static
 
 # Configure admin site
 admin.site.site_header = "Labang Online Admin"
@@ -31,7 +30,6 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('accounts/', include('accounts.urls')),
     path('forgot-password/', views.forgot_password, name='forgot_password'),
-   
-
-
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Local media is access-checked; with Supabase configured nothing is stored here
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', views.serve_media, name='serve_media'),
+]
@@ -0,0 +1,69 @@
+// Sends photos straight to storage instead of through the app server.
+// File inputs marked with data-direct-upload-folder are uploaded to a signed
+// URL when the form is submitted; the form then posts only the object key in
+// a hidden "<input name>_key" field. If signing or the upload fails, the form
+// falls back to a normal multipart submit.
+function initDirectUploads(form, signUrl) {
+    const csrfToken = form.querySelector('[name=csrfmiddlewaretoken]').value;
+    let uploading = false;
+
+    function uploadFile(input, file) {
+        const body = new FormData();
+        body.append('folder', input.dataset.directUploadFolder);
+        body.append('content_type', file.type);
+        body.append('size', file.size);
+
+        return fetch(signUrl, {
+            method: 'POST',
+            body: body,
+            credentials: 'same-origin',
+            headers: { 'X-CSRFToken': csrfToken },
+        })
+            .then(response => {
+                if (!response.ok) throw new Error(response.status);
+                return response.json();
+            })
+            .then(grant => fetch(grant.upload_url, {
+                method: grant.method,
+                headers: grant.headers,
+                body: file,
+            }).then(response => {
+                if (!response.ok) throw new Error(response.status);
+                return grant.key;
+            }));
+    }
+
+    function keyInput(input) {
+        const name = input.name + '_key';
+        let hidden = form.querySelector(`input[type=hidden][name="${name}"]`);
+        if (!hidden) {
+            hidden = document.createElement('input');
+            hidden.type = 'hidden';
+            hidden.name = name;
+            form.appendChild(hidden);
+        }
+        return hidden;
+    }
+
+    form.addEventListener('submit', function(event) {
+        const inputs = Array.from(form.querySelectorAll('input[type=file][data-direct-upload-folder]'))
+            .filter(input => input.files.length && !input.disabled);
+        if (uploading || !inputs.length) return;
+
+        event.preventDefault();
+        uploading = true;
+        const submit = form.querySelector('[type=submit]');
+        if (submit) submit.disabled = true;
+
+        Promise.all(inputs.map(input => uploadFile(input, input.files[0]).then(key => [input, key])))
+            .then(results => {
+                // Keys go in the form; the file inputs are left out of the post
+                results.forEach(([input, key]) => {
+                    keyInput(input).value = key;
+                    input.disabled = true;
+                });
+            })
+            .catch(() => {})
+            .finally(() => form.submit());
+    });
+}
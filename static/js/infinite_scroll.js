@@ -0,0 +1,63 @@
+// Appends further pages of a history table as the user scrolls.
+// The first page is rendered by the server; the table's sentinel element
+// carries the feed URL and the cursor of the next page.
+function initInfiniteScroll(tbody, sentinel, renderRow) {
+    let cursor = sentinel.dataset.cursor;
+    let loading = false;
+
+    if (!cursor) {
+        sentinel.remove();
+        return;
+    }
+
+    function loadMore() {
+        if (loading || !cursor) return;
+        loading = true;
+        sentinel.textContent = 'Loading...';
+
+        const params = new URLSearchParams(window.location.search);
+        params.set('cursor', cursor);
+
+        fetch(sentinel.dataset.url + '?' + params.toString(), { credentials: 'same-origin' })
+            .then(response => {
+                if (!response.ok) throw new Error(response.status);
+                return response.json();
+            })
+            .then(data => {
+                data.results.forEach(row => tbody.appendChild(renderRow(row)));
+                cursor = data.next_cursor;
+                loading = false;
+                sentinel.textContent = '';
+                if (!cursor) {
+                    observer.disconnect();
+                    sentinel.remove();
+                }
+            })
+            .catch(() => {
+                loading = false;
+                sentinel.textContent = 'Could not load more records. Scroll to retry.';
+            });
+    }
+
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadMore();
+    }, { rootMargin: '200px' });
+    observer.observe(sentinel);
+}
+
+// Small helper for building table cells without innerHTML
+function buildElement(tag, className, text) {
+    const el = document.createElement(tag);
+    if (className) el.className = className;
+    if (text !== undefined) el.textContent = text;
+    return el;
+}
+
+// The `.search-snippet` block the templates render under a matched field.
+// Feeds send the snippet HTML-escaped apart from its <mark> tags.
+function appendSnippet(cell, snippet) {
+    if (!snippet) return;
+    const el = buildElement('div', 'search-snippet');
+    el.innerHTML = snippet;
+    cell.appendChild(el);
+}